@@ -0,0 +1,63 @@
+"""
+Сравнение загрузки вакансий через executemany и через COPY во временную таблицу.
+
+Запуск (нужна база с таблицами, созданными create_tables; все изменения откатываются):
+    python -m benchmarks.bench_bulk_load <dbname> [--sizes 2000 50000 500000]
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple, Any
+
+from src.create_db.bulk_load import bulk_upsert_vacancies
+from src.connection.connection import connection
+
+EXECUTEMANY_COMPANIES = ("INSERT INTO companies (company_id, name) VALUES (%s, %s) "
+                         "ON CONFLICT (company_id) DO NOTHING")
+EXECUTEMANY_VACANCIES = ("INSERT INTO vacancies (vacancy_id, company_id, title, salary_from, salary_to, currency, "
+                         "gross, salary_from_rub, salary_to_rub, link, published_at) "
+                         "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (vacancy_id) DO NOTHING")
+
+
+def synthetic_rows(count: int, companies: int = 10, seed: int = 0) -> List[Tuple[Any, ...]]:
+    """Создаёт строки вакансий в порядке VACANCY_COLUMNS."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        company_id = 1_000_000 + i % companies
+        salary_from = rng.choice([None, rng.randrange(30_000, 300_000, 1000)])
+        rows.append((10_000_000 + i, company_id, f'Компания {company_id}', f'Разработчик {i}', salary_from, None,
+                     'RUR', False, salary_from, None, f'https://hh.ru/vacancy/{10_000_000 + i}',
+                     '2024-04-01T10:00:00+0300'))
+    return rows
+
+
+def load_executemany(cur, rows: List[Tuple[Any, ...]]) -> None:
+    companies = {(row[1], row[2]) for row in rows}
+    cur.executemany(EXECUTEMANY_COMPANIES, companies)
+    cur.executemany(EXECUTEMANY_VACANCIES, [row[:2] + row[3:] for row in rows])
+
+
+def run(dbname: str, sizes: List[int]) -> None:
+    with connection(dbname) as conn:
+        for size in sizes:
+            rows = synthetic_rows(size)
+            results = {}
+            for name, load in (('executemany', load_executemany),
+                               ('copy', lambda cur, r: bulk_upsert_vacancies(cur, r, report=False)),
+                               ('execute_values', lambda cur, r: bulk_upsert_vacancies(cur, r, 'values', False))):
+                with conn.cursor() as cur:
+                    start = time.perf_counter()
+                    load(cur, rows)
+                    results[name] = time.perf_counter() - start
+                conn.rollback()
+            print(f"{size:>8} строк: " + ", ".join(
+                f"{name} {elapsed:.2f} с ({size / elapsed:.0f} строк/с)" for name, elapsed in results.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dbname")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_000, 50_000, 500_000])
+    args = parser.parse_args()
+    run(args.dbname, args.sizes)
@@ -0,0 +1,81 @@
+"""
+Сравнение задержки поиска по названию вакансии: ILIKE без индекса, ILIKE по триграммному индексу
+и ранжированный полнотекстовый поиск. Данные генерируются во временной таблице на сервере.
+
+Запуск (нужно расширение pg_trgm):
+    python -m benchmarks.bench_search <dbname> [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+from typing import List
+
+from src.connection.connection import connection
+
+WORDS = ['Python', 'Java', 'разработчик', 'аналитик', 'менеджер', 'инженер', 'тестировщик', 'данных',
+         'ведущий', 'старший', 'младший', 'DevOps', 'продаж', 'проекта', 'поддержки', 'backend', 'frontend']
+
+CREATE_TABLE = """
+    CREATE TEMP TABLE bench_vacancies AS
+    SELECT i AS vacancy_id,
+           (%(words)s::TEXT[])[1 + (i * 7) %% %(count)s] || ' ' || (%(words)s::TEXT[])[1 + (i * 13) %% %(count)s]
+               || ' ' || (%(words)s::TEXT[])[1 + (i * 31) %% %(count)s] || ' ' || i AS title
+    FROM generate_series(1, %(rows)s) AS i
+    """
+
+PREPARE = [
+    "ALTER TABLE bench_vacancies ADD COLUMN search_vector TSVECTOR GENERATED ALWAYS AS "
+    "(to_tsvector('russian', title) || to_tsvector('english', title)) STORED",
+    "ANALYZE bench_vacancies",
+]
+
+INDEXES = [
+    "CREATE INDEX ON bench_vacancies USING GIN (search_vector)",
+    "CREATE INDEX ON bench_vacancies USING GIN (title gin_trgm_ops)",
+    "ANALYZE bench_vacancies",
+]
+
+QUERIES = {
+    'ilike': "SELECT vacancy_id, title FROM bench_vacancies WHERE title ILIKE %s",
+    'fulltext': "SELECT vacancy_id, title FROM bench_vacancies, "
+                "(SELECT websearch_to_tsquery('russian', %s) || websearch_to_tsquery('english', %s) AS q) q "
+                "WHERE search_vector @@ q.q ORDER BY ts_rank(search_vector, q.q) DESC LIMIT 20",
+}
+
+
+def measure(cur, query: str, params: tuple, repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cur.execute(query, params)
+        cur.fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(dbname: str, rows: int, repeat: int, keyword: str) -> None:
+    with connection(dbname) as conn:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE, {'words': WORDS, 'count': len(WORDS), 'rows': rows})
+            for command in PREPARE:
+                cur.execute(command)
+            results = {'ilike без индекса': measure(cur, QUERIES['ilike'], (f'%{keyword}%',), repeat)}
+            for command in INDEXES:
+                cur.execute(command)
+            results['ilike + pg_trgm'] = measure(cur, QUERIES['ilike'], (f'%{keyword}%',), repeat)
+            results['tsvector + ts_rank'] = measure(cur, QUERIES['fulltext'], (keyword, keyword), repeat)
+        conn.rollback()
+
+    print(f"{rows} строк, запрос '{keyword}', медиана из {repeat}:")
+    for name, elapsed in results.items():
+        print(f"\t{name}: {elapsed * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dbname")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keyword", default="аналитик")
+    args = parser.parse_args()
+    run(args.dbname, args.rows, args.repeat, args.keyword)
@@ -0,0 +1,151 @@
+"""
+Нагрузочный тест HTTP-сервиса запросов (src.service.service): concurrency клиентов одновременно отправляют
+запросы по постоянным соединениям (keep-alive), и для каждого запроса измеряется время до получения ответа.
+Отчёт в JSON: задержка p50, p90, p99 и максимальная, количество запросов в секунду и ошибки.
+
+Запуск против работающего сервиса или с запуском сервиса для указанной базы:
+    python -m benchmarks.load_service --url http://127.0.0.1:8081 [--concurrency 200] [--requests 10000]
+    python -m benchmarks.load_service --dbname <база> [--cache-entries 0]
+Код завершения 1, если часть запросов завершилась ошибкой.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from urllib.parse import urlsplit, quote
+
+import numpy as np
+
+from benchmarks.startup import ROOT
+
+# Смесь запросов: меню DBManager и поиск по нескольким популярным словам
+DEFAULT_PATHS: List[str] = [
+    '/companies', '/salary-stats', '/avg-salary', '/vacancies/above-average',
+    '/vacancies/search?keyword=python', '/vacancies/search?keyword=java', '/vacancies/search?keyword=аналитик',
+    '/vacancies/search?keyword=менеджер&limit=20',
+]
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str,
+                  path: str) -> Tuple[int, bytes]:
+    """
+    Отправляет GET-запрос по открытому соединению и возвращает код и тело ответа.
+    """
+    writer.write(f"GET {quote(path, safe='/?=&')} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+    length = 0
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return int(status_line.split(' ')[1]), await reader.readexactly(length)
+
+
+async def client(host: str, port: int, paths: Sequence[str], count: int, offset: int,
+                 latencies: List[float], statuses: Counter) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for number in range(count):
+            start = time.perf_counter()
+            try:
+                status, _ = await request(reader, writer, host, paths[(offset + number) % len(paths)])
+            except (asyncio.IncompleteReadError, ConnectionError):
+                statuses['connection_error'] += 1
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def load_test(url: str, concurrency: int = 200, requests: int = 10_000,
+                    paths: Sequence[str] = DEFAULT_PATHS) -> Dict[str, Any]:
+    """
+    Отправляет requests запросов из concurrency одновременных соединений; запросы по кругу берутся из paths.
+    Возвращает:
+        dict: Задержки в миллисекундах (p50, p90, p99, max), запросов в секунду и количество ответов по кодам.
+    """
+    address = urlsplit(url)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    per_client = [requests // concurrency + (1 if number < requests % concurrency else 0)
+                  for number in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(address.hostname, address.port, paths, count, number, latencies, statuses)
+                           for number, count in enumerate(per_client) if count))
+    elapsed = time.perf_counter() - start
+
+    report: Dict[str, Any] = {'scenario': 'service.load', 'size': requests, 'concurrency': concurrency}
+    quantiles = np.percentile(latencies, [50, 90, 99, 100]) * 1000 if latencies else [None] * 4
+    for name, value in zip(('p50_ms', 'p90_ms', 'p99_ms', 'max_ms'), quantiles):
+        report[name] = round(float(value), 2) if value is not None else None
+    report['rps'] = round(len(latencies) / elapsed, 1) if elapsed > 0 else None
+    report['errors'] = sum(count for status, count in statuses.items() if status != 200)
+    report['statuses'] = {str(status): count for status, count in statuses.items()}
+    return report
+
+
+async def wait_ready(url: str, timeout: float = 10.0) -> None:
+    """
+    Ждёт, пока сервис начнёт отвечать на /health.
+    """
+    address = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(address.hostname, address.port)
+            try:
+                if (await request(reader, writer, address.hostname, '/health'))[0] == 200:
+                    return
+            finally:
+                writer.close()
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Сервис {url} не ответил за {timeout:g} с")
+        await asyncio.sleep(0.1)
+
+
+def start_service(dbname: str, port: int, pool_size: int, cache_entries: int) -> subprocess.Popen:
+    """
+    Запускает сервис в отдельном процессе, чтобы клиенты теста не делили с ним цикл событий.
+    """
+    return subprocess.Popen([sys.executable, 'main.py', 'serve', dbname, '--port', str(port),
+                             '--pool-size', str(pool_size), '--cache-entries', str(cache_entries)], cwd=ROOT)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="адрес работающего сервиса")
+    target.add_argument("--dbname", help="запустить сервис для этой базы")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--cache-entries", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--path", action='append', help="адрес запроса (можно несколько); по умолчанию смесь")
+    args = parser.parse_args(argv)
+
+    url = args.url or f'http://127.0.0.1:{args.port}'
+    process = start_service(args.dbname, args.port, args.pool_size, args.cache_entries) if args.dbname else None
+    try:
+        asyncio.run(wait_ready(url))
+        report = asyncio.run(load_test(url, args.concurrency, args.requests, args.path or DEFAULT_PATHS))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
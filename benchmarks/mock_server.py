@@ -0,0 +1,136 @@
+"""
+Локальная имитация API HH для бенчмарков: поиск /vacancies с фильтрами по работодателю и датам публикации,
+карточка /vacancies/{id} и справочник /dictionaries с курсами валют. Как настоящий API, отвечает 400 при
+запросе дальше MAX_DEPTH вакансий. Каждый ответ задерживается на latency секунд.
+
+Запуск отдельно (например, для ручной проверки main.py):
+    python -m benchmarks.mock_server [--vacancies 10000] [--latency 0.05] [--port 8080]
+"""
+import argparse
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.synthetic import generate_vacancies, make_detail, RATES
+
+MAX_DEPTH = 2000
+
+
+class MockHH:
+    """
+    Данные имитации API: вакансии, упорядоченные по дате публикации внутри каждого работодателя,
+    чтобы фильтр по датам выполнялся двоичным поиском, а не перебором.
+    """
+
+    def __init__(self, vacancies: List[Dict[str, Any]], latency: float = 0.0) -> None:
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.by_id = {vac['id']: vac for vac in vacancies}
+        self.by_employer: Dict[str, List[Tuple[datetime, Dict[str, Any]]]] = defaultdict(list)
+        for vac in vacancies:
+            self.by_employer[vac['employer']['id']].append((datetime.fromisoformat(vac['published_at']), vac))
+        for items in self.by_employer.values():
+            items.sort(key=lambda item: item[0])
+
+    def select(self, query: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        """
+        Возвращает вакансии по параметрам поиска, самые свежие первыми.
+        """
+        date_from = datetime.fromisoformat(query['date_from'][0]) if 'date_from' in query else None
+        date_to = datetime.fromisoformat(query['date_to'][0]) if 'date_to' in query else None
+        selected = []
+        for employer_id in query.get('employer_id', list(self.by_employer)):
+            items = self.by_employer.get(employer_id, [])
+            low = bisect.bisect_left(items, date_from, key=lambda item: item[0]) if date_from else 0
+            high = bisect.bisect_right(items, date_to, key=lambda item: item[0]) if date_to else len(items)
+            selected.extend(vac for _, vac in reversed(items[low:high]))
+        return selected
+
+    def respond(self, path: str) -> Tuple[int, Dict[str, Any]]:
+        """
+        Возвращает код и тело ответа на GET-запрос.
+        """
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+        url = urlparse(path)
+        query = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+        if parts[-1] == 'dictionaries':
+            return 200, {'currency': [{'code': code, 'rate': rate} for code, rate in RATES.items()]}
+        if parts[-1].isdigit():
+            vacancy = self.by_id.get(parts[-1])
+            return (200, make_detail(vacancy)) if vacancy else (404, {'errors': [{'type': 'not_found'}]})
+
+        per_page = int(query.get('per_page', ['20'])[0])
+        page = int(query.get('page', ['0'])[0])
+        if (page + 1) * per_page > MAX_DEPTH:
+            return 400, {'errors': [{'type': 'bad_argument', 'value': 'page'}]}
+        found = self.select(query)
+        return 200, {'items': found[page * per_page:(page + 1) * per_page], 'found': len(found),
+                     'pages': (len(found) + per_page - 1) // per_page, 'page': page, 'per_page': per_page}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        status, payload = self.server.mock.respond(self.path)
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class MockServer:
+    """
+    Контекстный менеджер, запускающий имитацию API в фоновом потоке.
+    Атрибуты url и dictionaries_url содержат адреса поиска вакансий и справочников.
+    """
+
+    def __init__(self, vacancies: List[Dict[str, Any]], latency: float = 0.0, port: int = 0) -> None:
+        self.mock = MockHH(vacancies, latency)
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), MockHandler)
+        self.server.daemon_threads = True
+        self.server.mock = self.mock
+        base = f'http://127.0.0.1:{self.server.server_port}'
+        self.url = f'{base}/vacancies'
+        self.dictionaries_url = f'{base}/dictionaries'
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacancies", type=int, default=10_000)
+    parser.add_argument("--employers", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    with MockServer(generate_vacancies(args.vacancies, args.employers), args.latency, args.port) as server:
+        print(f"Имитация API HH: {server.url} (Ctrl+C для остановки)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,195 @@
+"""
+Набор бенчмарков горячих путей: получение вакансий из API, загрузка в базу и запросы DBManager.
+
+Данные генерируются benchmarks.synthetic, API имитируется локальным сервером benchmarks.mock_server
+с задержкой --latency на каждый ответ. Каждый сценарий выполняется для всех размеров --sizes, результаты
+выводятся в JSON (или записываются в --output), чтобы сравнивать их между коммитами (--compare).
+
+Сценарии:
+    startup      — время импорта для путей запуска main.py и бюджет запуска (см. benchmarks.startup);
+    fetch        — get_vacancies_by_employer_ids через имитацию API (база не нужна);
+    fill_tables  — полная и повторная инкрементальная загрузка в базу;
+    dbmanager    — каждый запрос DBManager на загруженных данных.
+
+Сценарии fill_tables и dbmanager очищают таблицы указанной базы, поэтому им нужна отдельная база:
+    python -m benchmarks.run [--dbname bench_hh] [--sizes 1000 10000 50000] [--output result.json]
+Частота запросов к API ограничивается RateLimiter; чтобы измерять клиент, а не ограничение, задайте её явно:
+    HH_RATE_LIMIT=1000 python -m benchmarks.run ...
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable, Optional
+
+from benchmarks import startup
+from benchmarks.mock_server import MockServer
+from benchmarks.synthetic import generate_vacancies
+from src.api import rate_limit
+from src.api.hh_api import get_vacancies_by_employer_ids, MAX_WORKERS
+from src.connection.connection import connection
+from src.create_db.create_db import create_database, create_tables, fill_tables
+from src.dbmanager_class.dbmanager import DBManager
+
+EMPLOYERS = 10
+TRUNCATE = ("TRUNCATE companies, vacancies, sync_state, crawl_jobs, crawl_pages, vacancy_details, skills, "
+            "vacancy_skills RESTART IDENTITY CASCADE")
+
+QUERIES: Dict[str, Callable[[DBManager], Any]] = {
+    'get_companies_and_vacancies_count': lambda db: db.get_companies_and_vacancies_count(),
+    'get_company_salary_stats': lambda db: db.get_company_salary_stats(),
+    'get_all_vacancies': lambda db: db.get_all_vacancies(),
+    'get_vacancies_page': lambda db: db.get_vacancies_page(),
+    'get_avg_salary': lambda db: db.get_avg_salary(),
+    'get_vacancies_with_higher_salary': lambda db: db.get_vacancies_with_higher_salary(),
+    'get_vacancies_with_keyword': lambda db: db.get_vacancies_with_keyword('Python'),
+    'search_vacancies': lambda db: db.search_vacancies('python разработчик'),
+}
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Выполняет fn repeat раз и возвращает минимальное и медианное время в секундах.
+    Вывод fn подавляется, чтобы сообщения загрузки не смешивались с результатами.
+    """
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return {'min_s': round(min(timings), 6), 'median_s': round(statistics.median(timings), 6)}
+
+
+def result(scenario: str, size: int, repeat: int, timing: Dict[str, float], **extra: Any) -> Dict[str, Any]:
+    return {'scenario': scenario, 'size': size, 'repeat': repeat, **timing, **extra}
+
+
+def bench_fetch(server: MockServer, size: int, repeat: int, max_workers: int) -> List[Dict[str, Any]]:
+    employer_ids = [str(employer_id) for employer_id in range(1, EMPLOYERS + 1)]
+    requests_before = server.mock.requests
+    fetched: List[int] = []
+
+    def fetch() -> None:
+        fetched.append(len(get_vacancies_by_employer_ids(employer_ids, max_workers, server.url)))
+
+    timing = measure(fetch, repeat)
+    requests = (server.mock.requests - requests_before) // repeat
+    return [result('fetch', size, repeat, timing, rows=fetched[-1], requests=requests,
+                   rows_per_s=round(size / timing['median_s']))]
+
+
+def bench_database(server: MockServer, dbname: str, size: int, repeat: int) -> List[Dict[str, Any]]:
+    employer_ids = [str(employer_id) for employer_id in range(1, EMPLOYERS + 1)]
+
+    def truncate() -> None:
+        with connection(dbname) as conn, conn.cursor() as cur:
+            cur.execute(TRUNCATE)
+
+    def load(incremental: bool) -> None:
+        fill_tables(dbname, employer_ids, incremental, url=server.url, dictionaries_url=server.dictionaries_url)
+
+    results = []
+    timings = []
+    for _ in range(repeat):
+        truncate()
+        timings.append(measure(lambda: load(False), 1)['min_s'])
+    results.append(result('fill_tables', size, repeat,
+                          {'min_s': min(timings), 'median_s': statistics.median(timings)},
+                          rows_per_s=round(size / statistics.median(timings))))
+    results.append(result('fill_tables_incremental', size, repeat, measure(lambda: load(True), repeat)))
+
+    db_manager = DBManager(dbname=dbname)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_manager.connect(dbname=dbname)
+    try:
+        for name, query in QUERIES.items():
+            results.append(result(f'dbmanager.{name}', size, repeat, measure(lambda: query(db_manager), repeat)))
+    finally:
+        db_manager.disconnect()
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: List[int], dbname: Optional[str] = None, latency: float = 0.01, repeat: int = 3,
+        max_workers: int = MAX_WORKERS, seed: int = 0) -> Dict[str, Any]:
+    """
+    Выполняет сценарии для каждого размера и возвращает отчёт: метаданные запуска и список результатов.
+    Без dbname выполняется только сценарий fetch.
+    """
+    if dbname is not None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_database(dbname)
+            create_tables(dbname)
+
+    results: List[Dict[str, Any]] = startup.check(repeat)
+    for item in results:
+        if not item['ok']:
+            print(f"Превышен бюджет запуска {item['scenario']}: {item['import_ms']} мс из {item['budget_ms']} мс, "
+                  f"загружены {item['forbidden_loaded']}", file=sys.stderr)
+    for size in sizes:
+        with MockServer(generate_vacancies(size, EMPLOYERS, seed), latency) as server:
+            results.extend(bench_fetch(server, size, repeat, max_workers))
+            if dbname is not None:
+                results.extend(bench_database(server, dbname, size, repeat))
+        print(f"Размер {size}: готово", file=sys.stderr)
+
+    return {
+        'revision': git_revision(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'params': {'sizes': sizes, 'latency': latency, 'repeat': repeat, 'max_workers': max_workers, 'seed': seed,
+                   'rate_limit': rate_limit.RATE},
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Возвращает строки сравнения медианного времени с базовым отчётом (отношение больше 1 — замедление).
+    """
+    base = {(item['scenario'], item['size']): item['median_s'] for item in baseline['results']}
+    lines = []
+    for item in report['results']:
+        before = base.get((item['scenario'], item['size']))
+        if before:
+            lines.append(f"{item['scenario']:<45} {item['size']:>8} {before:>10.4f} с -> {item['median_s']:>10.4f} с "
+                         f"(x{item['median_s'] / before:.2f})")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dbname", help="отдельная база для сценариев fill_tables и dbmanager")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--latency", type=float, default=0.01, help="задержка ответа имитации API, с")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл для отчёта JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", help="отчёт JSON предыдущего запуска для сравнения")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.dbname, args.latency, args.repeat, args.workers, args.seed)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            print("\n".join(compare(report, json.load(file))), file=sys.stderr)
@@ -0,0 +1,102 @@
+"""
+Проверка времени запуска: сколько занимает импорт модулей для каждого пути запуска main.py
+(по данным python -X importtime) и какие тяжёлые зависимости при этом загружаются.
+
+Для каждого пути задан бюджет времени импорта BUDGET_MS и список модулей, которые на нём загружаться не должны
+(например, requests для команд, только читающих базу). Запуск:
+    python -m benchmarks.startup [--repeat 5]
+Код завершения 1, если какой-либо путь вышел за бюджет или загрузил запрещённый модуль.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Dict, Any, Tuple, FrozenSet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Путь запуска: (код, который выполняется при запуске, модули, которые не должны загружаться)
+PATHS: Dict[str, Tuple[str, List[str]]] = {
+    'main': ("import main", ['requests', 'psycopg2', 'numpy', 'asyncpg', 'http.server', 'cProfile']),
+    'cli_query': ("from src.cli import cli; cli.build_parser().parse_args(['stats', 'hh']); "
+                  "import src.dbmanager_class.dbmanager", ['requests', 'numpy', 'asyncpg', 'http.server',
+                                                           'cProfile']),
+    'cli_sync': ("from src.cli import cli; cli.build_parser().parse_args(['sync', 'hh']); "
+                 "import src.create_db.create_db, src.create_db.enrich, src.api.http_cache", []),
+}
+# Бюджет суммарного времени импорта модулей проекта и зависимостей, мс (без запуска самого интерпретатора)
+BUDGET_MS: Dict[str, float] = {'main': 40, 'cli_query': 120, 'cli_sync': 400}
+
+
+def parse_importtime(output: str, skip: FrozenSet[str] = frozenset()) -> Tuple[float, List[str]]:
+    """
+    Разбирает вывод python -X importtime.
+    Параметры:
+        output (str): Вывод интерпретатора в stderr.
+        skip (frozenset): Модули, импортируемые при запуске интерпретатора (site и т. п.); их время не учитывается.
+    Возвращает:
+        tuple: Суммарное время импорта модулей верхнего уровня в миллисекундах и список всех импортированных модулей.
+    """
+    total_us = 0
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        # Модули верхнего уровня записаны с одним пробелом после '|', вложенные — с отступом
+        if not name.startswith('  ') and name.strip() not in skip:
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def importtime(code: str) -> str:
+    """
+    Выполняет code в новом интерпретаторе с -X importtime и возвращает его вывод в stderr.
+    """
+    return subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          capture_output=True, text=True, check=True).stderr
+
+
+def measure_path(code: str, repeat: int = 5) -> Tuple[float, List[str]]:
+    """
+    Выполняет code в новом интерпретаторе repeat раз и возвращает медианное время импорта (мс) и модули,
+    не считая импортированных при запуске интерпретатора.
+    """
+    _, startup = parse_importtime(importtime('pass'))
+    timings = []
+    modules: List[str] = []
+    for _ in range(repeat):
+        import_ms, modules = parse_importtime(importtime(code), frozenset(startup))
+        timings.append(import_ms)
+    return statistics.median(timings), [module for module in modules if module not in startup]
+
+
+def check(repeat: int = 5) -> List[Dict[str, Any]]:
+    """
+    Измеряет все пути PATHS и сравнивает их с бюджетом.
+    Возвращает:
+        list: Для каждого пути: время импорта, бюджет, загруженные запрещённые модули и признак соблюдения бюджета
+        в формате результатов benchmarks.run (размер 0), чтобы время запуска сравнивалось между коммитами.
+    """
+    results = []
+    for name, (code, forbidden) in PATHS.items():
+        import_ms, modules = measure_path(code, repeat)
+        loaded = sorted(set(forbidden) & set(modules))
+        results.append({'scenario': f'startup.{name}', 'size': 0, 'repeat': repeat,
+                        'median_s': round(import_ms / 1000, 6), 'import_ms': round(import_ms, 1),
+                        'budget_ms': BUDGET_MS[name], 'forbidden_loaded': loaded,
+                        'ok': import_ms <= BUDGET_MS[name] and not loaded})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = check(args.repeat)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if all(item['ok'] for item in report) else 1)
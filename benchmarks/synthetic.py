@@ -0,0 +1,74 @@
+"""
+Генератор синтетических вакансий в формате выдачи API HH (поиск /vacancies и карточка /vacancies/{id}).
+Одинаковые параметры и seed дают одинаковые данные, поэтому результаты бенчмарков сравнимы между коммитами.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+
+TITLES = ['Python разработчик', 'Java разработчик', 'Аналитик данных', 'DevOps инженер', 'Тестировщик',
+          'Менеджер проекта', 'Backend developer', 'Frontend developer', 'Data Scientist', 'Системный администратор']
+LEVELS = ['', 'Младший ', 'Старший ', 'Ведущий ']
+CURRENCIES = [('RUR', 0.8), ('USD', 0.1), ('EUR', 0.1)]
+SKILLS = ['Python', 'SQL', 'PostgreSQL', 'Django', 'Docker', 'Git', 'Linux', 'Kubernetes', 'Java', 'Kafka']
+EXPERIENCE = [('noExperience', 'Нет опыта'), ('between1And3', 'От 1 года до 3 лет'),
+              ('between3And6', 'От 3 до 6 лет'), ('moreThan6', 'Более 6 лет')]
+AREAS = [('1', 'Москва'), ('2', 'Санкт-Петербург'), ('4', 'Новосибирск'), ('88', 'Казань')]
+RATES = {'RUR': 1.0, 'USD': 0.011, 'EUR': 0.01}
+PERIOD_DAYS = 30
+
+
+def make_vacancy(vacancy_id: int, employer_id: int, rng: random.Random, published_at: datetime) -> Dict[str, Any]:
+    """
+    Создаёт вакансию в формате элемента выдачи поиска API HH.
+    """
+    salary: Optional[Dict[str, Any]] = None
+    if rng.random() < 0.7:
+        currency = rng.choices([code for code, _ in CURRENCIES], [weight for _, weight in CURRENCIES])[0]
+        low = round(rng.randrange(40_000, 400_000, 5_000) * RATES[currency])
+        salary = {'from': None if rng.random() < 0.1 else low,
+                  'to': rng.choice([None, round(low * rng.uniform(1.1, 1.6))]),
+                  'currency': currency, 'gross': rng.random() < 0.3}
+    return {
+        'id': str(vacancy_id),
+        'name': f'{rng.choice(LEVELS)}{rng.choice(TITLES)}',
+        'employer': {'id': str(employer_id), 'name': f'Компания {employer_id}'},
+        'salary': salary,
+        'alternate_url': f'https://hh.ru/vacancy/{vacancy_id}',
+        'published_at': published_at.isoformat(timespec='seconds'),
+        'area': {'id': AREAS[vacancy_id % len(AREAS)][0], 'name': AREAS[vacancy_id % len(AREAS)][1]},
+    }
+
+
+def make_detail(vacancy: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Дополняет вакансию полями карточки /vacancies/{id}: описанием, ключевыми навыками, опытом и графиком.
+    """
+    rng = random.Random(int(vacancy['id']))
+    experience_id, experience = rng.choice(EXPERIENCE)
+    return {
+        **vacancy,
+        'description': f'<p>{vacancy["name"]}. ' + ' '.join(rng.choices(SKILLS, k=40)) + '</p>',
+        'key_skills': [{'name': name} for name in rng.sample(SKILLS, rng.randint(0, 6))],
+        'experience': {'id': experience_id, 'name': experience},
+        'schedule': {'id': 'fullDay', 'name': 'Полный день'},
+        'employment': {'id': 'full', 'name': 'Полная занятость'},
+    }
+
+
+def generate_vacancies(count: int, employers: int = 10, seed: int = 0,
+                       now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Создаёт count вакансий employers работодателей (идентификаторы 1..employers), опубликованных
+    равномерно за последние PERIOD_DAYS дней. Работодатели неравные: первый получает около трети вакансий,
+    поэтому при большом count его выдача превышает ограничение API и делится по датам.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc).replace(microsecond=0)
+    period = timedelta(days=PERIOD_DAYS).total_seconds()
+    vacancies = []
+    for i in range(count):
+        employer_id = 1 if rng.random() < 1 / 3 else rng.randint(1, employers)
+        published_at = now - timedelta(seconds=rng.uniform(0, period))
+        vacancies.append(make_vacancy(1_000_000 + i, employer_id, rng, published_at))
+    return vacancies
@@ -1,13 +1,16 @@
-from src.dbmanager_class.dbmanager import DBManager
-from src.create_db.create_db import create_tables, create_database, fill_tables
+import os
+import sys
 from src.color.color import Color
+from src.cli.cli import DEFAULT_EMPLOYER_IDS, is_valid_dbname
+from src.metrics import metrics
+from typing import Optional, Callable, Any, List, Tuple
 
 
-def print_menu():
+def print_menu(dedup: bool = False):
     """
     Печатает меню опций для взаимодействия с базой данных. Эта функция отображает меню опций пользователю для
     выполнения различных операций с базой данных.
-    Эта функция не принимает параметров и ничего не возвращает.
+    Параметр dedup — текущее состояние переключателя 6 (учёт почти одинаковых вакансий как одной).
     """
     print("\nВведите, что вы хотите сделать с базой данных:")
     print("\t1. Вывести компанию и количество вакансий")
@@ -15,9 +18,46 @@ def print_menu():
     print("\t3. Вывести среднюю зарплату")
     print("\t4. Вывести вакансии с зарплатой выше среднего")
     print("\t5. Вывести вакансии в названии которых есть определенное слово")
+    print(f"\t6. Считать почти одинаковые вакансии одной (пункты 1, 3, 4): "
+          f"{Color.GREEN + 'вкл' if dedup else Color.RED + 'выкл'}{Color.END}")
     print("\t0. Выйти из программы")
 
 
+def print_vacancy(company: str, title: str, salary_from: Optional[int], salary_to: Optional[int], link: str) -> None:
+    """
+    Печатает одну вакансию: компанию, название, зарплату в рублях (или отметку, что она не указана) и ссылку.
+    """
+    if salary_from is None and salary_to is None:
+        print(f"{company}: {title} - {Color.U}Зарплата не указана{Color.U_} - {link}")
+    elif salary_from is None:
+        print(f"{company}: {title} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
+    elif salary_to is None or salary_from == salary_to:
+        print(f"{company}: {title} - {Color.U}{salary_from} руб.{Color.U_} - {link}")
+    else:
+        print(f"{company}: {title} - "
+              f"{Color.U}{salary_from}{Color.U_} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
+
+
+def print_pages(fetch_page: Callable[[Any], Tuple[List[Tuple], Any]]) -> int:
+    """
+    Печатает вакансии постранично: после каждой страницы спрашивает, показывать ли следующую.
+    Параметры:
+        fetch_page (Callable): Функция, которая по курсору (None для первой страницы) возвращает
+            список вакансий страницы и курсор следующей страницы (None, если страница последняя).
+    Возвращает:
+        int: Количество напечатанных вакансий.
+    """
+    printed = 0
+    cursor = None
+    while True:
+        vacancies, cursor = fetch_page(cursor)
+        for vacancy in vacancies:
+            print_vacancy(*vacancy)
+        printed += len(vacancies)
+        if cursor is None or input("Показать ещё? (y/n): ").lower() != "y":
+            return printed
+
+
 def main():
     """
     Запускает программу, в которой пользователь может взаимодействовать с менеджером базы данных для
@@ -28,14 +68,23 @@ def main():
     3. Вычислить и отобразить среднюю зарплату.
     4. Отобразить список вакансий с зарплатой выше среднего.
     5. Поиск вакансий по ключевому слову.
+    6. Включение и выключение учёта почти одинаковых вакансий как одной (src.create_db.dedup) в пунктах 1, 3 и 4.
     0. Выход из программы.
     Функция непрерывно отображает меню и выполняет выбранную пользователем операцию на основе его выбора.
     После того, как пользователь выбирает выйти, функция отключается от менеджера базы данных.
+    Для запуска без вопросов (cron, конвейеры) используется интерфейс командной строки src.cli.cli:
+    python main.py sync|stats|search|export ...
     """
+    # psycopg2 и requests импортируются здесь, а не при импорте main.py: команды src.cli.cli загружают
+    # только то, что им нужно (см. benchmarks/startup.py)
+    from src.api.http_cache import HTTPCache
+    from src.create_db.create_db import create_tables, create_database, fill_tables
+    from src.dbmanager_class.dbmanager import DBManager
+
     while True:
         dbname = input("Введите имя базы данных: ")
         #  Проверка ввода имени базы, если первая цифра, или кириллица, заглавная буква, выдаст ошибку
-        if not dbname[0].isdigit() and dbname.isascii() and dbname[0].islower():
+        if is_valid_dbname(dbname):
             break
         else:
             print(f"{Color.RED}Первый символ имени базы данных PostgreSQL не может быть:"
@@ -46,77 +95,56 @@ def main():
     create_database(dbname)
     create_tables(dbname)
 
-    #  Выбраны 10 компаний
-    fill_tables(dbname, ['3529', '78638', '80', '673', '2180', '4181', '2748', '3776', '1740', '15478'])
+    #  Метрики загрузки и запросов доступны по HTTP, если задан порт, и записываются в файл при выходе
+    if os.environ.get('HH_METRICS_PORT'):
+        metrics.serve(int(os.environ['HH_METRICS_PORT']))
+
+    #  Выбраны 10 компаний, при повторном запуске загружаются только изменения,
+    #  а неизменившиеся страницы API берутся из кэша на диске.
+    #  Подробные данные (обогащение) запрашиваются отдельным запросом на каждую вакансию и задержали бы меню на минуты,
+    #  поэтому они загружаются командой `python main.py sync <база>`
+    cache = HTTPCache()
+    fill_tables(dbname, DEFAULT_EMPLOYER_IDS, incremental=True, cache=cache)
+    cache.close()
 
     db_manager = DBManager(dbname=dbname)
     db_manager.connect(dbname=dbname)
 
+    dedup = False
     while True:
-        print_menu()
+        print_menu(dedup)
         choice = input("Ваш выбор: ")
 
         if choice == "1":
-            companies_and_vacancies = db_manager.get_companies_and_vacancies_count()
+            companies_and_vacancies = db_manager.get_companies_and_vacancies_count(dedup=dedup)
             print("\nКомпания - Количество вакансий:")
             for company, vacancies_count in companies_and_vacancies:
                 print(f"{company}: {Color.U}{vacancies_count}{Color.U_} вакансий")
 
         elif choice == "2":
-            all_vacancies = db_manager.get_all_vacancies()
             print("\nСписок всех вакансий:")
-            for company, title, salary_from, salary_to, link in all_vacancies:
-                if salary_from == "Зарплата не указана":
-                    print(f"{company}: {title} - {Color.U}{salary_from}{Color.U_} - {link}")
-                elif salary_from == salary_to:
-                    print(f"{company}: {title} - {Color.U}{salary_from} руб.{Color.U_} - {link}")
-                elif salary_from is None:
-                    print(f"{company}: {title} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
-                elif salary_to is None:
-                    print(f"{company}: {title} - {Color.U}{salary_from} руб.{Color.U_} - {link}")
-                else:
-                    print(f"{company}: {title} - "
-                          f"{Color.U}{salary_from}{Color.U_} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
+            print_pages(lambda after_id: db_manager.get_vacancies_page(after_id))
 
         elif choice == "3":
-            avg_salary = db_manager.get_avg_salary()
+            avg_salary = db_manager.get_avg_salary(dedup=dedup)
             print(f"\nСредняя зарплата: {Color.U}{avg_salary} руб.{Color.U_}")
 
         elif choice == "4":
-            high_salary_vacancies = db_manager.get_vacancies_with_higher_salary()
+            high_salary_vacancies = db_manager.get_vacancies_with_higher_salary(dedup=dedup)
             print("\nВакансии с зарплатой выше среднего:")
-            for company, title, salary_from, salary_to, link in high_salary_vacancies:
-                if salary_from is None:
-                    print(f"{company}: {title} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
-                elif salary_to is None:
-                    print(f"{company}: {title} - {Color.U}{salary_from} руб.{Color.U_} - {link}")
-                elif salary_from == salary_to:
-                    print(f"{company}: {title} - {Color.U}{salary_from} руб.{Color.U_} - {link}")
-                else:
-                    print(f"{company}: {title} - "
-                          f"{Color.U}{salary_from}{Color.U_} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
+            for vacancy in high_salary_vacancies:
+                print_vacancy(*vacancy)
 
         elif choice == "5":
             keyword = input("Введите слово для поиска: ")
-            vacancies_with_keyword = db_manager.get_vacancies_with_keyword(keyword)
             print(f"\nВакансии с названием, содержащим слово '{Color.GREEN}{keyword}{Color.END}':")
 
-            if not vacancies_with_keyword:
+            if not print_pages(lambda cursor: db_manager.search_vacancies(keyword, cursor=cursor)):
                 print(f"\nВакансии с названием, содержащим слово '{Color.GREEN}{keyword}{Color.END}' "
                       f"{Color.RED}не найдены.{Color.END}")
-            else:
-                for company, title, salary_from, salary_to, link in vacancies_with_keyword:
-                    if salary_from == "Зарплата не указана":
-                        print(f"{company}: {title} - {Color.U}{salary_from}{Color.U_} - {link}")
-                    elif salary_from is None:
-                        print(f"{company}: {title} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
-                    elif salary_to is None:
-                        print(f"{company}: {title} - {Color.U}{salary_from} руб.{Color.U_} - {link}")
-                    elif salary_from == salary_to:
-                        print(f"{company}: {title} - {Color.U}{salary_from} руб.{Color.U_} - {link}")
-                    else:
-                        print(f"{company}: {title} - "
-                              f"{Color.U}{salary_from}{Color.U_} - {Color.U}{salary_to} руб.{Color.U_} - {link}")
+
+        elif choice == "6":
+            dedup = not dedup
 
         elif choice == "0":
             print(f"{Color.GREEN}Программа завершена.{Color.END}")
@@ -125,10 +153,15 @@ def main():
         else:
             print(
                 f"{Color.RED}Некорректный ввод. Пожалуйста, выберите опцию от "
-                f"{Color.U}0{Color.U_} {Color.RED}до {Color.U}5{Color.U_}{Color.RED}.{Color.END}")
+                f"{Color.U}0{Color.U_} {Color.RED}до {Color.U}6{Color.U_}{Color.RED}.{Color.END}")
 
     db_manager.disconnect()
+    if os.environ.get('HH_METRICS_FILE'):
+        metrics.dump_json(os.environ['HH_METRICS_FILE'])
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from src.cli.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
     main()
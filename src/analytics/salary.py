@@ -0,0 +1,321 @@
+import io
+import threading
+from typing import List, Dict, Tuple, Any, Optional, NamedTuple, Sequence
+
+import numpy as np
+
+from src.metrics import metrics
+
+QUANTILES: Tuple[float, ...] = (0.1, 0.25, 0.5, 0.75, 0.9)  # Перцентили зарплат в отчётах
+HISTOGRAM_BINS: int = 20  # Количество интервалов гистограммы зарплат по умолчанию
+NULL_SALARY: int = -1  # Значение, которым NULL-зарплата передаётся в двоичном COPY
+DENSE_KEY_LIMIT: int = 1 << 24  # Ключи групп меньше этого значения нумеруются без сортировки (см. dense_codes)
+
+# Все активные вакансии с зарплатой: компания, код названия (номер в отсортированном списке названий),
+# зарплаты в рублях. NULL заменяется на NULL_SALARY, чтобы каждая строка COPY имела одинаковую длину
+# и разбиралась одним np.frombuffer.
+SALARIES_COPY: str = """
+    COPY (
+        WITH titles AS (
+            SELECT title, (row_number() OVER (ORDER BY title) - 1)::INTEGER AS code
+            FROM (SELECT DISTINCT title FROM vacancies WHERE NOT archived) t
+        )
+        SELECT v.company_id, t.code,
+               COALESCE(v.salary_from_rub, {null}), COALESCE(v.salary_to_rub, {null})
+        FROM vacancies v JOIN titles t ON t.title = v.title
+        WHERE NOT v.archived AND (v.salary_from_rub IS NOT NULL OR v.salary_to_rub IS NOT NULL)
+    ) TO STDOUT WITH (FORMAT binary)
+    """.format(null=NULL_SALARY)
+TITLES: str = "SELECT DISTINCT title FROM vacancies WHERE NOT archived ORDER BY title"
+COMPANIES: str = "SELECT company_id, name FROM companies"
+
+COPY_SIGNATURE: bytes = b'PGCOPY\n\xff\r\n\x00'
+# Строка двоичного COPY из четырёх столбцов INTEGER: количество полей и для каждого поля длина и значение
+COPY_ROW = np.dtype([('fields', '>i2'),
+                     ('company_len', '>i4'), ('company_id', '>i4'),
+                     ('title_len', '>i4'), ('title_code', '>i4'),
+                     ('from_len', '>i4'), ('salary_from', '>i4'),
+                     ('to_len', '>i4'), ('salary_to', '>i4')])
+
+
+class SalaryFrame(NamedTuple):
+    """
+    Зарплаты активных вакансий столбцами NumPy. Отсутствующая граница зарплаты — NaN.
+    """
+    company_ids: np.ndarray
+    title_codes: np.ndarray
+    salary_from: np.ndarray
+    salary_to: np.ndarray
+    titles: List[str]
+    companies: Dict[int, str]
+
+
+class GroupStats(NamedTuple):
+    keys: np.ndarray
+    counts: np.ndarray
+    means: np.ndarray
+    quantiles: np.ndarray  # Форма (количество групп, len(QUANTILES))
+
+
+def parse_copy_binary(data: bytes) -> np.ndarray:
+    """
+    Разбирает вывод COPY ... TO STDOUT WITH (FORMAT binary) из строк формата COPY_ROW без цикла по строкам.
+    Вызывает:
+        ValueError: Если данные не являются двоичным COPY или строки имеют другой формат.
+    """
+    if not data.startswith(COPY_SIGNATURE):
+        raise ValueError("Неверная сигнатура двоичного COPY")
+    extension = int.from_bytes(data[15:19], 'big')
+    body = data[19 + extension:-2]  # Без заголовка и завершающего маркера -1
+    if len(body) % COPY_ROW.itemsize:
+        raise ValueError("Длина данных COPY не кратна длине строки")
+    rows = np.frombuffer(body, dtype=COPY_ROW)
+    if len(rows) and ((rows['fields'] != 4).any() or (rows['company_len'] != 4).any()
+                      or (rows['from_len'] != 4).any() or (rows['to_len'] != 4).any()):
+        raise ValueError("Строки COPY не совпадают с форматом COPY_ROW")
+    return rows
+
+
+def to_salary(values: np.ndarray) -> np.ndarray:
+    """
+    Переводит зарплаты из COPY в float64, NULL_SALARY становится NaN.
+    """
+    salary = values.astype(np.float64)
+    salary[values == NULL_SALARY] = np.nan
+    return salary
+
+
+def load_salaries(cur) -> SalaryFrame:
+    """
+    Загружает зарплаты всех активных вакансий одним двоичным COPY.
+    Запросы выполняются в одной транзакции REPEATABLE READ, поэтому коды названий совпадают со списком
+    названий, даже если параллельно идёт загрузка.
+    """
+    with metrics.span('analytics_load'):
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        buffer = io.BytesIO()
+        cur.copy_expert(SALARIES_COPY, buffer)
+        cur.execute(TITLES)
+        titles = [title for title, in cur.fetchall()]
+        cur.execute(COMPANIES)
+        companies = dict(cur.fetchall())
+        cur.connection.commit()
+
+        rows = parse_copy_binary(buffer.getvalue())
+    metrics.inc('analytics_rows_loaded_total', len(rows))
+    return SalaryFrame(rows['company_id'].astype(np.int64), rows['title_code'].astype(np.int64),
+                       to_salary(rows['salary_from']), to_salary(rows['salary_to']), titles, companies)
+
+
+def midpoints(salary_from: np.ndarray, salary_to: np.ndarray) -> np.ndarray:
+    """
+    Оценка зарплаты по вилке: середина, если указаны обе границы, иначе указанная граница (NaN, если нет обеих).
+    """
+    return np.where(np.isnan(salary_from), salary_to,
+                    np.where(np.isnan(salary_to), salary_from, (salary_from + salary_to) / 2))
+
+
+def dense_codes(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Нумерует ключи групп подряд с нуля. Неотрицательные ключи меньше DENSE_KEY_LIMIT нумеруются через таблицу
+    присутствия без сортировки, остальные — через np.unique.
+    Возвращает:
+        tuple: Отсортированные уникальные ключи и номер группы для каждого элемента keys.
+    """
+    if not len(keys) or keys.min() < 0 or keys.max() >= DENSE_KEY_LIMIT:
+        unique, codes = np.unique(keys, return_inverse=True)
+        return unique, codes.reshape(-1)
+    present = np.zeros(int(keys.max()) + 1, dtype=bool)
+    present[keys] = True
+    numbers = np.cumsum(present, dtype=np.int32) - 1
+    return np.flatnonzero(present), numbers[keys]
+
+
+def group_stats(keys: np.ndarray, values: np.ndarray, quantiles: Sequence[float] = QUANTILES) -> GroupStats:
+    """
+    Считает для каждой группы количество значений, среднее и перцентили (линейная интерполяция,
+    как percentile_cont в PostgreSQL и np.percentile). NaN не учитываются.
+    Описание:
+        Значения сортируются по возрастанию, затем устойчивой сортировкой по номеру группы (для номеров
+        до 65535 NumPy сортирует их поразрядно); после этого каждая группа — непрерывный отрезок
+        упорядоченных значений, и перцентиль каждой группы берётся по индексу внутри отрезка. Все шаги
+        выполняются над массивами целиком, без цикла по группам.
+    """
+    present = ~np.isnan(values)
+    keys, values = keys[present], values[present]
+    unique, codes = dense_codes(keys)
+    order = np.argsort(values)
+    codes = codes[order].astype(np.uint16 if len(unique) <= 1 << 16 else np.int64)
+    values = values[order][np.argsort(codes, kind='stable')]
+
+    counts = np.bincount(codes, minlength=len(unique))
+    starts = np.cumsum(counts) - counts
+    sums = np.add.reduceat(values, starts) if len(values) else np.zeros(0)
+    positions = starts[:, None] + np.asarray(quantiles)[None, :] * (counts[:, None] - 1)
+    low = np.floor(positions).astype(np.int64)
+    high = np.ceil(positions).astype(np.int64)
+    result = values[low] + (values[high] - values[low]) * (positions - low) if len(values) else \
+        np.zeros((0, len(quantiles)))
+    return GroupStats(unique, counts, sums / np.maximum(counts, 1), result)
+
+
+def histogram_edges(values: np.ndarray, bins: int = HISTOGRAM_BINS) -> np.ndarray:
+    """
+    Границы интервалов гистограммы: bins равных интервалов между 1-м и 99-м перцентилем всех значений,
+    чтобы единичные выбросы не сжимали гистограмму в один столбец. Значения за границами попадают
+    в крайние интервалы.
+    """
+    present = values[~np.isnan(values)]
+    if not len(present):
+        return np.linspace(0, 1, bins + 1)
+    low, high = np.percentile(present, [1, 99])
+    if high <= low:
+        high = low + 1
+    return np.linspace(low, high, bins + 1)
+
+
+def group_histograms(keys: np.ndarray, values: np.ndarray, edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Считает гистограммы значений для всех групп одним np.bincount.
+    Возвращает:
+        tuple: Ключи групп и матрица количеств формы (количество групп, len(edges) - 1).
+    """
+    present = ~np.isnan(values)
+    keys, values = keys[present], values[present]
+    unique, group = dense_codes(keys)
+    bins = len(edges) - 1
+    index = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+    counts = np.bincount(group * bins + index, minlength=len(unique) * bins)
+    return unique, counts.reshape(len(unique), bins)
+
+
+class SalaryAnalytics:
+    """
+    Аналитика зарплат: перцентили, средние и гистограммы по компаниям и названиям вакансий.
+    Описание:
+        Зарплаты активных вакансий загружаются одним двоичным COPY в массивы NumPy (load_salaries), и все
+        расчёты выполняются векторно, поэтому время расчёта на миллионах строк определяется чтением данных,
+        а не циклами Python. Оценка зарплаты вакансии ('midpoint') — середина вилки или указанная граница;
+        'from' — только нижняя граница, как в get_avg_salary.
+        Загруженные данные и результаты кэшируются до следующей загрузки: номер загрузки читается из таблицы
+        'load_generation', которую увеличивает refresh_stats, и при его изменении кэш сбрасывается.
+        Источник данных задают методы generation и load; SnapshotAnalytics (src.export.snapshot) считает
+        ту же статистику по снимку на диске без обращения к базе.
+    Параметры:
+        conn: Соединение psycopg2 с базой вакансий.
+    """
+
+    def __init__(self, conn) -> None:
+        self.conn = conn
+        self._generation: Optional[int] = None
+        self._frame: Optional[SalaryFrame] = None
+        self._results: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        """
+        Возвращает номер последней загрузки данных.
+        """
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT generation FROM load_generation")
+            row = cur.fetchone()
+        self.conn.commit()
+        return row[0] if row is not None else 0
+
+    def load(self) -> SalaryFrame:
+        """
+        Загружает зарплаты из базы (load_salaries).
+        """
+        with self.conn.cursor() as cur:
+            return load_salaries(cur)
+
+    def frame(self) -> SalaryFrame:
+        """
+        Возвращает зарплаты, загружая их заново, только если после предыдущей загрузки данные обновились.
+        """
+        generation = self.generation()
+        with self._lock:
+            if self._frame is None or generation != self._generation:
+                self._frame = self.load()
+                self._generation = generation
+                self._results.clear()
+                metrics.inc('analytics_cache_total', result='miss')
+            else:
+                metrics.inc('analytics_cache_total', result='hit')
+            return self._frame
+
+    def _cached(self, key: Tuple[Any, ...], compute) -> Any:
+        frame = self.frame()
+        with self._lock:
+            if key not in self._results:
+                self._results[key] = compute(frame)
+            return self._results[key]
+
+    @staticmethod
+    def _values(frame: SalaryFrame, basis: str) -> np.ndarray:
+        if basis == 'midpoint':
+            return midpoints(frame.salary_from, frame.salary_to)
+        if basis == 'from':
+            return frame.salary_from
+        raise ValueError(f"Неизвестная оценка зарплаты: {basis}")
+
+    @staticmethod
+    def _names(frame: SalaryFrame, by: str) -> Tuple[np.ndarray, Any]:
+        if by == 'company':
+            return frame.company_ids, lambda key: frame.companies.get(int(key), str(key))
+        if by == 'title':
+            return frame.title_codes, lambda key: frame.titles[int(key)]
+        raise ValueError(f"Неизвестная группировка: {by}")
+
+    def stats(self, by: str = 'company', basis: str = 'midpoint',
+              min_count: int = 1) -> List[Tuple[str, int, float, float, float, float, float, float]]:
+        """
+        Возвращает статистику зарплат по группам, по убыванию количества вакансий.
+        Параметры:
+            by (str): 'company' — по компаниям, 'title' — по названиям вакансий.
+            basis (str): 'midpoint' — середина вилки, 'from' — нижняя граница.
+            min_count (int): Группы с меньшим количеством зарплат пропускаются.
+        Возвращает:
+            list: Кортежи (название, количество, среднее, p10, p25, медиана, p75, p90).
+        """
+        def compute(frame: SalaryFrame):
+            keys, name = self._names(frame, by)
+            result = group_stats(keys, self._values(frame, basis))
+            order = np.argsort(-result.counts, kind='stable')
+            return [(name(result.keys[i]), int(result.counts[i]), round(float(result.means[i]), 2),
+                     *(round(float(value), 2) for value in result.quantiles[i]))
+                    for i in order if result.counts[i] >= min_count]
+
+        return self._cached(('stats', by, basis, min_count), compute)
+
+    def summary(self, basis: str = 'midpoint') -> Dict[str, Optional[float]]:
+        """
+        Возвращает количество зарплат, среднее и перцентили QUANTILES по всем активным вакансиям.
+        """
+        def compute(frame: SalaryFrame):
+            values = self._values(frame, basis)
+            result = group_stats(np.zeros(len(values), dtype=np.int64), values)
+            if not len(result.counts):
+                return {'count': 0, 'mean': None, **{f'p{round(q * 100)}': None for q in QUANTILES}}
+            percentiles = zip(QUANTILES, result.quantiles[0])
+            return {'count': int(result.counts[0]), 'mean': round(float(result.means[0]), 2),
+                    **{f'p{round(q * 100)}': round(float(value), 2) for q, value in percentiles}}
+
+        return self._cached(('summary', basis), compute)
+
+    def histograms(self, by: str = 'company', basis: str = 'midpoint',
+                   bins: int = HISTOGRAM_BINS) -> Tuple[List[float], List[Tuple[str, List[int]]]]:
+        """
+        Возвращает гистограммы зарплат по группам с общими границами интервалов.
+        Возвращает:
+            tuple: Границы интервалов (bins + 1 значение) и список (название группы, количества по интервалам).
+        """
+        def compute(frame: SalaryFrame):
+            keys, name = self._names(frame, by)
+            values = self._values(frame, basis)
+            edges = histogram_edges(values, bins)
+            unique, counts = group_histograms(keys, values, edges)
+            return ([round(float(edge), 2) for edge in edges],
+                    [(name(key), row.tolist()) for key, row in zip(unique, counts)])
+
+        return self._cached(('histograms', by, basis, bins), compute)
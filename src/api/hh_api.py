@@ -1,39 +1,458 @@
 import requests
-from typing import List, Dict, Union
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Union, Optional, Any, Tuple, Iterator, Iterable, Set, Callable, TypeVar
 from src.color.color import Color
+from src.api.http_cache import HTTPCache
+from src.api.rate_limit import RateLimiter, RETRY_STATUSES, parse_retry_after
+from src.metrics import metrics
 
+HH_API_URL: str = 'https://api.hh.ru/vacancies'
+HH_DICTIONARIES_URL: str = 'https://api.hh.ru/dictionaries'
+PER_PAGE: int = 100  # Максимальное количество вакансий на одной странице
+MAX_PAGE: int = 19  # Максимальное количество страниц с вакансиями, потом ошибка 400
+MAX_ITEMS: int = PER_PAGE * MAX_PAGE  # Максимальное количество вакансий, доступное в одной выдаче
+MAX_WORKERS: int = 5  # Количество одновременных запросов к API
+SEARCH_PERIOD_DAYS: int = 30  # Период публикации, который делится пополам при разбиении шарда
+MIN_WINDOW: timedelta = timedelta(minutes=1)  # Минимальное окно дат, которое ещё делится пополам
+# Ожидание соединения и ответа в секундах: зависший запрос завершается requests.Timeout и повторяется
+REQUEST_TIMEOUT: Tuple[float, float] = (5.0, 30.0)
 
-def get_vacancies_by_employer_ids(employer_ids: List[int]) -> List[Dict[str, Union[str, int]]]:
+Shard = Dict[str, Any]
+Task = TypeVar('Task')
+Result = TypeVar('Result')
+
+
+class HHSession(requests.Session):
+    """
+    HTTP-сессия для API HH с необязательным кэшем ответов и планировщиком запросов (см. fetch_page).
+    """
+
+    def __init__(self, cache: Optional[HTTPCache] = None, limiter: Optional[RateLimiter] = None) -> None:
+        super().__init__()
+        self.cache = cache
+        self.limiter = limiter
+
+
+def create_session(max_workers: int = MAX_WORKERS, cache: Optional[HTTPCache] = None,
+                   limiter: Optional[RateLimiter] = None) -> HHSession:
+    """
+    Создаёт HTTP-сессию с пулом соединений, рассчитанным на указанное количество одновременных запросов.
+    Одна сессия переиспользует TCP/TLS-соединения между страницами, поэтому рукопожатие выполняется один раз
+    на соединение, а не на каждый запрос. Если передан cache, ответы API кэшируются на диске.
+    Запросы проходят через планировщик limiter; если он не передан, создаётся RateLimiter на max_workers
+    одновременных запросов.
+    """
+    session = HHSession(cache, limiter or RateLimiter(max_workers))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _get(session: requests.Session, url: str, params: Dict[str, Any],
+         headers: Optional[Dict[str, str]]) -> requests.Response:
+    """
+    Выполняет один GET-запрос с ограничением времени REQUEST_TIMEOUT и учитывает его в метриках:
+    время, код ответа и размер тела.
+    """
+    try:
+        with metrics.span('hh_request'):
+            response = session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as error:
+        metrics.inc('hh_requests_total', status=type(error).__name__)
+        raise
+    metrics.inc('hh_requests_total', status=response.status_code)
+    metrics.inc('hh_response_bytes_total', len(response.content))
+    return response
+
+
+def _decode(response: requests.Response) -> Dict[str, Any]:
+    with metrics.span('hh_json_decode'):
+        return response.json()
+
+
+def send_request(session: requests.Session, url: str, params: Dict[str, Any],
+                 headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+    """
+    Выполняет GET-запрос через планировщик сессии, повторяя его при перегрузке API и ошибках сервера.
+    Описание:
+        Ответы с кодами из RETRY_STATUSES и ошибки соединения повторяются с экспоненциальной задержкой
+        и случайным разбросом, не меньше значения Retry-After. После limiter.max_retries повторов запрос
+        считается неудачным. Сессия без планировщика выполняет запрос один раз.
+    Возвращает:
+        requests.Response: Последний полученный ответ или None, если соединиться с API не удалось.
+    """
+    limiter: Optional[RateLimiter] = getattr(session, 'limiter', None)
+    if limiter is None:
+        return _get(session, url, params, headers)
+
+    attempt = 0
+    while True:
+        response = None
+        try:
+            with limiter.slot():
+                response = _get(session, url, params, headers)
+        except (requests.ConnectionError, requests.Timeout):
+            pass
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            limiter.succeeded()
+            return response
+        if attempt >= limiter.max_retries:
+            limiter.give_up()
+            return response
+
+        status = response.status_code if response is not None else None
+        retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+        time.sleep(limiter.backoff(attempt, status, retry_after))
+        attempt += 1
+
+
+def fetch_json(session: requests.Session, url: str, params: Dict[str, Any], what: str) -> Optional[Dict[str, Any]]:
+    """
+    Получает ответ метода API HH в виде словаря.
+    Описание:
+        Если у сессии есть кэш, свежий ответ отдаётся из него без запроса к API. Устаревший ответ
+        перепроверяется условным запросом с его ETag / Last-Modified: при ответе 304 используется
+        сохранённая страница, при ответе 200 кэш обновляется.
+        Запросы выполняются через send_request, поэтому перегрузка API и временные ошибки сервера
+        повторяются, а не приводят к потере страницы.
+    Параметры:
+        session (requests.Session): Сессия, через которую выполняется запрос.
+        url (str): Адрес метода API.
+        params (dict): Параметры запроса.
+        what (str): Описание запрашиваемых данных для сообщения об ошибке.
+    Возвращает:
+        dict: Ответ API в виде словаря или None, если статус-код ответа не равен 200.
+    """
+    cache: Optional[HTTPCache] = getattr(session, 'cache', None)
+    if cache is None:
+        response = send_request(session, url, params)
+        if response is not None and response.status_code == 200:
+            return _decode(response)
+    else:
+        key = cache.key(url, params)
+        entry = cache.get(key)
+        if entry is not None and entry.fresh:
+            metrics.inc('hh_cache_total', result='hit')
+            return entry.data
+
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        response = send_request(session, url, params, headers)
+        if response is not None and response.status_code == 304 and entry is not None:
+            cache.refresh(key)
+            metrics.inc('hh_cache_total', result='revalidated')
+            return entry.data
+        if response is not None and response.status_code == 200:
+            metrics.inc('hh_cache_total', result='miss')
+            data = _decode(response)
+            cache.put(key, data, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return data
+
+    status = response.status_code if response is not None else 'нет соединения'
+    metrics.inc('hh_failed_total')
+    print(f'Ошибка при получении {what}: {Color.RED}{status}{Color.END}')
+    return None
+
+
+def fetch_page(session: requests.Session, url: str, params: Dict[str, Any], page: int) -> Optional[Dict[str, Any]]:
+    """
+    Получает одну страницу выдачи API HH через fetch_json.
+    Параметры:
+        session (requests.Session): Сессия, через которую выполняется запрос.
+        url (str): Адрес метода API.
+        params (dict): Параметры запроса без номера страницы.
+        page (int): Номер страницы.
+    Возвращает:
+        dict: Ответ API в виде словаря или None, если страницу получить не удалось.
+    """
+    data = fetch_json(session, url, {**params, 'page': page}, f'данных со страницы {Color.RED}{page}{Color.END}')
+    if data is not None:
+        metrics.inc('hh_pages_total')
+    return data
+
+
+def get_currency_rates(url: str = HH_DICTIONARIES_URL, limiter: Optional[RateLimiter] = None) -> Dict[str, float]:
+    """
+    Получает курсы валют из справочника API HH.
+    Курс показывает, сколько единиц валюты стоит один рубль ('RUR' имеет курс 1). Запрос выполняется через
+    send_request, поэтому ограничение частоты, время ожидания и повторы те же, что у страниц вакансий.
+    Если справочник недоступен, выводится сообщение об ошибке и возвращается только рублёвый курс.
+    """
+    with create_session(1, limiter=limiter) as session:
+        response = send_request(session, url, {})
+        if response is not None and response.status_code == 200:
+            return {currency['code']: currency['rate'] for currency in _decode(response).get('currency', [])}
+
+    status = response.status_code if response is not None else 'нет соединения'
+    print(f'Ошибка при получении курсов валют: {Color.RED}{status}{Color.END}')
+    return {'RUR': 1.0}
+
+
+def count_found(session: requests.Session, url: str, shard: Shard) -> Optional[int]:
+    """
+    Возвращает количество вакансий ('found'), которое API HH находит по параметрам шарда,
+    или None, если запрос не удался после всех повторов.
+    Для подсчёта запрашивается страница из одной вакансии.
+    """
+    data = fetch_page(session, url, {**shard, 'per_page': 1}, 0)
+    return data['found'] if data is not None else None
+
+
+def _format_date(value: datetime) -> str:
+    return value.isoformat(timespec='seconds')
+
+
+def plan_employer_shards(session: requests.Session, url: str, employer_id: Union[str, int],
+                         now: Optional[datetime] = None,
+                         since: Optional[datetime] = None) -> List[Tuple[Shard, Optional[int]]]:
+    """
+    Разбивает выдачу одного работодателя на шарды, каждый из которых помещается в ограничение MAX_ITEMS.
+    Описание:
+        Если работодатель целиком помещается в ограничение, возвращается один шард. Иначе окно дат публикации
+        ('date_from'/'date_to') делится пополам до тех пор, пока каждое окно не поместится в ограничение.
+        Окно короче MIN_WINDOW больше не делится: оно возвращается как есть с предупреждением.
+        Если количество вакансий окна получить не удалось, окно возвращается с количеством None и запрашивается
+        на всю доступную глубину (shard_pages): страницы, которые не удастся загрузить, остаются в задании
+        незагруженными, поэтому сбой подсчёта не превращается в молча пропущенного работодателя.
+    Параметры:
+        session (requests.Session): Сессия для запросов к API.
+        url (str): Адрес метода API.
+        employer_id (str): Идентификатор работодателя.
+        now (datetime): Текущий момент, от которого отсчитывается период публикации.
+        since (datetime): Если указан, запрашиваются только вакансии, опубликованные начиная с этого момента.
+    Возвращает:
+        list: Список пар (параметры шарда, количество найденных вакансий или None, если оно неизвестно).
+    """
+    now = now or datetime.now(timezone.utc)
+    shards: List[Tuple[Shard, Optional[int]]] = []
+    # Окна с открытой границей (None) покрывают вакансии раньше и позже периода поиска
+    windows: List[Tuple[Optional[datetime], Optional[datetime]]] = [(since, None)]
+    while windows:
+        start, end = windows.pop()
+        shard: Shard = {'employer_id': employer_id}
+        if start is not None:
+            shard['date_from'] = _format_date(start)
+        if end is not None:
+            shard['date_to'] = _format_date(end)
+        found = count_found(session, url, shard)
+        if found is None:
+            print(f'Работодатель {Color.RED}{employer_id}{Color.END}: количество вакансий в окне {shard} не получено, '
+                  f'запрашиваются все {MAX_PAGE} страниц')
+            shards.append((shard, None))
+            continue
+
+        high = end if end is not None else now
+        low = start if start is not None else high - timedelta(days=SEARCH_PERIOD_DAYS)
+        if found <= MAX_ITEMS or (start is not None and high - low <= MIN_WINDOW):
+            if found > MAX_ITEMS:
+                print(f'Работодатель {Color.RED}{employer_id}{Color.END}: в окне {shard} найдено {found} вакансий, '
+                      f'будут получены только первые {Color.RED}{MAX_ITEMS}{Color.END}')
+            if found:
+                shards.append((shard, found))
+            continue
+
+        middle = low + (high - low) / 2
+        windows.append((start, middle))
+        windows.append((middle, end))
+
+    return shards
+
+
+def fetch_shard_page(session: requests.Session, url: str, shard: Shard, page: int) -> List[Dict[str, Any]]:
+    """
+    Получает вакансии с одной страницы шарда. При ошибке запроса возвращает пустой список.
+    """
+    data = fetch_page(session, url, {**shard, 'per_page': PER_PAGE}, page)
+    return data['items'] if data is not None else []
+
+
+def bounded_map(executor: ThreadPoolExecutor, fn: Callable[[Task], Result], tasks: Iterable[Task],
+                window: int) -> Iterator[Tuple[Task, Result]]:
+    """
+    Выполняет fn для каждой задачи в пуле потоков и отдаёт пары (задача, результат) в порядке завершения.
+    Одновременно в работе не больше window задач, а задачи берутся из tasks по мере освобождения мест,
+    поэтому tasks может быть ленивым итератором любой длины.
+    """
+    pending = {}
+    for task in tasks:
+        pending[executor.submit(fn, task)] = task
+        if len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+    for future in as_completed(list(pending)):
+        yield pending[future], future.result()
+
+
+def plan_shards(employer_ids: List[str], max_workers: int = MAX_WORKERS, url: str = HH_API_URL,
+                since: Optional[Dict[str, datetime]] = None, cache: Optional[HTTPCache] = None,
+                limiter: Optional[RateLimiter] = None) -> List[Tuple[str, Shard, Optional[int]]]:
+    """
+    Планирует выдачу нескольких работодателей по шардам (см. plan_employer_shards), параллельно по работодателям.
+    Возвращает:
+        list: Тройки (идентификатор работодателя, параметры шарда, количество найденных вакансий или None).
+    """
+    with create_session(max_workers, cache, limiter) as session, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        now = datetime.now(timezone.utc)
+        since = since or {}
+        planned = executor.map(
+            lambda employer_id: plan_employer_shards(session, url, employer_id, now, since.get(str(employer_id))),
+            employer_ids)
+        return [(str(employer_id), shard, found)
+                for employer_id, shards in zip(employer_ids, planned) for shard, found in shards]
+
+
+def shard_pages(found: Optional[int]) -> int:
+    """
+    Возвращает количество страниц шарда с found вакансиями, доступных через API;
+    для шарда с неизвестным количеством (None) — все MAX_PAGE страниц.
+    """
+    if found is None:
+        return MAX_PAGE
+    return min((found + PER_PAGE - 1) // PER_PAGE, MAX_PAGE)
+
+
+def iter_shard_pages(tasks: Iterable[Tuple[Task, Shard, int]], max_workers: int = MAX_WORKERS,
+                     url: str = HH_API_URL, cache: Optional[HTTPCache] = None,
+                     limiter: Optional[RateLimiter] = None) -> Iterator[Tuple[Task, Optional[List[Dict[str, Any]]]]]:
+    """
+    Получает заранее запланированные страницы шардов параллельно, по мере готовности.
+    Параметры:
+        tasks (Iterable): Тройки (ключ страницы, параметры шарда, номер страницы).
+        max_workers (int): Максимальное количество одновременных запросов.
+        url (str): Адрес метода API.
+        cache (HTTPCache): Кэш ответов API.
+        limiter (RateLimiter): Планировщик запросов; по умолчанию RateLimiter на max_workers запросов.
+    Возвращает:
+        Iterator: Пары (ключ страницы, вакансии страницы) в порядке получения; вместо вакансий None,
+            если страницу получить не удалось.
+    """
+    def fetch(task: Tuple[Task, Shard, int]) -> Optional[List[Dict[str, Any]]]:
+        _, shard, page = task
+        data = fetch_page(session, url, {**shard, 'per_page': PER_PAGE}, page)
+        return data['items'] if data is not None else None
+
+    with create_session(max_workers, cache, limiter) as session, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for (key, _, _), items in bounded_map(executor, fetch, tasks, 2 * max_workers):
+            yield key, items
+
+
+def count_vacancies_by_employer_ids(employer_ids: List[str], max_workers: int = MAX_WORKERS,
+                                    url: str = HH_API_URL, cache: Optional[HTTPCache] = None,
+                                    limiter: Optional[RateLimiter] = None) -> Dict[str, int]:
+    """
+    Возвращает количество активных вакансий каждого работодателя по данным API HH.
+    Запросы по работодателям выполняются параллельно, по одному запросу на работодателя.
+    Работодатели, количество вакансий которых получить не удалось, в результат не попадают.
+    """
+    with create_session(max_workers, cache, limiter) as session, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = executor.map(lambda employer_id: fetch_page(session, url, {'employer_id': employer_id,
+                                                                            'per_page': 1}, 0),
+                             employer_ids)
+        return {str(employer_id): data['found'] for employer_id, data in zip(employer_ids, pages)
+                if data is not None}
+
+
+def iter_vacancy_pages(employer_ids: List[int], max_workers: int = MAX_WORKERS, url: str = HH_API_URL,
+                       since: Optional[Dict[str, datetime]] = None,
+                       cache: Optional[HTTPCache] = None,
+                       limiter: Optional[RateLimiter] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Отдаёт вакансии работодателей постранично, по мере получения страниц.
+    Описание:
+        API HH отдаёт по одному запросу не больше MAX_ITEMS вакансий, поэтому выдача планируется по шардам:
+        каждый работодатель запрашивается отдельно, а крупные работодатели дополнительно делятся по окнам
+        дат публикации (см. plan_employer_shards). Страницы всех шардов запрашиваются параллельно,
+        не более чем в max_workers потоков, через одну сессию с пулом соединений. Одновременно в работе
+        находится не больше 2 * max_workers страниц, поэтому память не растёт с количеством работодателей.
+        Перегрузка API и временные ошибки повторяются (см. send_request); если страницу так и не удалось
+        получить, выводится сообщение об ошибке, страница пропускается, а в конце выводится количество
+        потерянных страниц.
+        Вакансии, попавшие в несколько шардов, отдаются один раз (запоминаются только их идентификаторы).
+    Параметры:
+        employer_ids (list): Идентификаторы работодателей.
+        max_workers (int): Максимальное количество одновременных запросов.
+        url (str): Адрес метода API.
+        since (dict): Отметки времени по идентификаторам работодателей; для работодателя из словаря
+            запрашиваются только вакансии, опубликованные начиная с его отметки.
+        cache (HTTPCache): Кэш ответов API; если не указан, все страницы запрашиваются заново.
+        limiter (RateLimiter): Планировщик запросов; по умолчанию RateLimiter на max_workers запросов.
+    Возвращает:
+        Iterator: Списки новых вакансий с каждой полученной страницы в порядке получения.
+    """
+    seen_ids: Set[str] = set()
+
+    with create_session(max_workers, cache, limiter) as session, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        now = datetime.now(timezone.utc)
+        since = since or {}
+        planned = executor.map(
+            lambda employer_id: plan_employer_shards(session, url, employer_id, now, since.get(str(employer_id))),
+            employer_ids)
+        tasks = ((shard, page) for shards in planned for shard, found in shards for page in range(shard_pages(found)))
+
+        for _, page_items in bounded_map(executor, lambda task: fetch_shard_page(session, url, *task), tasks,
+                                         2 * max_workers):
+            items = [vacancy for vacancy in page_items if vacancy['id'] not in seen_ids]
+            seen_ids.update(vacancy['id'] for vacancy in items)
+            if items:
+                yield items
+
+        stats = session.limiter.stats()
+        if stats['failed']:
+            print(f'Не удалось получить {Color.RED}{stats["failed"]}{Color.END} страниц '
+                  f'после {stats["retries"]} повторов, выдача неполная')
+
+
+def get_vacancies_by_employer_ids(employer_ids: List[int], max_workers: int = MAX_WORKERS,
+                                  url: str = HH_API_URL,
+                                  since: Optional[Dict[str, datetime]] = None,
+                                  cache: Optional[HTTPCache] = None,
+                                  limiter: Optional[RateLimiter] = None) -> List[Dict[str, Union[str, int]]]:
     """
     Получает вакансии по идентификаторам работодателей.
+    Собирает в список все страницы iter_vacancy_pages с теми же параметрами.
+    Возвращает:
+        list: Список полученных вакансий без повторов по идентификатору.
+    """
+    return [vacancy for items in iter_vacancy_pages(employer_ids, max_workers, url, since, cache, limiter)
+            for vacancy in items]
+
+
+def iter_vacancy_details(vacancy_ids: Iterable[int], max_workers: int = MAX_WORKERS, url: str = HH_API_URL,
+                         cache: Optional[HTTPCache] = None,
+                         limiter: Optional[RateLimiter] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Отдаёт подробные данные вакансий (метод /vacancies/{id}) по мере их получения.
     Описание:
-        Функция отправляет GET-запрос к API HH для получения вакансий по идентификаторам работодателей.
-        Она итерируется по страницам ответа API и добавляет вакансии в список.
-        Максимальное количество вакансий на одной странице и максимальное количество страниц с вакансиями задаются
-        как константы.
-        Если статус-код ответа API не равен 200, выводится сообщение об ошибке и цикл прерывается.
-        Функция возвращает список полученных вакансий.
-    """
-    url = 'https://api.hh.ru/vacancies'
-    all_vacancies: List[Dict[str, Union[str, int]]] = []
-
-    page: int = 0
-    per_page: int = 100  # Максимальное количество вакансий на одной странице
-    max_page: int = 19  # Максимальное количество страниц с вакансиями, потом ошибка 400
-
-    while page < max_page:
-        params = {'employer_id': employer_ids, 'per_page': per_page, 'page': page}
-        response = requests.get(url, params=params)
-
-        if response.status_code == 200:
-            data = response.json()
-            vacancies_on_page = data['items']
-            all_vacancies.extend(vacancies_on_page)
-            page += 1
-
-        else:
-            print(f'Ошибка при получении данных со страницы '
-                  f'{Color.RED}{page}{Color.END}: {Color.RED}{response.status_code}{Color.END}')
-            break
-
-    return all_vacancies
+        Запросы выполняются параллельно, не более чем в max_workers потоков, через одну сессию с пулом
+        соединений и планировщиком запросов. Одновременно в работе находится не больше 2 * max_workers
+        запросов, поэтому идентификаторы можно передавать ленивым итератором. Вакансии, данные которых
+        получить не удалось (например, снятые с публикации), пропускаются.
+    Параметры:
+        vacancy_ids (Iterable): Идентификаторы вакансий.
+        max_workers (int): Максимальное количество одновременных запросов.
+        url (str): Адрес метода поиска вакансий, к которому добавляется идентификатор.
+        cache (HTTPCache): Кэш ответов API.
+        limiter (RateLimiter): Планировщик запросов; по умолчанию RateLimiter на max_workers запросов.
+    Возвращает:
+        Iterator: Ответы API по вакансиям в порядке получения.
+    """
+    def fetch_detail(vacancy_id: int) -> Optional[Dict[str, Any]]:
+        return fetch_json(session, f'{url}/{vacancy_id}', {}, f'вакансии {Color.RED}{vacancy_id}{Color.END}')
+
+    with create_session(max_workers, cache, limiter) as session, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _, detail in bounded_map(executor, fetch_detail, vacancy_ids, 2 * max_workers):
+            if detail is not None:
+                yield detail
@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, NamedTuple
+from urllib.parse import urlencode
+
+DEFAULT_CACHE_PATH: str = os.environ.get(
+    'HH_CACHE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'search_hh_work', 'http_cache.sqlite'))
+DEFAULT_TTL: float = 300  # Сколько секунд ответ считается свежим и отдаётся без запроса к API
+DEFAULT_MAX_BYTES: int = 256 * 1024 * 1024  # Предельный размер кэша, сверх него вытесняются давно не читанные ответы
+FORMAT_VERSION: int = 1  # Версия формата записей (PRAGMA user_version); записи прежних версий удаляются
+
+
+class CacheEntry(NamedTuple):
+    data: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+
+
+class HTTPCache:
+    """
+    Кэш ответов API HH на диске (SQLite).
+    Описание:
+        Ответы хранятся по ключу «адрес + отсортированные параметры» в JSON: файл кэша лежит в каталоге
+        пользователя и может быть подменён, а чтение JSON, в отличие от pickle, не выполняет код. Запись,
+        которую не удаётся разобрать, удаляется и считается отсутствующей. Ответ моложе ttl отдаётся без запроса
+        к API; более старый перепроверяется условным запросом (If-None-Match / If-Modified-Since), и ответ 304
+        продлевает запись. Когда суммарный размер записей превышает max_bytes, удаляются записи, которые дольше
+        всего не читались.
+        Счётчики показывают эффективность кэша: hits — обращения, отданные без запроса к API, misses — обращения
+        без свежей записи (её нет или она устарела), revalidated — устаревшие записи, подтверждённые кодом 304.
+    Параметры:
+        path (str): Путь к файлу базы SQLite.
+        ttl (float): Время свежести ответа в секундах.
+        max_bytes (int): Предельный суммарный размер сохранённых ответов в байтах.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] < FORMAT_VERSION:
+            # До версии 1 ответы хранились в pickle
+            self._db.execute("DROP TABLE IF EXISTS responses")
+            self._db.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, payload BLOB NOT NULL, size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at_idx ON responses (accessed_at)")
+        self._size: int = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(url: str, params: Dict[str, Any]) -> str:
+        """
+        Возвращает ключ кэша: адрес и параметры запроса в отсортированном порядке.
+        """
+        items = sorted((name, sorted(map(str, value)) if isinstance(value, (list, tuple)) else str(value))
+                       for name, value in params.items())
+        return f"{url}?{urlencode(items, doseq=True)}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Возвращает запись кэша или None. Обращение обновляет время последнего чтения записи.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, payload, size, stored_at FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            etag, last_modified, payload, size, stored_at = row
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self.misses += 1
+                return None
+            fresh = time.time() - stored_at < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(data, etag, last_modified, fresh)
+
+    def put(self, key: str, data: Any, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """
+        Сохраняет ответ и вытесняет давно не читанные записи, если кэш превысил max_bytes.
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, last_modified, payload, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (key, etag, last_modified, payload, len(payload), now, now))
+            self._size += len(payload) - (old[0] if old else 0)
+            self._evict()
+
+    def refresh(self, key: str) -> None:
+        """
+        Продлевает свежесть записи после ответа 304 Not Modified.
+        """
+        with self._lock:
+            self.revalidated += 1
+            self._db.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), key))
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                if self._size <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает счётчики кэша: попадания, промахи, перепроверки (304), количество записей и их размер.
+        """
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'revalidated': self.revalidated,
+                    'entries': entries, 'size_bytes': self._size}
+
+    def close(self) -> None:
+        """
+        Закрывает файл кэша.
+        """
+        with self._lock:
+            self._db.close()
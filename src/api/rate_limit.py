@@ -0,0 +1,239 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Iterator
+from src.metrics import metrics
+
+RATE: float = float(os.environ.get('HH_RATE_LIMIT', 20))  # Средняя допустимая частота запросов к API в секунду
+BURST: int = max(1, int(RATE))  # Сколько запросов можно выполнить подряд без ожидания
+MAX_RETRIES: int = 5  # Количество повторов одной страницы, после которого страница считается потерянной
+BACKOFF_BASE: float = 0.5  # Начальная задержка перед повтором в секундах, удваивается с каждой попыткой
+BACKOFF_CAP: float = 30.0  # Максимальная задержка перед повтором в секундах
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})  # Коды ответа, после которых запрос повторяется
+THROTTLE_STATUSES = frozenset({429, 503})  # Коды ответа, означающие, что API просит снизить нагрузку
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов «корзина токенов».
+    Описание:
+        Корзина вмещает capacity токенов и пополняется со скоростью rate токенов в секунду. Каждый запрос
+        забирает один токен; если корзина пуста, поток ждёт появления токена. Так подряд можно выполнить
+        до capacity запросов, а в среднем частота не превышает rate.
+    Параметры:
+        rate (float): Скорость пополнения в токенах в секунду.
+        capacity (int): Вместимость корзины.
+    """
+
+    def __init__(self, rate: float = RATE, capacity: int = BURST) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Забирает один токен, при необходимости дожидаясь пополнения корзины.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    Ограничение количества одновременных запросов, подстраивающееся под ответы API (AIMD).
+    Описание:
+        После limit успешных ответов подряд лимит увеличивается на единицу (не выше maximum), при ответе,
+        означающем перегрузку, лимит уменьшается вдвое (не ниже minimum). Так количество потоков держится
+        около максимума, который API выдерживает без ограничений.
+    Параметры:
+        maximum (int): Наибольшее количество одновременных запросов.
+        minimum (int): Наименьшее количество одновременных запросов.
+        initial (int): Начальный лимит; по умолчанию половина maximum.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None) -> None:
+        self.maximum = max(maximum, minimum)
+        self.minimum = minimum
+        self.limit = min(self.maximum, max(minimum, initial if initial is not None else maximum // 2))
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """
+        Занимает место для запроса, дожидаясь, пока количество выполняющихся запросов станет меньше лимита.
+        """
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self) -> None:
+        """
+        Освобождает место, занятое acquire.
+        """
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def succeeded(self) -> None:
+        """
+        Учитывает успешный ответ: после limit успехов подряд лимит растёт на единицу.
+        """
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify()
+
+    def throttled(self) -> None:
+        """
+        Учитывает ответ о перегрузке: лимит уменьшается вдвое.
+        """
+        with self._condition:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Переводит заголовок Retry-After (количество секунд или HTTP-дата) в задержку в секундах.
+    Возвращает None, если заголовок отсутствует или не разобран.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = BACKOFF_BASE,
+                  cap: float = BACKOFF_CAP) -> float:
+    """
+    Возвращает задержку перед повтором: экспоненциальная задержка со случайным разбросом (full jitter),
+    но не меньше значения Retry-After, если API его прислал.
+    Параметры:
+        attempt (int): Номер повтора, начиная с 0.
+        retry_after (float): Задержка из заголовка Retry-After в секундах.
+        base (float): Начальная задержка в секундах.
+        cap (float): Максимальная экспоненциальная задержка в секундах.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class RateLimiter:
+    """
+    Планировщик запросов к API HH: ограничение частоты, адаптивное количество одновременных запросов
+    и бюджет повторов на страницу.
+    Описание:
+        Перед каждым запросом занимается место в AdaptiveConcurrency и забирается токен из TokenBucket.
+        Ответ о перегрузке (429, 503) уменьшает количество одновременных запросов и, если API прислал
+        Retry-After, приостанавливает все запросы до указанного момента. Один запрос повторяется не больше
+        max_retries раз; страницы, которые не удалось получить, учитываются в счётчике failed.
+    Параметры:
+        max_concurrency (int): Наибольшее количество одновременных запросов.
+        rate (float): Средняя частота запросов в секунду.
+        burst (int): Количество запросов, выполняемых подряд без ожидания.
+        max_retries (int): Количество повторов одной страницы.
+        backoff_base (float): Начальная задержка перед повтором в секундах.
+        backoff_cap (float): Максимальная задержка перед повтором в секундах.
+    """
+
+    def __init__(self, max_concurrency: int, rate: float = RATE, burst: int = BURST,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 backoff_cap: float = BACKOFF_CAP) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retries = 0
+        self.throttles = 0
+        self.failed = 0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Контекстный менеджер, внутри которого выполняется один запрос к API.
+        """
+        self.concurrency.acquire()
+        try:
+            pause = self._resume_at - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            self.bucket.acquire()
+            yield
+        finally:
+            self.concurrency.release()
+
+    def succeeded(self) -> None:
+        """
+        Учитывает успешный ответ API.
+        """
+        self.concurrency.succeeded()
+        metrics.set_gauge('hh_concurrency_limit', self.concurrency.limit)
+
+    def backoff(self, attempt: int, status: Optional[int] = None, retry_after: Optional[float] = None) -> float:
+        """
+        Учитывает неудачный запрос и возвращает задержку перед его повтором.
+        Параметры:
+            attempt (int): Номер повтора, начиная с 0.
+            status (int): Код ответа или None, если запрос завершился ошибкой соединения.
+            retry_after (float): Задержка из заголовка Retry-After в секундах.
+        """
+        delay = backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_cap)
+        metrics.inc('hh_retries_total', status=status if status is not None else 'error')
+        with self._lock:
+            self.retries += 1
+            if status in THROTTLE_STATUSES:
+                self.throttles += 1
+                if retry_after is not None:
+                    self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+        if status in THROTTLE_STATUSES:
+            self.concurrency.throttled()
+            metrics.set_gauge('hh_concurrency_limit', self.concurrency.limit)
+        return delay
+
+    def give_up(self) -> None:
+        """
+        Учитывает страницу, которую не удалось получить за max_retries повторов.
+        """
+        metrics.inc('hh_retry_budget_exhausted_total')
+        with self._lock:
+            self.failed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает счётчики: повторы, ответы о перегрузке, потерянные страницы и текущий лимит потоков.
+        """
+        with self._lock:
+            return {'retries': self.retries, 'throttles': self.throttles, 'failed': self.failed,
+                    'concurrency': self.concurrency.limit}
@@ -0,0 +1,345 @@
+"""
+Неинтерактивный интерфейс командной строки: загрузка данных и запросы к базе без вопросов пользователю.
+
+    python main.py sync <база> [--employers employers.txt] [--full] [--no-enrich]
+    python main.py stats <база> [--dedup] [--format csv]
+    python main.py salaries <база> [--by title] [--min-count 5] [--histogram]
+    python main.py snapshot <база> snapshots/ [--format ipc]
+    python main.py salaries --snapshot snapshots/ [--by title]
+    python main.py search <база> "python разработчик" [--limit 50]
+    python main.py export <база> [--above-average] [--dedup] [--format csv] > vacancies.csv
+    python main.py trend <база> [--keyword python] [--company 80] [--period week] [--since 2024-01-01]
+    python main.py serve <база> [--port 8081] [--pool-size 20]
+
+Результаты выводятся в stdout в JSON или CSV, сообщения о ходе работы — в stderr, поэтому вывод можно
+передавать другим программам. Команды stats, salaries, search, export, trend и snapshot только читают базу: они не
+создают её и не обращаются к API, а модули загрузки импортируются только командой sync. salaries --snapshot
+считает статистику по снимку на диске и к базе не подключается. serve запускает HTTP-сервис запросов
+к базе для одновременных клиентов (src.service.service).
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+from contextlib import contextmanager, redirect_stdout
+from typing import List, Any, Iterable, Iterator, Optional, Sequence, TextIO
+
+from src.color.color import Color
+
+DEFAULT_EMPLOYER_IDS: List[str] = ['3529', '78638', '80', '673', '2180', '4181', '2748', '3776', '1740', '15478']
+VACANCY_COLUMNS: List[str] = ['company', 'title', 'salary_from', 'salary_to', 'link']
+STATS_COLUMNS: List[str] = ['company', 'vacancies', 'avg_salary', 'p10_salary', 'p25_salary', 'median_salary',
+                            'p75_salary', 'p90_salary']
+SALARY_COLUMNS: List[str] = ['name', 'salaries', 'avg_salary', 'p10_salary', 'p25_salary', 'median_salary',
+                             'p75_salary', 'p90_salary']
+TREND_COLUMNS: List[str] = ['period', 'vacancies', 'avg_salary', 'median_salary']
+
+
+def is_valid_dbname(dbname: str) -> bool:
+    """
+    Проверяет имя базы данных: первый символ — строчная латинская буква или подчёркивание, имя без кириллицы.
+    """
+    return bool(dbname) and not dbname[0].isdigit() and dbname.isascii() and dbname[0].islower()
+
+
+def read_employer_ids(path: str) -> List[str]:
+    """
+    Читает идентификаторы работодателей из файла (или из stdin, если path равен '-').
+    В файле по одному идентификатору в строке; пустые строки и текст после '#' пропускаются.
+    Вызывает:
+        ValueError: Если идентификатор не является числом.
+    """
+    file = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        employer_ids = []
+        for number, line in enumerate(file, 1):
+            employer_id = line.split('#', 1)[0].strip()
+            if not employer_id:
+                continue
+            if not employer_id.isdigit():
+                raise ValueError(f"{path}:{number}: идентификатор работодателя должен быть числом: {employer_id!r}")
+            employer_ids.append(employer_id)
+        return list(dict.fromkeys(employer_ids))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def write_rows(rows: Iterable[Sequence[Any]], columns: List[str], fmt: str, stream: TextIO) -> int:
+    """
+    Записывает строки в stream в формате fmt ('json' — массив объектов, 'csv' — таблица с заголовком).
+    Строки записываются по мере получения, поэтому итератор с большим количеством строк не собирается в памяти.
+    Возвращает:
+        int: Количество записанных строк.
+    """
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+
+    stream.write('[')
+    for row in rows:
+        stream.write(',\n' if count else '\n')
+        stream.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+        count += 1
+    stream.write('\n]\n' if count else ']\n')
+    return count
+
+
+def iter_search(db_manager, query: str, limit: int) -> Iterator[Sequence[Any]]:
+    """
+    Отдаёт до limit результатов поиска, запрашивая страницы search_vacancies по курсору.
+    """
+    cursor = None
+    remaining = limit
+    while remaining > 0:
+        vacancies, cursor = db_manager.search_vacancies(query, limit=min(remaining, 100), cursor=cursor)
+        yield from vacancies
+        remaining -= len(vacancies)
+        if cursor is None:
+            return
+
+
+@contextmanager
+def database(dbname: str) -> Iterator[Any]:
+    """
+    Контекстный менеджер: подключает DBManager к существующей базе и отключает его при выходе.
+    Сообщения DBManager выводятся в stderr, чтобы не смешиваться с результатом.
+    Вызывает:
+        ConnectionError: Если подключиться не удалось (причина уже выведена DBManager).
+    """
+    from src.dbmanager_class.dbmanager import DBManager
+
+    db_manager = DBManager(dbname=dbname)
+    with redirect_stdout(sys.stderr):
+        db_manager.connect(dbname=dbname)
+    if db_manager.conn is None:
+        raise ConnectionError(dbname)
+    try:
+        yield db_manager
+    finally:
+        with redirect_stdout(sys.stderr):
+            db_manager.disconnect()
+
+
+def cmd_sync(args: argparse.Namespace) -> int:
+    """
+    Создаёт базу и таблицы при необходимости, загружает вакансии работодателей и подробные данные.
+    В stdout выводится итог в JSON: количество загруженных вакансий.
+    """
+    from src.api.http_cache import HTTPCache
+    from src.create_db.create_db import create_database, create_tables, fill_tables
+
+    employer_ids = read_employer_ids(args.employers) if args.employers else DEFAULT_EMPLOYER_IDS
+    if not employer_ids:
+        print(f"{Color.RED}Список работодателей пуст.{Color.END}", file=sys.stderr)
+        return 2
+
+    with redirect_stdout(sys.stderr):
+        create_database(args.dbname)
+        create_tables(args.dbname)
+        cache = HTTPCache()
+        try:
+            loaded = fill_tables(args.dbname, employer_ids, incremental=not args.full, cache=cache,
+                                 enrich=not args.no_enrich)
+        finally:
+            cache.close()
+
+    json.dump({'dbname': args.dbname, 'employers': len(employer_ids), 'loaded': loaded},
+              sys.stdout, ensure_ascii=False)
+    sys.stdout.write('\n')
+    return 0 if loaded is not None else 1
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    """
+    Выводит статистику компаний: количество вакансий, средняя зарплата и её перцентили.
+    С --dedup каждый кластер почти одинаковых вакансий считается одной вакансией.
+    """
+    with database(args.dbname) as db_manager:
+        write_rows(db_manager.get_company_salary_stats(dedup=args.dedup), STATS_COLUMNS, args.format, sys.stdout)
+    return 0
+
+
+def write_salaries(analytics, args: argparse.Namespace) -> None:
+    if args.histogram:
+        edges, histograms = analytics.histograms(args.by, args.basis, args.bins)
+        columns = ['name'] + [f'{low:g}-{high:g}' for low, high in zip(edges, edges[1:])]
+        write_rows(([name, *counts] for name, counts in histograms), columns, args.format, sys.stdout)
+    else:
+        write_rows(analytics.stats(args.by, args.basis, args.min_count), SALARY_COLUMNS, args.format, sys.stdout)
+
+
+def cmd_salaries(args: argparse.Namespace) -> int:
+    """
+    Выводит перцентили зарплат по компаниям или названиям вакансий (src.analytics.salary),
+    с --histogram — гистограммы зарплат с общими границами интервалов. С --snapshot статистика
+    считается по снимку (src.export.snapshot) без подключения к базе.
+    """
+    if args.snapshot:
+        from src.export.snapshot import SnapshotAnalytics
+        write_salaries(SnapshotAnalytics(args.snapshot), args)
+        return 0
+    if args.dbname is None:
+        raise ValueError("Укажите имя базы или каталог снимков (--snapshot)")
+    with database(args.dbname) as db_manager:
+        write_salaries(db_manager.analytics, args)
+    return 0
+
+
+def cmd_snapshot(args: argparse.Namespace) -> int:
+    """
+    Записывает снимок активных вакансий в Parquet или Arrow IPC, разбитый по дате загрузки и компании.
+    В stdout выводится описание снимка в JSON.
+    """
+    from src.export.snapshot import write_snapshot
+
+    with redirect_stdout(sys.stderr):
+        meta = write_snapshot(args.dbname, args.directory, args.format, args.row_group_size)
+    if meta is None:
+        return 1
+    json.dump(meta, sys.stdout, ensure_ascii=False)
+    sys.stdout.write('\n')
+    return 0
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    """
+    Выводит вакансии, найденные по поисковой строке, в порядке релевантности.
+    """
+    with database(args.dbname) as db_manager:
+        write_rows(iter_search(db_manager, args.query, args.limit), VACANCY_COLUMNS, args.format, sys.stdout)
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    """
+    Выводит все активные вакансии (или только с зарплатой выше средней) в порядке идентификаторов.
+    С --dedup из каждого кластера почти одинаковых вакансий выводится одна.
+    """
+    with database(args.dbname) as db_manager:
+        if args.above_average:
+            rows = db_manager.get_vacancies_with_higher_salary(dedup=args.dedup)
+        else:
+            rows = db_manager.iter_all_vacancies(dedup=args.dedup)
+        write_rows(rows, VACANCY_COLUMNS, args.format, sys.stdout)
+    return 0
+
+
+def cmd_trend(args: argparse.Namespace) -> int:
+    """
+    Выводит динамику зарплат из истории вакансий: по компаниям или, с --keyword, по вакансиям
+    с ключевым словом в названии.
+    """
+    with database(args.dbname) as db_manager:
+        if args.keyword:
+            rows = db_manager.get_keyword_salary_trend(args.keyword, args.since, args.until, args.period)
+            columns = TREND_COLUMNS
+        else:
+            rows = db_manager.get_company_salary_trend(args.since, args.until, args.period,
+                                                       tuple(args.company) if args.company else None)
+            columns = TREND_COLUMNS[:1] + ['company'] + TREND_COLUMNS[1:]
+        write_rows(rows, columns, args.format, sys.stdout)
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    """
+    Запускает HTTP-сервис запросов к базе (src.service.service) до нажатия Ctrl+C.
+    """
+    from src.service.service import run
+
+    run(args.dbname, args.host, args.port, args.pool_size, args.cache_entries)
+    return 0
+
+
+def dbname_type(value: str) -> str:
+    if not is_valid_dbname(value):
+        raise argparse.ArgumentTypeError("имя базы должно начинаться со строчной латинской буквы или подчёркивания")
+    return value
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='main.py', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sync = commands.add_parser('sync', help="загрузить вакансии из API в базу")
+    sync.add_argument('dbname', type=dbname_type)
+    sync.add_argument('--employers', metavar='FILE',
+                      help="файл с идентификаторами работодателей, по одному в строке ('-' — stdin)")
+    sync.add_argument('--full', action='store_true', help="полная загрузка вместо инкрементальной")
+    sync.add_argument('--no-enrich', action='store_true',
+                      help="не запрашивать подробные данные вакансий")
+    sync.set_defaults(handler=cmd_sync)
+
+    snapshot = commands.add_parser('snapshot', help="снимок вакансий в Parquet или Arrow IPC")
+    snapshot.add_argument('dbname', type=dbname_type)
+    snapshot.add_argument('directory', help="корневой каталог снимков")
+    snapshot.add_argument('--format', choices=['parquet', 'ipc'], default='parquet')
+    snapshot.add_argument('--row-group-size', type=int, default=100_000)
+    snapshot.set_defaults(handler=cmd_snapshot)
+
+    serve = commands.add_parser('serve', help="HTTP-сервис запросов к базе")
+    serve.add_argument('dbname', type=dbname_type)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8081)
+    serve.add_argument('--pool-size', type=int, default=20, help="максимум соединений с базой")
+    serve.add_argument('--cache-entries', type=int, default=256,
+                       help="количество ответов в кэше до следующей загрузки (0 — без кэша)")
+    serve.set_defaults(handler=cmd_serve)
+
+    for name, handler, help_text in (('stats', cmd_stats, "статистика вакансий и зарплат по компаниям"),
+                                     ('salaries', cmd_salaries, "перцентили и гистограммы зарплат"),
+                                     ('search', cmd_search, "поиск вакансий по названию"),
+                                     ('export', cmd_export, "выгрузка вакансий"),
+                                     ('trend', cmd_trend, "динамика зарплат по истории вакансий")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('dbname', type=dbname_type, nargs='?' if name == 'salaries' else None)
+        if name == 'search':
+            command.add_argument('query')
+            command.add_argument('--limit', type=int, default=20)
+        if name == 'salaries':
+            command.add_argument('--by', choices=['company', 'title'], default='company')
+            command.add_argument('--basis', choices=['midpoint', 'from'], default='midpoint',
+                                 help="середина вилки или нижняя граница зарплаты")
+            command.add_argument('--min-count', type=int, default=1)
+            command.add_argument('--histogram', action='store_true')
+            command.add_argument('--bins', type=int, default=20)
+            command.add_argument('--snapshot', metavar='DIR', help="считать по последнему снимку в каталоге")
+        if name == 'export':
+            command.add_argument('--above-average', action='store_true',
+                                 help="только вакансии с зарплатой выше средней")
+        if name in ('stats', 'export'):
+            command.add_argument('--dedup', action='store_true',
+                                 help="одна вакансия из каждого кластера почти одинаковых вакансий")
+        if name == 'trend':
+            command.add_argument('--keyword', help="динамика по вакансиям с ключевым словом вместо компаний")
+            command.add_argument('--company', type=int, action='append', metavar='ID',
+                                 help="только эта компания (можно несколько)")
+            command.add_argument('--period', choices=['day', 'week', 'month'], default='month')
+            command.add_argument('--since', type=date.fromisoformat, metavar='YYYY-MM-DD')
+            command.add_argument('--until', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                                 help="конец периода, не включается")
+        command.add_argument('--format', choices=['json', 'csv'], default='json')
+        command.set_defaults(handler=handler)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Разбирает аргументы командной строки и выполняет команду. Возвращает код завершения.
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except ConnectionError:
+        return 1
+    except (OSError, ValueError) as error:
+        print(f"{Color.RED}{error}{Color.END}", file=sys.stderr)
+        return 2
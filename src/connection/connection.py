@@ -0,0 +1,137 @@
+import os
+import threading
+import psycopg2
+from contextlib import contextmanager
+from psycopg2.pool import ThreadedConnectionPool
+from typing import Dict, Iterator, Optional, Tuple
+
+pas_sql: str = os.environ.get('SQLPASS')
+user_sql: str = os.environ.get('SQLUSER')
+
+HOST: str = "localhost"
+PORT: str = "5432"
+MIN_CONNECTIONS: int = 1  # Соединений, открываемых при создании пула
+MAX_CONNECTIONS: int = 10  # Максимум соединений в пуле одной базы данных
+
+PoolKey = Tuple[Optional[str], Optional[str], Optional[str], str, str]
+
+_pools: Dict[PoolKey, Tuple[ThreadedConnectionPool, threading.BoundedSemaphore]] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(dbname: Optional[str], user: Optional[str], password: Optional[str], host: str, port: str) -> PoolKey:
+    return dbname, user or user_sql, password or pas_sql, host, port
+
+
+def get_pool(dbname: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+             host: str = HOST, port: str = PORT) -> Tuple[ThreadedConnectionPool, threading.BoundedSemaphore]:
+    """
+    Возвращает пул соединений для указанных параметров подключения, создавая его при первом обращении.
+    Без имени базы данных соединения открываются к базе по умолчанию (нужно, например, для CREATE DATABASE).
+    Семафор ограничивает количество выданных соединений размером пула: при исчерпании пула следующий
+    запрос ждёт возврата соединения, а не получает ошибку.
+    """
+    key = _pool_key(dbname, user, password, host, port)
+    with _pools_lock:
+        if key not in _pools:
+            dbname, user, password, host, port = key
+            params = {'user': user, 'password': password, 'host': host, 'port': port}
+            if dbname is not None:
+                params['dbname'] = dbname
+            _pools[key] = (ThreadedConnectionPool(MIN_CONNECTIONS, MAX_CONNECTIONS, **params),
+                           threading.BoundedSemaphore(MAX_CONNECTIONS))
+        return _pools[key]
+
+
+def _is_alive(conn) -> bool:
+    """
+    Проверяет, что соединение открыто и отвечает на запрос.
+    """
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def acquire(dbname: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+            host: str = HOST, port: str = PORT):
+    """
+    Берёт соединение из пула.
+    Перед выдачей соединение проверяется запросом 'SELECT 1'; разорванное соединение закрывается,
+    и берётся следующее. После перезапуска сервера разорванными могут оказаться все свободные соединения пула,
+    поэтому проверяется до MAX_CONNECTIONS + 1 соединений: последнее из них пул открывает заново.
+    Соединение нужно вернуть через release.
+    Вызывает:
+        psycopg2.OperationalError: Если ни одно соединение не прошло проверку.
+    """
+    pool, semaphore = get_pool(dbname, user, password, host, port)
+    semaphore.acquire()
+    try:
+        for _ in range(MAX_CONNECTIONS + 1):
+            conn = pool.getconn()
+            if _is_alive(conn):
+                return conn
+            pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Не удалось получить работающее соединение с базой данных")
+    except Exception:
+        semaphore.release()
+        raise
+
+
+def release(conn, dbname: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+            host: str = HOST, port: str = PORT, close: bool = False) -> None:
+    """
+    Возвращает соединение в пул. Незавершённая транзакция откатывается; разорванное соединение
+    (или при close=True) закрывается, и пул откроет новое при следующем запросе.
+    """
+    pool, semaphore = get_pool(dbname, user, password, host, port)
+    try:
+        if not conn.closed and conn.autocommit:
+            conn.autocommit = False
+        pool.putconn(conn, close=close or bool(conn.closed))
+    finally:
+        semaphore.release()
+
+
+@contextmanager
+def connection(dbname: Optional[str] = None, autocommit: bool = False, **params) -> Iterator:
+    """
+    Выдаёт соединение из пула как контекстный менеджер.
+    При успешном выходе транзакция фиксируется, при исключении откатывается. Если соединение разорвалось
+    (OperationalError, InterfaceError), оно не возвращается в пул, а закрывается.
+    Параметры:
+        dbname (str): Имя базы данных или None для базы по умолчанию.
+        autocommit (bool): Включить автофиксацию (нужно для CREATE DATABASE).
+        params: user, password, host, port, если они отличаются от настроек по умолчанию.
+    """
+    conn = acquire(dbname, **params)
+    broken = False
+    try:
+        conn.autocommit = autocommit
+        yield conn
+        if not autocommit:
+            conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        release(conn, dbname, close=broken, **params)
+
+
+def close_all() -> None:
+    """
+    Закрывает все соединения всех пулов.
+    """
+    with _pools_lock:
+        for pool, _ in _pools.values():
+            pool.closeall()
+        _pools.clear()
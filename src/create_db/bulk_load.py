@@ -0,0 +1,139 @@
+import io
+import time
+from typing import List, Tuple, Iterable, Any, Optional
+from psycopg2.extras import execute_values
+from src.color.color import Color
+from src.metrics import metrics
+
+PAGE_SIZE: int = 1000  # Количество строк в одном запросе при загрузке через execute_values
+
+VACANCY_COLUMNS: Tuple[str, ...] = (
+    'vacancy_id', 'company_id', 'company_name', 'title', 'salary_from', 'salary_to', 'currency', 'gross',
+    'salary_from_rub', 'salary_to_rub', 'link', 'published_at'
+)
+
+STAGING_VACANCIES: str = """
+    CREATE TEMP TABLE IF NOT EXISTS staging_vacancies (
+        vacancy_id INTEGER,
+        company_id INTEGER,
+        company_name TEXT,
+        title TEXT,
+        salary_from INTEGER,
+        salary_to INTEGER,
+        currency TEXT,
+        gross BOOLEAN,
+        salary_from_rub INTEGER,
+        salary_to_rub INTEGER,
+        link TEXT,
+        published_at TIMESTAMPTZ
+    ) ON COMMIT DELETE ROWS
+    """
+
+MERGE_COMPANIES: str = """
+    INSERT INTO companies (company_id, name)
+    SELECT DISTINCT ON (company_id) company_id, company_name FROM staging_vacancies
+    ORDER BY company_id
+    ON CONFLICT (company_id) DO UPDATE SET name = EXCLUDED.name
+    WHERE companies.name IS DISTINCT FROM EXCLUDED.name
+    """
+
+MERGE_VACANCIES: str = """
+    INSERT INTO vacancies (vacancy_id, company_id, title, salary_from, salary_to, currency, gross,
+                           salary_from_rub, salary_to_rub, link, published_at)
+    SELECT DISTINCT ON (vacancy_id) vacancy_id, company_id, title, salary_from, salary_to, currency, gross,
+                                    salary_from_rub, salary_to_rub, link, published_at
+    FROM staging_vacancies
+    ORDER BY vacancy_id
+    ON CONFLICT (vacancy_id) DO UPDATE SET
+        company_id = EXCLUDED.company_id, title = EXCLUDED.title, salary_from = EXCLUDED.salary_from,
+        salary_to = EXCLUDED.salary_to, currency = EXCLUDED.currency, gross = EXCLUDED.gross,
+        salary_from_rub = EXCLUDED.salary_from_rub, salary_to_rub = EXCLUDED.salary_to_rub,
+        link = EXCLUDED.link, published_at = EXCLUDED.published_at, archived = FALSE, updated_at = now()
+    WHERE (vacancies.company_id, vacancies.title, vacancies.salary_from, vacancies.salary_to, vacancies.currency,
+           vacancies.gross, vacancies.salary_from_rub, vacancies.salary_to_rub, vacancies.link,
+           vacancies.published_at, vacancies.archived)
+        IS DISTINCT FROM (EXCLUDED.company_id, EXCLUDED.title, EXCLUDED.salary_from, EXCLUDED.salary_to,
+                          EXCLUDED.currency, EXCLUDED.gross, EXCLUDED.salary_from_rub, EXCLUDED.salary_to_rub,
+                          EXCLUDED.link, EXCLUDED.published_at, FALSE)
+    """
+
+
+def _copy_value(value: Any) -> str:
+    """
+    Переводит значение в текстовый формат COPY: None становится \\N, спецсимволы экранируются.
+    """
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def rows_to_copy_buffer(rows: Iterable[Tuple[Any, ...]]) -> io.StringIO:
+    """
+    Собирает строки в буфер в текстовом формате COPY (значения через табуляцию, по строке на запись).
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def copy_rows(cur, table: str, columns: Tuple[str, ...], rows: List[Tuple[Any, ...]],
+              method: str = 'copy') -> None:
+    """
+    Загружает строки в таблицу одним потоком.
+    Параметры:
+        cur: Курсор psycopg2.
+        table (str): Имя таблицы.
+        columns (tuple): Имена столбцов в порядке значений в строках.
+        rows (list): Строки для загрузки.
+        method (str): 'copy' — COPY FROM STDIN; 'values' — execute_values страницами по PAGE_SIZE строк,
+            для соединений, где COPY недоступен.
+    """
+    if method == 'copy':
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", rows_to_copy_buffer(rows))
+    elif method == 'values':
+        execute_values(cur, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", rows, page_size=PAGE_SIZE)
+    else:
+        raise ValueError(f"Неизвестный способ загрузки: {method}")
+
+
+def bulk_upsert_vacancies(cur, rows: List[Tuple[Any, ...]], method: str = 'copy',
+                          report: bool = True) -> Optional[float]:
+    """
+    Загружает вакансии и их компании через временную таблицу 'staging_vacancies'.
+    Описание:
+        Строки (в порядке VACANCY_COLUMNS) потоком загружаются во временную таблицу, после чего компании
+        и вакансии сливаются в основные таблицы двумя запросами INSERT ... SELECT ... ON CONFLICT.
+        Повторы одной вакансии внутри загрузки схлопываются, неизменённые строки не перезаписываются.
+        Временная таблица очищается при фиксации транзакции.
+    Параметры:
+        cur: Курсор psycopg2.
+        rows (list): Строки вакансий.
+        method (str): Способ загрузки во временную таблицу, см. copy_rows.
+        report (bool): Выводить ли скорость загрузки.
+    Возвращает:
+        float: Скорость загрузки в строках в секунду или None, если строк нет.
+    """
+    if not rows:
+        return None
+
+    start = time.perf_counter()
+    cur.execute(STAGING_VACANCIES)
+    cur.execute("TRUNCATE staging_vacancies")
+    with metrics.span('db_copy', method=method):
+        copy_rows(cur, 'staging_vacancies', VACANCY_COLUMNS, rows, method)
+    with metrics.span('db_merge'):
+        cur.execute(MERGE_COMPANIES)
+        cur.execute(MERGE_VACANCIES)
+    elapsed = time.perf_counter() - start
+
+    rows_per_second = len(rows) / elapsed if elapsed > 0 else float('inf')
+    metrics.inc('db_rows_upserted_total', len(rows))
+    metrics.set_gauge('db_rows_per_second', rows_per_second)
+    if report:
+        print(f"Загружено {Color.GREEN}{len(rows)}{Color.END} вакансий за {elapsed:.2f} с "
+              f"({Color.GREEN}{rows_per_second:.0f}{Color.END} строк/с)")
+    return rows_per_second
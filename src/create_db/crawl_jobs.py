@@ -0,0 +1,116 @@
+from datetime import timedelta
+from typing import List, Dict, Tuple, Set, Any, Callable
+from psycopg2.extras import execute_values, Json
+from src.api.hh_api import Shard
+from src.color.color import Color
+
+MAX_JOB_ATTEMPTS: int = 5  # Сколько раз задание запускается, прежде чем его план страниц считается негодным
+MAX_JOB_AGE: timedelta = timedelta(hours=24)  # Задание старше этого перепланируется: шарды по датам устаревают
+
+FIND_RUNNING_JOB: str = """
+    SELECT job_id, attempts, attempts >= %s OR started_at < now() - %s AS expired FROM crawl_jobs
+    WHERE status = 'running' AND kind = %s AND employer_ids = %s::INTEGER[]
+    ORDER BY job_id DESC LIMIT 1
+    """
+
+COMPLETE_PAGES: str = """
+    UPDATE crawl_pages p SET status = 'done', rows_loaded = v.rows_loaded, vacancy_ids = v.vacancy_ids,
+                             fetched_at = now()
+    FROM (VALUES %s) AS v(page_id, rows_loaded, vacancy_ids)
+    WHERE p.page_id = v.page_id
+    """
+
+
+def start_job(cur, kind: str, employer_ids: List[str], plan: Callable[[], List[Tuple[str, Shard, int]]],
+              max_attempts: int = MAX_JOB_ATTEMPTS, max_age: timedelta = MAX_JOB_AGE) -> Tuple[int, bool]:
+    """
+    Возвращает задание обхода API для набора работодателей, продолжая незавершённое, если оно есть.
+    Описание:
+        Незавершённое задание того же вида (kind) с тем же набором работодателей продолжается, и счётчик его
+        запусков увеличивается. Задание, запущенное max_attempts раз или начатое раньше, чем max_age назад,
+        не продолжается: страницы, которые не загружаются несколько запусков подряд, и план шардов по старым
+        датам публикации не должны возобновляться бесконечно. В этом случае, как и при отсутствии задания,
+        незавершённые задания этого вида помечаются брошенными, выдача планируется функцией plan заново, и в
+        'crawl_pages' записывается по строке на каждую страницу каждого шарда. Задание и его страницы
+        записываются одной транзакцией, поэтому задание без плана страниц не появляется.
+    Параметры:
+        cur: Курсор psycopg2.
+        kind (str): Вид задания, например 'full', 'incremental' или 'stale'.
+        employer_ids (list): Идентификаторы работодателей.
+        plan (Callable): Функция, возвращающая тройки (работодатель, параметры шарда, количество страниц).
+        max_attempts (int): Предельное количество запусков одного задания.
+        max_age (timedelta): Предельный возраст продолжаемого задания.
+    Возвращает:
+        tuple: Идентификатор задания и признак того, что задание продолжено.
+    """
+    ids = sorted(int(employer_id) for employer_id in employer_ids)
+    cur.execute(FIND_RUNNING_JOB, (max_attempts, max_age, kind, ids))
+    row = cur.fetchone()
+    if row is not None:
+        job_id, attempts, expired = row
+        if not expired:
+            cur.execute("UPDATE crawl_jobs SET attempts = attempts + 1 WHERE job_id = %s", (job_id,))
+            return job_id, True
+        print(f"Незавершённая загрузка {Color.RED}№{job_id}{Color.END} (запусков: {attempts}) не продолжается: "
+              f"план страниц устарел, выдача планируется заново")
+
+    pages = [(employer_id, shard, page) for employer_id, shard, count in plan() for page in range(count)]
+    cur.execute("UPDATE crawl_jobs SET status = 'abandoned', finished_at = now() "
+                "WHERE status = 'running' AND kind = %s", (kind,))
+    cur.execute("INSERT INTO crawl_jobs (kind, employer_ids) VALUES (%s, %s) RETURNING job_id", (kind, ids))
+    job_id = cur.fetchone()[0]
+    execute_values(cur, "INSERT INTO crawl_pages (job_id, employer_id, params, page) VALUES %s",
+                   [(job_id, int(employer_id), Json(shard), page) for employer_id, shard, page in pages])
+    return job_id, False
+
+
+def pending_pages(cur, job_id: int) -> List[Tuple[int, Shard, int]]:
+    """
+    Возвращает страницы задания, которые ещё не загружены: тройки (идентификатор страницы, шард, номер страницы).
+    """
+    cur.execute("SELECT page_id, params, page FROM crawl_pages WHERE job_id = %s AND status = 'pending' "
+                "ORDER BY page_id", (job_id,))
+    return cur.fetchall()
+
+
+def complete_pages(cur, pages: List[Tuple[int, List[int]]]) -> None:
+    """
+    Отмечает страницы загруженными в текущей транзакции.
+    Параметры:
+        cur: Курсор psycopg2.
+        pages (list): Пары (идентификатор страницы, идентификаторы вакансий страницы).
+    """
+    if pages:
+        execute_values(cur, COMPLETE_PAGES, [(page_id, len(ids), ids) for page_id, ids in pages],
+                       template="(%s, %s, %s::INTEGER[])")
+
+
+def job_seen_ids(cur, job_id: int) -> Dict[str, Set[int]]:
+    """
+    Возвращает идентификаторы вакансий, загруженных заданием, по работодателям.
+    """
+    cur.execute("SELECT employer_id, unnest(vacancy_ids) FROM crawl_pages WHERE job_id = %s AND status = 'done'",
+                (job_id,))
+    seen_ids: Dict[str, Set[int]] = {}
+    for employer_id, vacancy_id in cur.fetchall():
+        seen_ids.setdefault(str(employer_id), set()).add(vacancy_id)
+    return seen_ids
+
+
+def finish_job(cur, job_id: int) -> Dict[str, Any]:
+    """
+    Завершает задание, если все его страницы загружены.
+    Описание:
+        Задание с незагруженными страницами остаётся в статусе 'running' и продолжается при следующем запуске.
+        У завершённого задания списки вакансий страниц очищаются, количество строк сохраняется.
+    Возвращает:
+        dict: Количество загруженных и оставшихся страниц, загруженных строк и признак завершения задания.
+    """
+    cur.execute("SELECT COUNT(*) FILTER (WHERE status = 'done'), COUNT(*) FILTER (WHERE status = 'pending'), "
+                "COALESCE(SUM(rows_loaded), 0) FROM crawl_pages WHERE job_id = %s", (job_id,))
+    done, pending, rows = cur.fetchone()
+    if not pending:
+        cur.execute("UPDATE crawl_jobs SET status = 'done', finished_at = now(), rows_loaded = %s "
+                    "WHERE job_id = %s", (rows, job_id))
+        cur.execute("UPDATE crawl_pages SET vacancy_ids = NULL WHERE job_id = %s", (job_id,))
+    return {'done': done, 'pending': pending, 'rows': rows, 'finished': not pending}
@@ -1,11 +1,240 @@
 import os
+import time
 import psycopg2
-from typing import List, Dict, Union, Tuple
+from datetime import datetime, timedelta
+from typing import List, Dict, Tuple, Set, Any, Iterable, Optional
 from src.color.color import Color
-from src.api.hh_api import get_vacancies_by_employer_ids
+from src.api.hh_api import (plan_shards, shard_pages, iter_shard_pages, count_vacancies_by_employer_ids,
+                            get_currency_rates, Shard, HH_API_URL, HH_DICTIONARIES_URL)
+from src.api.http_cache import HTTPCache
+from src.connection.connection import connection
+from src.create_db.bulk_load import bulk_upsert_vacancies
+from src.create_db.enrich import enrich_vacancies
+from src.create_db.history import record_observations
+from src.metrics import metrics
+from src.create_db.crawl_jobs import start_job, pending_pages, complete_pages, job_seen_ids, finish_job
 
-pas_sql: str = os.environ.get('SQLPASS')
-user_sql: str = os.environ.get('SQLUSER')
+BATCH_SIZE: int = 5000  # Количество вакансий, записываемых и фиксируемых за одну транзакцию
+# Как часто инкрементальная загрузка запрашивает выдачу работодателя полностью: отбор по date_from находит только
+# новые публикации, а изменения уже опубликованных вакансий (например, зарплаты) видны лишь в полной выдаче
+FULL_SYNC_INTERVAL: timedelta = timedelta(hours=int(os.environ.get('HH_FULL_SYNC_HOURS', 24)))
+
+# Миграции схемы: версия -> команды, переводящие базу из предыдущей версии в эту.
+# Версия 1 — таблицы, которые создаёт create_tables.
+MIGRATIONS: Dict[int, List[str]] = {
+    2: [
+        # Зарплаты хранятся числами, NULL вместо 'Зарплата не указана'
+        "ALTER TABLE vacancies ALTER COLUMN salary_from TYPE INTEGER "
+        "USING CAST(NULLIF(salary_from, 'Зарплата не указана') AS INTEGER)",
+        "ALTER TABLE vacancies ALTER COLUMN salary_to TYPE INTEGER "
+        "USING CAST(NULLIF(salary_to, 'Зарплата не указана') AS INTEGER)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS currency VARCHAR(3)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS gross BOOLEAN",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS salary_from_rub INTEGER",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS salary_to_rub INTEGER",
+        # До версии 2 валюта не сохранялась, существующие зарплаты считаются рублёвыми
+        "UPDATE vacancies SET currency = 'RUR', salary_from_rub = salary_from, salary_to_rub = salary_to "
+        "WHERE salary_from IS NOT NULL OR salary_to IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS vacancies_company_id_idx ON vacancies (company_id)",
+        "CREATE INDEX IF NOT EXISTS vacancies_salary_from_rub_idx ON vacancies (salary_from_rub) WHERE NOT archived",
+    ],
+    3: [
+        # Полнотекстовый поиск по названию (русская и английская морфология) и триграммы для подстрок и опечаток
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS "
+        "(to_tsvector('russian', title) || to_tsvector('english', title)) STORED",
+        "CREATE INDEX IF NOT EXISTS vacancies_search_vector_idx ON vacancies USING GIN (search_vector)",
+        "CREATE INDEX IF NOT EXISTS vacancies_title_trgm_idx ON vacancies USING GIN (title gin_trgm_ops)",
+    ],
+    4: [
+        # Агрегаты по компаниям и по всем вакансиям, пересчитываются в конце каждой загрузки (refresh_stats)
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS company_stats AS
+        SELECT c.company_id, c.name, COUNT(v.vacancy_id) AS vacancies_count,
+               AVG(v.salary_from_rub) AS avg_salary,
+               percentile_cont(0.1) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p10_salary,
+               percentile_cont(0.25) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p25_salary,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY v.salary_from_rub) AS median_salary,
+               percentile_cont(0.75) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p75_salary,
+               percentile_cont(0.9) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p90_salary
+        FROM companies c JOIN vacancies v ON c.company_id = v.company_id
+        WHERE NOT v.archived
+        GROUP BY c.company_id, c.name
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS company_stats_company_id_idx ON company_stats (company_id)",
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS salary_stats AS
+        SELECT 1 AS id, COUNT(salary_from_rub) AS salaries_count, AVG(salary_from_rub) AS avg_salary,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY salary_from_rub) AS median_salary
+        FROM vacancies
+        WHERE NOT archived
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS salary_stats_id_idx ON salary_stats (id)",
+    ],
+    5: [
+        # Подробные данные вакансий из /vacancies/{id} и ключевые навыки, заполняются enrich_vacancies
+        """
+        CREATE TABLE IF NOT EXISTS vacancy_details (
+            vacancy_id INTEGER PRIMARY KEY REFERENCES vacancies (vacancy_id) ON DELETE CASCADE,
+            description TEXT,
+            experience TEXT,
+            schedule TEXT,
+            employment TEXT,
+            area TEXT,
+            fetched_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS skills (
+            skill_id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS vacancy_skills (
+            vacancy_id INTEGER NOT NULL REFERENCES vacancies (vacancy_id) ON DELETE CASCADE,
+            skill_id INTEGER NOT NULL REFERENCES skills (skill_id),
+            PRIMARY KEY (vacancy_id, skill_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS vacancy_skills_skill_id_idx ON vacancy_skills (skill_id)",
+    ],
+    6: [
+        # Задания обхода API и план их страниц, чтобы прерванная загрузка продолжалась с недостающих страниц
+        """
+        CREATE TABLE IF NOT EXISTS crawl_jobs (
+            job_id SERIAL PRIMARY KEY,
+            kind TEXT NOT NULL,
+            employer_ids INTEGER[] NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            rows_loaded INTEGER,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS crawl_pages (
+            page_id SERIAL PRIMARY KEY,
+            job_id INTEGER NOT NULL REFERENCES crawl_jobs (job_id) ON DELETE CASCADE,
+            employer_id INTEGER NOT NULL,
+            params JSONB NOT NULL,
+            page INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            rows_loaded INTEGER,
+            vacancy_ids INTEGER[],
+            fetched_at TIMESTAMPTZ
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS crawl_pages_job_id_idx ON crawl_pages (job_id, status)",
+        "CREATE INDEX IF NOT EXISTS crawl_jobs_running_idx ON crawl_jobs (kind) WHERE status = 'running'",
+    ],
+    7: [
+        # Номер загрузки: увеличивается refresh_stats, по нему сбрасываются кэши аналитики (src.analytics.salary)
+        """
+        CREATE TABLE IF NOT EXISTS load_generation (
+            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            generation BIGINT NOT NULL DEFAULT 0,
+            loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        "INSERT INTO load_generation (id) VALUES (1) ON CONFLICT (id) DO NOTHING",
+    ],
+    8: [
+        # История состояний вакансий по датам загрузки; разделы по месяцам создаёт и удаляет src.create_db.history
+        """
+        CREATE TABLE IF NOT EXISTS vacancy_observations (
+            observed_on DATE NOT NULL,
+            vacancy_id INTEGER NOT NULL,
+            company_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            salary_from_rub INTEGER,
+            salary_to_rub INTEGER,
+            PRIMARY KEY (observed_on, vacancy_id)
+        ) PARTITION BY RANGE (observed_on)
+        """,
+        "CREATE INDEX IF NOT EXISTS vacancy_observations_company_id_idx "
+        "ON vacancy_observations (company_id, observed_on)",
+        "CREATE INDEX IF NOT EXISTS vacancy_observations_title_trgm_idx "
+        "ON vacancy_observations USING GIN (title gin_trgm_ops)",
+    ],
+    9: [
+        # Кластеры почти одинаковых вакансий (src.create_db.dedup) и статистика с одной вакансией на кластер
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS cluster_id INTEGER",
+        "CREATE INDEX IF NOT EXISTS vacancies_cluster_id_idx ON vacancies (cluster_id) WHERE NOT archived",
+        "DROP MATERIALIZED VIEW IF EXISTS company_stats",
+        """
+        CREATE MATERIALIZED VIEW company_stats AS
+        SELECT c.company_id, c.name, COUNT(v.vacancy_id) AS vacancies_count,
+               AVG(v.salary_from_rub) AS avg_salary,
+               percentile_cont(0.1) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p10_salary,
+               percentile_cont(0.25) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p25_salary,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY v.salary_from_rub) AS median_salary,
+               percentile_cont(0.75) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p75_salary,
+               percentile_cont(0.9) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p90_salary,
+               COUNT(v.vacancy_id) FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id)
+                   AS unique_vacancies_count,
+               AVG(v.salary_from_rub) FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id)
+                   AS unique_avg_salary
+        FROM companies c JOIN vacancies v ON c.company_id = v.company_id
+        WHERE NOT v.archived
+        GROUP BY c.company_id, c.name
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS company_stats_company_id_idx ON company_stats (company_id)",
+        "DROP MATERIALIZED VIEW IF EXISTS salary_stats",
+        """
+        CREATE MATERIALIZED VIEW salary_stats AS
+        SELECT 1 AS id, COUNT(salary_from_rub) AS salaries_count, AVG(salary_from_rub) AS avg_salary,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY salary_from_rub) AS median_salary,
+               AVG(salary_from_rub) FILTER (WHERE cluster_id IS NULL OR cluster_id = vacancy_id) AS unique_avg_salary
+        FROM vacancies
+        WHERE NOT archived
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS salary_stats_id_idx ON salary_stats (id)",
+    ],
+    10: [
+        # Количество запусков задания обхода: задание, которое не удаётся завершить, бросается (crawl_jobs.start_job)
+        "ALTER TABLE crawl_jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 1",
+    ],
+    11: [
+        # Перцентили зарплат компаний с одной вакансией на кластер (DBManager.get_company_salary_stats(dedup=True))
+        "DROP MATERIALIZED VIEW IF EXISTS company_stats",
+        """
+        CREATE MATERIALIZED VIEW company_stats AS
+        SELECT c.company_id, c.name, COUNT(v.vacancy_id) AS vacancies_count,
+               AVG(v.salary_from_rub) AS avg_salary,
+               percentile_cont(0.1) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p10_salary,
+               percentile_cont(0.25) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p25_salary,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY v.salary_from_rub) AS median_salary,
+               percentile_cont(0.75) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p75_salary,
+               percentile_cont(0.9) WITHIN GROUP (ORDER BY v.salary_from_rub) AS p90_salary,
+               COUNT(v.vacancy_id) FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id)
+                   AS unique_vacancies_count,
+               AVG(v.salary_from_rub) FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id)
+                   AS unique_avg_salary,
+               percentile_cont(0.1) WITHIN GROUP (ORDER BY v.salary_from_rub)
+                   FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id) AS unique_p10_salary,
+               percentile_cont(0.25) WITHIN GROUP (ORDER BY v.salary_from_rub)
+                   FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id) AS unique_p25_salary,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY v.salary_from_rub)
+                   FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id) AS unique_median_salary,
+               percentile_cont(0.75) WITHIN GROUP (ORDER BY v.salary_from_rub)
+                   FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id) AS unique_p75_salary,
+               percentile_cont(0.9) WITHIN GROUP (ORDER BY v.salary_from_rub)
+                   FILTER (WHERE v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id) AS unique_p90_salary
+        FROM companies c JOIN vacancies v ON c.company_id = v.company_id
+        WHERE NOT v.archived
+        GROUP BY c.company_id, c.name
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS company_stats_company_id_idx ON company_stats (company_id)",
+    ],
+    12: [
+        # Время последней полной выдачи работодателя: по нему инкрементальная загрузка периодически получает
+        # выдачу полностью, чтобы заметить изменения опубликованных вакансий (FULL_SYNC_INTERVAL)
+        "ALTER TABLE sync_state ADD COLUMN IF NOT EXISTS last_full_sync_at TIMESTAMPTZ",
+    ],
+}
+STATS_VIEWS: Tuple[str, ...] = ('company_stats', 'salary_stats')
+SCHEMA_VERSION: int = max(MIGRATIONS)
 
 
 def create_database(dbname: str) -> None:
@@ -14,20 +243,9 @@ def create_database(dbname: str) -> None:
     """
     try:
         # Подключение к серверу PostgreSQL без указания базы данных
-        conn = psycopg2.connect(
-            user=user_sql,
-            password=pas_sql,
-            host="localhost",
-            port="5432"
-        )
-        conn.autocommit = True
-        # Создание курсора
-        cur = conn.cursor()
-        # Создание базы данных с введённым именем
-        cur.execute(f"CREATE DATABASE {dbname}")
-        # Закрытие курсора и соединения
-        cur.close()
-        conn.close()
+        with connection(autocommit=True) as conn, conn.cursor() as cur:
+            # Создание базы данных с введённым именем
+            cur.execute(f"CREATE DATABASE {dbname}")
         print(f"База данных {Color.GREEN}{dbname}{Color.END} создана успешно!")
     except psycopg2.errors.DuplicateDatabase:
         print(f"База данных {Color.RED}{dbname}{Color.END} уже существует!")
@@ -44,10 +262,22 @@ def create_tables(dbname: str) -> None:
     шесть столбцов: 'vacancy_id' (SERIAL PRIMARY KEY), 'company_id' (INTEGER NOT NULL), 'title' (VARCHAR(255) NOT NULL),
     'salary_from' (VARCHAR(100)), 'salary_to' (VARCHAR(100)) и 'link' (VARCHAR(255) NOT NULL). Столбец 'company_id'
     в таблице 'vacancies' является внешним ключом, ссылающимся на столбец 'company_id' в таблице 'companies'.
-    Функция подключается к базе данных, используя указанное имя базы данных, пользователя, пароль, хост и порт.
+    Для инкрементального обновления в 'vacancies' есть столбцы 'published_at', 'archived' и 'updated_at'
+    (в существующие базы они добавляются через ALTER TABLE), а таблица 'sync_state' хранит для каждого
+    работодателя отметку самой свежей полученной публикации и время последней синхронизации.
+    После создания таблиц к базе применяются миграции из MIGRATIONS (см. migrate_schema): зарплаты переводятся
+    в целые числа с валютой, признаком 'gross' и рублёвым эквивалентом, создаются индексы, столбец
+    'search_vector' для полнотекстового поиска и триграммный индекс по названию вакансии, материализованные
+    представления 'company_stats' и 'salary_stats' со статистикой вакансий и зарплат, таблицы 'vacancy_details',
+    'skills' и 'vacancy_skills' для подробных данных вакансий (см. src.create_db.enrich), таблицы 'crawl_jobs'
+    и 'crawl_pages' с заданиями обхода API (см. src.create_db.crawl_jobs), таблица 'load_generation' с номером
+    загрузки, таблица 'vacancy_observations' с историей вакансий, разбитая на разделы по месяцам
+    (см. src.create_db.history), столбец 'cluster_id' с номером кластера почти одинаковых вакансий
+    (см. src.create_db.dedup).
+    Функция берёт соединение с указанной базой данных из общего пула (src.connection.connection).
     Затем она выполняет SQL-команды для создания таблиц и фиксирует изменения. Если возникает ошибка при создании
-    таблиц или подключении к базе данных, вызывается соответствующее исключение. Наконец, функция закрывает
-    соединение с базой данных.
+    таблиц или подключении к базе данных, вызывается соответствующее исключение. Наконец, соединение
+    возвращается в пул.
     """
     commands: List[str] = (
         """
@@ -66,90 +296,345 @@ def create_tables(dbname: str) -> None:
             link VARCHAR(255) NOT NULL,
             FOREIGN KEY (company_id) REFERENCES companies (company_id)
         )
+        """,
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS published_at TIMESTAMPTZ",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS archived BOOLEAN NOT NULL DEFAULT FALSE",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
         """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            employer_id INTEGER PRIMARY KEY,
+            last_published_at TIMESTAMPTZ,
+            last_synced_at TIMESTAMPTZ NOT NULL
+        )
+        """,
+        "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
     )
 
     try:
-        # Подключение к базе данных с введённым именем
-        conn = psycopg2.connect(
-            dbname=dbname,
-            user=user_sql,
-            password=pas_sql,
-            host="localhost",
-            port="5432"
-        )
-        cur = conn.cursor()
-        # Создание таблиц
-        for command in commands:
-            cur.execute(command)
-        # Закрытие курсора и коммит изменений
-        cur.close()
-        conn.commit()
+        # Подключение к базе данных с введённым именем, изменения фиксируются при выходе из блока
+        with connection(dbname) as conn, conn.cursor() as cur:
+            # Создание таблиц
+            for command in commands:
+                cur.execute(command)
+            migrate_schema(cur)
         print(f"Таблицы успешно созданы в базе данных {Color.GREEN}{dbname}{Color.END}!")
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Ошибка при создании таблиц: {Color.RED}{error}{Color.END}")
-    finally:
-        if conn is not None:
-            conn.close()
 
 
-def fill_tables(dbname: str, employer_ids: List[str]) -> None:
+def migrate_schema(cur) -> int:
+    """
+    Доводит схему базы до версии SCHEMA_VERSION, применяя недостающие миграции из MIGRATIONS по порядку.
+    Текущая версия хранится в таблице 'schema_version'; база без записи считается базой версии 1.
+    Возвращает:
+        int: Версия схемы после миграции.
+    """
+    cur.execute("SELECT version FROM schema_version")
+    row = cur.fetchone()
+    version: int = row[0] if row is not None else 1
+    if row is None:
+        cur.execute("INSERT INTO schema_version (version) VALUES (%s)", (version,))
+
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        for command in MIGRATIONS[target]:
+            cur.execute(command)
+        cur.execute("UPDATE schema_version SET version = %s", (target,))
+        print(f"Схема базы данных обновлена до версии {Color.GREEN}{target}{Color.END}")
+    return max(version, SCHEMA_VERSION)
+
+
+def archive_missing_vacancies(cur, employer_ids: List[str], seen_ids: Dict[str, Set[int]],
+                              cache: Optional[HTTPCache] = None, url: str = HH_API_URL) -> int:
+    """
+    Помечает архивными вакансии работодателей, которых больше нет в выдаче API HH.
+    Описание:
+        Для каждого работодателя сравнивается количество активных вакансий по данным API с количеством
+        полученных вакансий. Архивирование выполняется только для работодателей, выдача которых получена
+        полностью и количество вакансий которых известно, чтобы ошибка запроса не превратила живые вакансии
+        в архивные.
+    Параметры:
+        cur: Курсор psycopg2.
+        employer_ids (list): Идентификаторы работодателей, выдача которых была запрошена целиком.
+        seen_ids (dict): Идентификаторы полученных вакансий по идентификаторам работодателей.
+        cache (HTTPCache): Кэш ответов API.
+        url (str): Адрес метода поиска вакансий API.
+    Возвращает:
+        int: Количество вакансий, помеченных архивными.
+    """
+    found: Dict[str, int] = count_vacancies_by_employer_ids(employer_ids, url=url, cache=cache)
+
+    archived = 0
+    for employer_id in map(str, employer_ids):
+        ids = seen_ids.get(employer_id, set())
+        if employer_id not in found or len(ids) < found[employer_id]:
+            continue
+        cur.execute(
+            "UPDATE vacancies SET archived = TRUE, updated_at = now() "
+            "WHERE company_id = %s AND NOT archived AND NOT (vacancy_id = ANY(%s))",
+            (int(employer_id), list(ids)))
+        archived += cur.rowcount
+    return archived
+
+
+def find_stale_employers(cur, employer_ids: List[str], cache: Optional[HTTPCache] = None,
+                         url: str = HH_API_URL) -> List[str]:
+    """
+    Возвращает работодателей, у которых в базе активных вакансий больше, чем находит API HH.
+    Вызывается после загрузки новых вакансий, поэтому расхождение означает, что часть вакансий снята с публикации.
+    """
+    found: Dict[str, int] = count_vacancies_by_employer_ids(employer_ids, url=url, cache=cache)
+    cur.execute(
+        "SELECT company_id, COUNT(*) FROM vacancies WHERE NOT archived AND company_id = ANY(%s) GROUP BY company_id",
+        ([int(employer_id) for employer_id in employer_ids],))
+    return [str(company_id) for company_id, active in cur.fetchall() if active > found.get(str(company_id), active)]
+
+
+def vacancy_row(vac: Dict[str, Any], rates: Dict[str, float]) -> Tuple[Any, ...]:
+    """
+    Переводит вакансию из ответа API HH в строку для загрузки (порядок столбцов — VACANCY_COLUMNS).
+    Неуказанная зарплата становится NULL. Рублёвый эквивалент считается по курсам валют rates
+    (сколько единиц валюты стоит один рубль, как в справочнике API HH); для неизвестной валюты он равен NULL.
+    """
+    salary: Dict[str, Any] = vac.get('salary') or {}
+    salary_from = salary.get('from')
+    salary_to = salary.get('to')
+    currency = salary.get('currency')
+    rate = rates.get(currency)
+
+    def to_rub(value):
+        return round(value / rate) if value is not None and rate else None
+
+    return (vac['id'], vac['employer']['id'], vac['employer']['name'], vac['name'], salary_from, salary_to,
+            currency, salary.get('gross'), to_rub(salary_from), to_rub(salary_to),
+            vac['alternate_url'], vac.get('published_at'))
+
+
+def load_vacancy_pages(conn, cur, pages: Iterable[Tuple[int, Optional[List[Dict[str, Any]]]]],
+                       rates: Dict[str, float]) -> int:
+    """
+    Загружает страницы задания обхода в базу по мере их получения.
+    Описание:
+        Каждая вакансия сразу переводится в компактную строку (vacancy_row), а ответ API отбрасывается.
+        Строки записываются пачками по BATCH_SIZE через bulk_upsert_vacancies, и каждая пачка фиксируется
+        отдельно вместе с отметкой о загрузке её страниц в 'crawl_pages' (complete_pages). Поэтому первые строки
+        попадают в базу, пока следующие страницы ещё загружаются, память не зависит от размера выдачи,
+        а после сбоя загруженными считаются ровно те страницы, строки которых записаны.
+        Страницы, которые не удалось получить (None), остаются незагруженными.
+    Параметры:
+        conn: Соединение psycopg2.
+        cur: Курсор этого соединения.
+        pages (Iterable): Пары (идентификатор страницы в 'crawl_pages', вакансии страницы), например
+            iter_shard_pages.
+        rates (dict): Курсы валют для рублёвого эквивалента зарплат, см. get_currency_rates.
+    Возвращает:
+        int: Количество загруженных вакансий.
+    """
+    batch: List[Tuple[Any, ...]] = []
+    batch_pages: List[Tuple[int, List[int]]] = []
+    total = 0
+
+    def flush() -> None:
+        bulk_upsert_vacancies(cur, batch, report=False)
+        complete_pages(cur, batch_pages)
+        with metrics.span('db_commit'):
+            conn.commit()
+
+    for page_id, items in pages:
+        if items is None:
+            continue
+        with metrics.span('load_projection'):
+            batch.extend(vacancy_row(vac, rates) for vac in items)
+        batch_pages.append((page_id, [int(vac['id']) for vac in items]))
+        if len(batch) >= BATCH_SIZE:
+            flush()
+            total += len(batch)
+            batch, batch_pages = [], []
+    if batch_pages:
+        flush()
+        total += len(batch)
+    return total
+
+
+def run_crawl(conn, cur, kind: str, employer_ids: List[str], rates: Dict[str, float],
+              since: Optional[Dict[str, datetime]] = None, cache: Optional[HTTPCache] = None,
+              url: str = HH_API_URL) -> Tuple[int, Dict[str, Set[int]], bool]:
+    """
+    Выполняет или продолжает задание обхода API (см. src.create_db.crawl_jobs) и загружает его страницы.
+    Описание:
+        Выдача работодателей планируется по шардам (plan_shards), план страниц сохраняется в 'crawl_pages',
+        затем загружаются только незагруженные страницы. Если предыдущий запуск прервался, задание
+        продолжается с оставшихся страниц, а не с начала.
+    Параметры:
+        conn: Соединение psycopg2.
+        cur: Курсор этого соединения.
+        kind (str): Вид задания.
+        employer_ids (list): Идентификаторы работодателей.
+        rates (dict): Курсы валют.
+        since (dict): Отметки времени для инкрементальной загрузки, см. iter_vacancy_pages.
+        cache (HTTPCache): Кэш ответов API.
+        url (str): Адрес метода поиска вакансий API.
+    Возвращает:
+        tuple: Количество загруженных вакансий, идентификаторы вакансий задания по работодателям
+            и признак того, что все страницы задания загружены.
+    """
+    def plan() -> List[Tuple[str, Shard, int]]:
+        return [(employer_id, shard, shard_pages(found))
+                for employer_id, shard, found in plan_shards(employer_ids, url=url, since=since, cache=cache)]
+
+    job_id, resumed = start_job(cur, kind, employer_ids, plan)
+    conn.commit()
+    pages = pending_pages(cur, job_id)
+    if resumed:
+        print(f"Продолжается прерванная загрузка {Color.GREEN}№{job_id}{Color.END}: "
+              f"осталось {Color.GREEN}{len(pages)}{Color.END} страниц")
+
+    loaded = load_vacancy_pages(conn, cur, iter_shard_pages(pages, url=url, cache=cache), rates)
+    seen_ids = job_seen_ids(cur, job_id)
+    progress = finish_job(cur, job_id)
+    conn.commit()
+    if not progress['finished']:
+        print(f"Загрузка {Color.RED}№{job_id}{Color.END} не завершена: не получено {progress['pending']} страниц, "
+              f"она продолжится при следующем запуске")
+    return loaded, seen_ids, progress['finished']
+
+
+def refresh_stats(cur) -> None:
+    """
+    Пересчитывает материализованные представления со статистикой (STATS_VIEWS) и увеличивает номер загрузки
+    в таблице 'load_generation', по которому сбрасываются кэши аналитики и запросов DBManager.
+    Новый номер отправляется в канал 'load_generation' (pg_notify); уведомление доставляется подписанным
+    соединениям DBManager при фиксации транзакции загрузки.
+    Представления обновляются без блокировки чтения (CONCURRENTLY), поэтому запросы DBManager
+    во время пересчёта видят предыдущую статистику.
+    """
+    for view in STATS_VIEWS:
+        cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+    cur.execute("UPDATE load_generation SET generation = generation + 1, loaded_at = now()")
+    cur.execute("SELECT pg_notify('load_generation', generation::TEXT) FROM load_generation")
+
+
+def update_sync_state(cur, employer_ids: List[str], full_ids: Optional[List[str]] = None) -> None:
+    """
+    Сохраняет для каждого работодателя отметку самой свежей публикации из базы и время синхронизации.
+    Работодателям из full_ids (по умолчанию всем), чья выдача получена полностью, обновляется и время
+    последней полной выдачи 'last_full_sync_at'.
+    """
+    full_ids = employer_ids if full_ids is None else full_ids
+    cur.execute(
+        "INSERT INTO sync_state (employer_id, last_published_at, last_synced_at, last_full_sync_at) "
+        "SELECT e.id, (SELECT MAX(published_at) FROM vacancies v WHERE v.company_id = e.id), now(), "
+        "       CASE WHEN e.id = ANY(%s::INTEGER[]) THEN now() END "
+        "FROM unnest(%s::INTEGER[]) AS e(id) "
+        "ON CONFLICT (employer_id) DO UPDATE SET "
+        "last_published_at = EXCLUDED.last_published_at, last_synced_at = EXCLUDED.last_synced_at, "
+        "last_full_sync_at = COALESCE(EXCLUDED.last_full_sync_at, sync_state.last_full_sync_at)",
+        ([int(employer_id) for employer_id in full_ids], [int(employer_id) for employer_id in employer_ids]))
+
+
+def fill_tables(dbname: str, employer_ids: List[str], incremental: bool = False,
+                cache: Optional[HTTPCache] = None, url: str = HH_API_URL,
+                dictionaries_url: str = HH_DICTIONARIES_URL, enrich: bool = False) -> Optional[int]:
     """
     Заполняет таблицы в указанной базе данных данными, полученными из API.
+    Описание:
+        В полном режиме запрашиваются все вакансии работодателей, изменившиеся строки обновляются, а вакансии,
+        которых больше нет в выдаче, помечаются архивными.
+        В инкрементальном режиме (incremental=True) для каждого работодателя запрашиваются только вакансии,
+        опубликованные после отметки из таблицы 'sync_state' (date_from). Изменения уже опубликованных вакансий,
+        например новая зарплата без повторной публикации, такой отбор не находит, поэтому работодатели без
+        отметки или с полной выдачей старше FULL_SYNC_INTERVAL (переменная окружения HH_FULL_SYNC_HOURS,
+        по умолчанию 24 часа) загружаются полностью; неизменившиеся страницы полной выдачи подтверждаются
+        кэшем ответов (304). Полная выдача запрашивается и для работодателей, у которых в базе осталось больше
+        активных вакансий, чем находит API, чтобы пометить снятые с публикации вакансии архивными. Так
+        стоимость обновления между полными выдачами пропорциональна количеству новых вакансий, а не размеру
+        каталога, а изменённые вакансии попадают в базу не позже чем через FULL_SYNC_INTERVAL.
+        Загрузка выполняется заданиями обхода (run_crawl): план страниц и отметки о загруженных страницах
+        хранятся в базе, страницы записываются пачками по мере получения (load_vacancy_pages), поэтому после
+        сбоя повторный запуск загружает только недостающие страницы.
+        С enrich=True после загрузки вакансии дополняются подробными данными (enrich_vacancies).
+        В конце завершённой загрузки почти одинаковые активные вакансии объединяются в кластеры (deduplicate) —
+        после обогащения, потому что подписи кластеров строятся и по описанию, — состояние активных вакансий
+        записывается в историю (record_observations) и пересчитывается статистика (refresh_stats). Пока задание
+        не завершено, эти этапы, архивирование и обновление 'sync_state' откладываются: номер загрузки
+        не меняется, и кэши запросов не сбрасываются из-за неполных данных.
+        Если передан cache, запросы к API идут через кэш ответов (см. HTTPCache): неизменившиеся страницы
+        не загружаются повторно, а в конце выводится статистика кэша.
+        Время этапов загрузки и количество строк учитываются в src.metrics.metrics; если задана переменная
+        окружения HH_PROFILE, с загрузки снимается профиль cProfile (см. metrics.profiled).
+        Адреса url (поиск вакансий) и dictionaries_url (справочники) можно заменить, например, на локальную
+        имитацию API в бенчмарках.
     Вызывает:
         Exception: Если происходит ошибка при подключении к базе данных или выполнении запросов.
         psycopg2.DatabaseError: Если происходит ошибка при выполнении запросов к базе данных.
+    Возвращает:
+        int: Количество загруженных вакансий или None при ошибке.
     Выводит:
-        Сообщение об успешном добавлении данных в таблицы, если операция прошла успешно.
+        Количество загруженных вакансий и сообщение об успешном добавлении данных, если операция прошла успешно.
         Сообщение об ошибке, если произошла ошибка при добавлении данных.
     """
-    vacancies: List[Dict[str, Union[str, int]]] = get_vacancies_by_employer_ids(employer_ids)
-
     try:
         # Подключение к базе данных с введённым именем
-        conn = psycopg2.connect(
-            dbname=dbname,
-            user=user_sql,
-            password=pas_sql,
-            host="localhost",
-            port="5432"
-        )
-        cur = conn.cursor()
-
-        # Вставка данных о компаниях
-        company_names: Dict[int, str] = {vac['employer']['id']: vac['employer']['name'] for vac in vacancies}
-        company_data: List[Tuple[int, str]] = [(id, name) for id, name in company_names.items()]
-        insert_query = ("INSERT INTO companies (company_id, name) "
-                        "VALUES (%s, %s)"
-                        "ON CONFLICT (company_id) DO NOTHING")
-        cur.executemany(insert_query, company_data)
-
-        # Вставка данных о вакансиях
-        vacancy_data: List[Tuple[int, int, str, str, str, str]] = []
-        for vac in vacancies:
-            vacancy_id = vac['id']
-            company_id = vac['employer']['id']
-            title = vac['name']
-            if 'salary' in vac and vac['salary'] is not None:
-                salary_from = vac['salary'].get('from', 'Зарплата не указана')
-                salary_to = vac['salary'].get('to', 'Зарплата не указана')
-            else:
-                salary_from = 'Зарплата не указана'
-                salary_to = 'Зарплата не указана'
-            link = vac['alternate_url']
-            vacancy_data.append((vacancy_id, company_id, title, salary_from, salary_to, link))
-
-        insert_query = (
-            "INSERT INTO vacancies "
-            "(vacancy_id, company_id, title, salary_from, salary_to, link) "
-            "VALUES (%s, %s, %s, %s, %s, %s)"
-            "ON CONFLICT (vacancy_id) DO NOTHING")
-        cur.executemany(insert_query, vacancy_data)
-
-        conn.commit()
+        with metrics.profiled('fill_tables'), metrics.span('fill_tables', incremental=incremental), \
+                connection(dbname) as conn, conn.cursor() as cur:
+            since: Dict[str, datetime] = {}
+            if incremental:
+                # Работодатели, давно не получавшие полную выдачу, остаются без отметки и загружаются полностью
+                cur.execute(
+                    "SELECT employer_id, last_published_at FROM sync_state "
+                    "WHERE employer_id = ANY(%s) AND last_published_at IS NOT NULL "
+                    "AND last_full_sync_at > now() - %s",
+                    ([int(employer_id) for employer_id in employer_ids], FULL_SYNC_INTERVAL))
+                since = {str(employer_id): last_published_at
+                         for employer_id, last_published_at in cur.fetchall()}
+
+            start = time.perf_counter()
+            rates: Dict[str, float] = get_currency_rates(dictionaries_url)
+            loaded, seen_ids, finished = run_crawl(conn, cur, 'incremental' if incremental else 'full',
+                                                   employer_ids, rates, since, cache, url)
+
+            full_ids = list(employer_ids)
+            if finished and incremental:
+                # Работодатели без отметки получены полностью, остальные проверяются по количеству вакансий
+                full_ids = [employer_id for employer_id in employer_ids if str(employer_id) not in since]
+                stale_ids = find_stale_employers(cur, [employer_id for employer_id in employer_ids
+                                                       if str(employer_id) in since], cache, url)
+                if stale_ids:
+                    stale_loaded, stale_seen_ids, stale_finished = run_crawl(conn, cur, 'stale', stale_ids, rates,
+                                                                             cache=cache, url=url)
+                    loaded += stale_loaded
+                    if stale_finished:
+                        archive_missing_vacancies(cur, stale_ids, stale_seen_ids, cache, url)
+                if full_ids:
+                    archive_missing_vacancies(cur, full_ids, seen_ids, cache, url)
+                if stale_ids and stale_finished:
+                    full_ids += stale_ids
+            elif finished:
+                archive_missing_vacancies(cur, employer_ids, seen_ids, cache, url)
+
+            if finished:
+                update_sync_state(cur, employer_ids, full_ids)
+            if enrich:
+                # Обогащение идёт в своём соединении, поэтому загруженные вакансии фиксируются до него
+                conn.commit()
+                enrich_vacancies(dbname, cache=cache, url=url)
+            if finished:
+                # Незавершённая загрузка не пишет историю и не сбрасывает кэши: данные в базе ещё неполные.
+                # Кластеры строятся после обогащения: подписи учитывают начало описания вакансии.
+                # Импорт здесь, чтобы NumPy загружался только при заполнении таблиц
+                from src.create_db.dedup import deduplicate
+                deduplicate(cur)
+                record_observations(cur)
+                refresh_stats(cur)
+
+        elapsed = time.perf_counter() - start
+        metrics.set_gauge('fill_tables_rows_per_second', loaded / elapsed if elapsed > 0 else 0)
+        print(f"Загружено {Color.GREEN}{loaded}{Color.END} вакансий за {elapsed:.2f} с")
+        if cache is not None:
+            stats = cache.stats()
+            print(f"Кэш API: из кэша {Color.GREEN}{stats['hits']}{Color.END}, без свежей записи {stats['misses']}, "
+                  f"из них подтверждено (304) {Color.GREEN}{stats['revalidated']}{Color.END}")
         print(f"Данные успешно добавлены в таблицы базы данных {Color.GREEN}{dbname}{Color.END}!")
+        return loaded
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"{Color.RED}Ошибка при добавлении данных:{Color.END}", error)
-    finally:
-        if conn is not None:
-            conn.close()
+        return None
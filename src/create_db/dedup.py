@@ -0,0 +1,228 @@
+import time
+from typing import List, Dict, Any, Tuple, Optional, Sequence
+
+import numpy as np
+
+from src.color.color import Color
+from src.create_db.bulk_load import copy_rows
+from src.metrics import metrics
+
+SHINGLE_WORDS: int = 2  # Длина шингла в словах
+DESCRIPTION_CHARS: int = 200  # Сколько начальных символов описания (без разметки) добавляется к названию
+NUM_PERM: int = 64  # Длина подписи MinHash
+BANDS: int = 16  # Полосы LSH по ROWS значений подписи: кандидаты — подписи, совпавшие хотя бы в одной полосе
+ROWS: int = NUM_PERM // BANDS
+THRESHOLD: float = 0.7  # Минимальное сходство (доля совпавших значений подписи) для объединения вакансий
+CHUNK_DOCS: int = 50_000  # Количество вакансий, подписи которых считаются за один проход
+SEED: int = 1  # Зерно параметров хеш-функций: одинаковые тексты получают одинаковые подписи между запусками
+
+_rng = np.random.default_rng(SEED)
+# Хеш-функции MinHash: x -> (a * x + b) mod 2^32 с нечётным a (перестановки 32-битных значений)
+PERM_A: np.ndarray = (_rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint32) << np.uint32(1)) | np.uint32(1)
+PERM_B: np.ndarray = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint32)
+BAND_MULTIPLIERS: np.ndarray = _rng.integers(1, 1 << 63, ROWS, dtype=np.uint64) | np.uint64(1)
+MAX_WORD_CHARS: int = 64  # Символы дальше этой позиции в слове хешируются с одним множителем
+# Хеш слова — сумма кодов символов с множителями их позиций в слове
+CHAR_MULTIPLIERS: np.ndarray = _rng.integers(1, 1 << 63, MAX_WORD_CHARS, dtype=np.uint64) | np.uint64(1)
+
+SEPARATOR: str = '\x00'
+PADDING: str = '\ue000'  # Служебное слово на границах текста (символ из области частного использования)
+# Символы, из которых состоят слова (буквы и цифры); коды за пределами таблицы считаются границами слов
+WORD_CHARS: np.ndarray = np.array([chr(code).isalnum() for code in range(0x10000)])
+WORD_CHARS[ord(PADDING)] = True
+
+# Активные вакансии в порядке идентификаторов: название, регион и начало описания без HTML-разметки
+DEDUP_QUERY: str = """
+    SELECT v.vacancy_id, v.company_id, v.cluster_id,
+           concat_ws(' ', v.title, d.area, left(regexp_replace(d.description, '<[^>]*>', ' ', 'g'), %s))
+    FROM vacancies v LEFT JOIN vacancy_details d ON d.vacancy_id = v.vacancy_id
+    WHERE NOT v.archived
+    ORDER BY v.vacancy_id
+    """
+STAGING_CLUSTERS: str = """
+    CREATE TEMP TABLE IF NOT EXISTS staging_clusters (vacancy_id INTEGER, cluster_id INTEGER) ON COMMIT DROP
+    """
+UPDATE_CLUSTERS: str = """
+    UPDATE vacancies v SET cluster_id = s.cluster_id
+    FROM staging_clusters s
+    WHERE v.vacancy_id = s.vacancy_id AND v.cluster_id IS DISTINCT FROM s.cluster_id
+    """
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """
+    Перемешивает биты 64-битных значений (финализатор splitmix64), чтобы близкие значения давали далёкие хеши.
+    """
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def shingle_hashes(texts: Sequence[str], size: int = SHINGLE_WORDS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Разбивает тексты на шинглы из size соседних слов и хеширует их без цикла по словам и символам.
+    Описание:
+        Тексты приводятся к нижнему регистру и склеиваются через разделитель в один массив кодов символов;
+        всё, кроме букв и цифр (WORD_CHARS), считается границей слов. Хеш слова — сумма кодов символов
+        с множителями их позиций в слове, хеш шингла — комбинация хешей size соседних слов одного текста.
+        Каждый текст дополняется служебным словом с обеих сторон, поэтому у любого текста, даже пустого,
+        есть хотя бы один шингл, а первое и последнее слово участвуют в шинглах наравне с остальными.
+    Возвращает:
+        tuple: 32-битные хеши шинглов и номера их текстов (по возрастанию).
+    """
+    padding = ' '.join(PADDING * (size - 1))
+    joined = SEPARATOR.join(f'{padding} {text} {padding}' for text in texts).lower()
+    codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32)
+
+    word = WORD_CHARS[np.minimum(codes, 0xFFFF)]
+    starts = word.copy()
+    starts[1:] &= ~word[:-1]
+    chars = codes[word]
+    word_starts = np.flatnonzero(starts[word])
+    offsets = np.arange(len(chars)) - np.repeat(word_starts, np.diff(word_starts, append=len(chars)))
+    words = _mix64(np.add.reduceat(chars * CHAR_MULTIPLIERS[np.minimum(offsets, MAX_WORD_CHARS - 1)], word_starts))
+    word_docs = np.searchsorted(np.flatnonzero(codes == 0), np.flatnonzero(starts))
+
+    windows = len(words) - size + 1
+    hashes = words[:windows]
+    for offset in range(1, size):
+        hashes = _mix64(hashes) ^ words[offset:offset + windows]
+    valid = word_docs[size - 1:size - 1 + windows] == word_docs[:windows]
+    return (_mix64(hashes[valid]) >> np.uint64(32)).astype(np.uint32), word_docs[:windows][valid]
+
+
+def minhash_signatures(texts: Sequence[str], chunk_docs: int = CHUNK_DOCS) -> np.ndarray:
+    """
+    Возвращает подписи MinHash текстов: для каждой из NUM_PERM хеш-функций — минимальное значение
+    по шинглам текста. Доля совпавших значений подписей двух текстов оценивает сходство Жаккара
+    их множеств шинглов. Тексты обрабатываются порциями по chunk_docs, чтобы ограничить память.
+    Возвращает:
+        np.ndarray: Подписи формы (len(texts), NUM_PERM), uint32.
+    """
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), chunk_docs):
+        hashes, doc_ids = shingle_hashes(texts[start:start + chunk_docs])
+        starts = np.flatnonzero(np.diff(doc_ids, prepend=-1))
+        for perm in range(NUM_PERM):
+            signatures[start:start + len(starts), perm] = np.minimum.reduceat(hashes * PERM_A[perm] + PERM_B[perm],
+                                                                               starts)
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, groups: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Находит пары кандидатов в дубликаты по LSH: подпись делится на BANDS полос по ROWS значений,
+    и вакансии с одинаковой полосой (и одинаковой группой groups, например компанией) попадают в одну корзину.
+    Корзины находятся сортировкой ключей полос, а не сравнением всех пар: внутри корзины каждая вакансия
+    связывается с предыдущей и с первой вакансией корзины, поэтому количество пар линейно по числу вакансий.
+    Возвращает:
+        np.ndarray: Пары индексов формы (количество пар, 2).
+    """
+    pairs = []
+    group_keys = np.zeros(len(signatures), dtype=np.uint64) if groups is None else _mix64(groups.astype(np.uint64))
+    for band in range(BANDS):
+        values = signatures[:, band * ROWS:(band + 1) * ROWS].astype(np.uint64)
+        keys = group_keys
+        for row in range(ROWS):
+            keys = (keys ^ values[:, row]) * BAND_MULTIPLIERS[row]
+        order = np.argsort(keys, kind='stable')
+        same = keys[order[1:]] == keys[order[:-1]]
+        if not same.any():
+            continue
+        first = np.maximum.accumulate(np.where(np.concatenate(([False], same)), 0, np.arange(len(order))))
+        following = np.flatnonzero(same) + 1
+        pairs.append(np.stack((order[following - 1], order[following]), axis=1))
+        pairs.append(np.stack((order[first[following]], order[following]), axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    codes = np.sort(pairs[:, 0] * len(signatures) + pairs[:, 1])
+    codes = codes[np.concatenate(([True], codes[1:] != codes[:-1]))]
+    return np.stack(np.divmod(codes, len(signatures)), axis=1)
+
+
+def connected_components(count: int, pairs: np.ndarray) -> np.ndarray:
+    """
+    Возвращает для каждого из count элементов наименьший индекс его компоненты связности по рёбрам pairs
+    (распространение меток с перескоком по указателям, без цикла по рёбрам в Python).
+    """
+    labels = np.arange(count)
+    if not len(pairs):
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        smallest = np.minimum(labels[left], labels[right])
+        previous = labels.copy()
+        np.minimum.at(labels, left, smallest)
+        np.minimum.at(labels, right, smallest)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def cluster_signatures(signatures: np.ndarray, groups: Optional[np.ndarray] = None,
+                       threshold: float = THRESHOLD) -> np.ndarray:
+    """
+    Объединяет в кластеры подписи, сходство которых не меньше threshold.
+    Кандидаты из candidate_pairs проверяются по доле совпавших значений подписи, подтверждённые пары
+    связываются в компоненты (connected_components).
+    Возвращает:
+        np.ndarray: Для каждой подписи — индекс первой подписи её кластера.
+    """
+    pairs = candidate_pairs(signatures, groups)
+    if len(pairs):
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[similarity >= threshold]
+    return connected_components(len(signatures), pairs)
+
+
+def deduplicate(cur, threshold: float = THRESHOLD, cross_company: bool = False) -> Dict[str, Any]:
+    """
+    Находит почти одинаковые активные вакансии и записывает номер кластера в столбец 'vacancies.cluster_id'.
+    Описание:
+        Для каждой вакансии по названию и началу описания (если оно получено enrich_vacancies) строится подпись
+        MinHash (minhash_signatures), кандидаты в дубликаты находятся по LSH (candidate_pairs) без попарного
+        сравнения всех вакансий, подтверждённые пары объединяются в кластеры. Номер кластера — наименьший
+        идентификатор вакансии кластера; у вакансии без дубликатов он равен её идентификатору.
+        По умолчанию дубликатами считаются только вакансии одной компании; с cross_company=True — любые.
+        Изменившиеся номера записываются через COPY во временную таблицу одним UPDATE.
+        Запросы со статистикой без повторов (см. DBManager, параметр dedup) учитывают из каждого кластера
+        только вакансию с vacancy_id = cluster_id.
+    Параметры:
+        cur: Курсор psycopg2.
+        threshold (float): Минимальное оценённое сходство Жаккара шинглов.
+        cross_company (bool): Искать дубликаты среди вакансий разных компаний.
+    Возвращает:
+        dict: Количество вакансий, кластеров, дубликатов, изменённых строк и время в секундах.
+    """
+    start = time.perf_counter()
+    with metrics.span('dedup'):
+        cur.execute(DEDUP_QUERY, (DESCRIPTION_CHARS,))
+        rows: List[Tuple[int, int, Optional[int], str]] = cur.fetchall()
+        if not rows:
+            return {'vacancies': 0, 'clusters': 0, 'duplicates': 0, 'updated': 0, 'seconds': 0.0}
+        vacancy_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        company_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        current = np.fromiter((row[2] if row[2] is not None else -1 for row in rows), dtype=np.int64,
+                              count=len(rows))
+
+        labels = cluster_signatures(minhash_signatures([row[3] for row in rows]),
+                                    None if cross_company else company_ids, threshold)
+        clusters = vacancy_ids[labels]
+        changed = np.flatnonzero(clusters != current)
+        if len(changed):
+            cur.execute(STAGING_CLUSTERS)
+            copy_rows(cur, 'staging_clusters', ('vacancy_id', 'cluster_id'),
+                      list(zip(vacancy_ids[changed].tolist(), clusters[changed].tolist())))
+            cur.execute(UPDATE_CLUSTERS)
+    elapsed = time.perf_counter() - start
+
+    cluster_count = int(np.count_nonzero(labels == np.arange(len(labels))))
+    result = {'vacancies': len(rows), 'clusters': cluster_count, 'duplicates': len(rows) - cluster_count,
+              'updated': int(len(changed)), 'seconds': round(elapsed, 3)}
+    metrics.set_gauge('dedup_duplicates', result['duplicates'])
+    print(f"Найдено {Color.GREEN}{result['duplicates']}{Color.END} повторов среди {len(rows)} вакансий "
+          f"за {elapsed:.2f} с")
+    return result
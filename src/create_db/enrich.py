@@ -0,0 +1,137 @@
+import time
+import psycopg2
+from datetime import datetime
+from typing import List, Dict, Tuple, Any, Optional
+from psycopg2.extras import execute_values
+from src.color.color import Color
+from src.api.hh_api import iter_vacancy_details, MAX_WORKERS, HH_API_URL
+from src.api.http_cache import HTTPCache
+from src.connection.connection import connection
+from src.metrics import metrics
+
+DETAILS_BATCH_SIZE: int = 500  # Количество вакансий, подробные данные которых фиксируются за одну транзакцию
+
+PENDING_DETAILS: str = """
+    SELECT v.vacancy_id FROM vacancies v
+    LEFT JOIN vacancy_details d ON d.vacancy_id = v.vacancy_id
+    WHERE NOT v.archived AND (d.vacancy_id IS NULL OR d.fetched_at < v.updated_at)
+    ORDER BY v.vacancy_id
+    """
+
+UPSERT_DETAILS: str = """
+    INSERT INTO vacancy_details (vacancy_id, description, experience, schedule, employment, area, fetched_at)
+    VALUES %s
+    ON CONFLICT (vacancy_id) DO UPDATE SET
+        description = EXCLUDED.description, experience = EXCLUDED.experience, schedule = EXCLUDED.schedule,
+        employment = EXCLUDED.employment, area = EXCLUDED.area, fetched_at = EXCLUDED.fetched_at
+    """
+
+INSERT_SKILLS: str = """
+    INSERT INTO skills (name) SELECT DISTINCT unnest(%s::TEXT[]) ORDER BY 1
+    ON CONFLICT (name) DO NOTHING
+    """
+
+LINK_SKILLS: str = """
+    INSERT INTO vacancy_skills (vacancy_id, skill_id)
+    SELECT l.vacancy_id, s.skill_id FROM unnest(%s::INTEGER[], %s::TEXT[]) AS l(vacancy_id, name)
+    JOIN skills s ON s.name = l.name
+    ON CONFLICT DO NOTHING
+    """
+
+
+def _name(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    return value.get('name') if value else None
+
+
+def detail_row(detail: Dict[str, Any]) -> Tuple[Any, ...]:
+    """
+    Переводит ответ /vacancies/{id} в строку таблицы 'vacancy_details' (без fetched_at).
+    """
+    return (int(detail['id']), detail.get('description'), _name(detail.get('experience')),
+            _name(detail.get('schedule')), _name(detail.get('employment')), _name(detail.get('area')))
+
+
+def detail_skills(detail: Dict[str, Any]) -> List[str]:
+    """
+    Возвращает ключевые навыки вакансии без повторов, в порядке из ответа API.
+    """
+    names = (skill.get('name', '').strip() for skill in detail.get('key_skills') or [])
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def save_details(cur, details: List[Dict[str, Any]], fetched_at: datetime) -> None:
+    """
+    Записывает пачку подробных данных вакансий и их навыки.
+    Описание:
+        Строки 'vacancy_details' обновляются одной командой INSERT ... ON CONFLICT. Новые навыки добавляются
+        в справочник 'skills', а связи 'vacancy_skills' для вакансий пачки заменяются полученными, поэтому
+        удалённые из вакансии навыки тоже перестают с ней связываться.
+        В fetched_at записывается момент начала обогащения, а не записи пачки, поэтому вакансия, изменённая
+        во время обогащения, будет запрошена повторно.
+    """
+    if not details:
+        return
+    rows = [detail_row(detail) + (fetched_at,) for detail in details]
+    execute_values(cur, UPSERT_DETAILS, rows)
+
+    vacancy_ids: List[int] = []
+    names: List[str] = []
+    for detail in details:
+        for name in detail_skills(detail):
+            vacancy_ids.append(int(detail['id']))
+            names.append(name)
+    cur.execute("DELETE FROM vacancy_skills WHERE vacancy_id = ANY(%s)", ([row[0] for row in rows],))
+    if names:
+        cur.execute(INSERT_SKILLS, (names,))
+        cur.execute(LINK_SKILLS, (vacancy_ids, names))
+
+
+def enrich_vacancies(dbname: str, max_workers: int = MAX_WORKERS, url: str = HH_API_URL,
+                     cache: Optional[HTTPCache] = None) -> Optional[int]:
+    """
+    Дополняет вакансии подробными данными из API HH: описанием, опытом, графиком, типом занятости, регионом
+    и ключевыми навыками.
+    Описание:
+        Запрашиваются только активные вакансии без подробных данных или изменившиеся после их получения
+        (fetched_at < updated_at). Данные загружаются параллельно (iter_vacancy_details) и фиксируются пачками
+        по DETAILS_BATCH_SIZE, поэтому прерванное обогащение при следующем запуске продолжается с вакансий,
+        которые ещё не получены.
+    Параметры:
+        dbname (str): Имя базы данных.
+        max_workers (int): Максимальное количество одновременных запросов к API.
+        url (str): Адрес метода поиска вакансий.
+        cache (HTTPCache): Кэш ответов API.
+    Возвращает:
+        int: Количество вакансий, получивших подробные данные, или None при ошибке.
+    Выводит:
+        Количество обработанных вакансий и время обогащения или сообщение об ошибке.
+    """
+    try:
+        with metrics.profiled('enrich'), metrics.span('enrich'), connection(dbname) as conn, conn.cursor() as cur:
+            cur.execute("SELECT now()")
+            started_at: datetime = cur.fetchone()[0]
+            cur.execute(PENDING_DETAILS)
+            vacancy_ids = [vacancy_id for vacancy_id, in cur.fetchall()]
+            conn.commit()
+
+            start = time.perf_counter()
+            enriched = 0
+            batch: List[Dict[str, Any]] = []
+            for detail in iter_vacancy_details(vacancy_ids, max_workers, url, cache):
+                batch.append(detail)
+                if len(batch) >= DETAILS_BATCH_SIZE:
+                    with metrics.span('db_save_details'):
+                        save_details(cur, batch, started_at)
+                        conn.commit()
+                    enriched += len(batch)
+                    batch = []
+            save_details(cur, batch, started_at)
+            enriched += len(batch)
+            metrics.inc('enrich_details_total', enriched)
+
+        print(f"Подробные данные получены для {Color.GREEN}{enriched}{Color.END} из {len(vacancy_ids)} вакансий "
+              f"за {time.perf_counter() - start:.2f} с")
+        return enriched
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"{Color.RED}Ошибка при получении подробных данных вакансий:{Color.END}", error)
+        return None
@@ -0,0 +1,119 @@
+import os
+from datetime import date
+from typing import List, Optional
+
+from src.color.color import Color
+from src.metrics import metrics
+
+HISTORY_TABLE: str = 'vacancy_observations'
+# Сколько месяцев истории хранится; разделы старше удаляются при каждой загрузке
+RETENTION_MONTHS: int = int(os.environ.get('HH_HISTORY_MONTHS', 24))
+PARTITIONS_AHEAD: int = 1  # Сколько разделов следующих месяцев создаётся заранее
+
+# Снимок дня заменяется целиком: вакансии, архивированные между загрузками одного дня, в нём не остаются
+DELETE_OBSERVATIONS: str = f"DELETE FROM {HISTORY_TABLE} WHERE observed_on = %s"
+RECORD_OBSERVATIONS: str = f"""
+    INSERT INTO {HISTORY_TABLE} (observed_on, vacancy_id, company_id, title, salary_from_rub, salary_to_rub)
+    SELECT %s, vacancy_id, company_id, title, salary_from_rub, salary_to_rub
+    FROM vacancies
+    WHERE NOT archived
+    """
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Возвращает первое число месяца, отстоящего от month на months месяцев.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """
+    Возвращает имя раздела истории за месяц, например 'vacancy_observations_y2024m04'.
+    """
+    return f'{HISTORY_TABLE}_y{month.year}m{month.month:02d}'
+
+
+def list_partitions(cur) -> List[date]:
+    """
+    Возвращает месяцы, для которых созданы разделы истории, по возрастанию.
+    """
+    cur.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = %s::REGCLASS", (HISTORY_TABLE,))
+    prefix = f'{HISTORY_TABLE}_y'
+    return sorted(date(int(name[len(prefix):len(prefix) + 4]), int(name[-2:]), 1)
+                  for name, in cur.fetchall() if name.startswith(prefix))
+
+
+def ensure_partitions(cur, day: date, ahead: int = PARTITIONS_AHEAD) -> List[date]:
+    """
+    Создаёт недостающие разделы истории для месяца day и ahead следующих месяцев.
+    Раздел следующего месяца создаётся заранее, чтобы загрузка в первый день месяца не ждала DDL.
+    Возвращает:
+        list: Месяцы созданных разделов.
+    """
+    existing = set(list_partitions(cur))
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(day, offset)
+        if month in existing:
+            continue
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {HISTORY_TABLE} "
+            f"FOR VALUES FROM (%s) TO (%s)", (month, add_months(month, 1)))
+        created.append(month)
+    return created
+
+
+def drop_old_partitions(cur, day: date, retention_months: int = RETENTION_MONTHS) -> List[date]:
+    """
+    Удаляет разделы истории за месяцы, закончившиеся раньше, чем retention_months месяцев до месяца day.
+    Удаление раздела целиком не оставляет мёртвых строк и не требует VACUUM, в отличие от DELETE.
+    Возвращает:
+        list: Месяцы удалённых разделов.
+    """
+    cutoff = add_months(day, -retention_months)
+    dropped = [month for month in list_partitions(cur) if month < cutoff]
+    for month in dropped:
+        cur.execute(f"DROP TABLE IF EXISTS {partition_name(month)}")
+    return dropped
+
+
+def record_observations(cur, observed_on: Optional[date] = None,
+                        retention_months: int = RETENTION_MONTHS) -> int:
+    """
+    Записывает в историю состояние активных вакансий на дату загрузки.
+    Описание:
+        История хранится в таблице 'vacancy_observations', разбитой на разделы по месяцам (observed_on):
+        по одной строке на вакансию за каждую дату загрузки с названием, компанией и зарплатой в рублях.
+        Строки копируются из 'vacancies' одним запросом INSERT ... SELECT на сервере. Повторная загрузка
+        в тот же день заменяет наблюдения этого дня: в той же транзакции прежние строки дня удаляются,
+        поэтому вакансии, архивированные между загрузками, в снимок дня не попадают. Вызывается только
+        после завершённого обхода API (fill_tables). Перед записью создаются недостающие разделы
+        (ensure_partitions), после — удаляются разделы старше retention_months месяцев (drop_old_partitions).
+        Запросы последнего состояния (DBManager, company_stats) читают 'vacancies' и от объёма истории
+        не зависят.
+    Параметры:
+        cur: Курсор psycopg2.
+        observed_on (date): Дата наблюдения; по умолчанию текущая дата сервера базы.
+        retention_months (int): Сколько месяцев истории хранить.
+    Возвращает:
+        int: Количество записанных наблюдений.
+    """
+    if observed_on is None:
+        cur.execute("SELECT current_date")
+        observed_on = cur.fetchone()[0]
+    with metrics.span('history_record'):
+        created = ensure_partitions(cur, observed_on)
+        cur.execute(DELETE_OBSERVATIONS, (observed_on,))
+        cur.execute(RECORD_OBSERVATIONS, (observed_on,))
+        recorded = cur.rowcount
+        dropped = drop_old_partitions(cur, observed_on, retention_months)
+    metrics.inc('history_observations_total', recorded)
+    for month in created:
+        print(f"Создан раздел истории {Color.GREEN}{partition_name(month)}{Color.END}")
+    for month in dropped:
+        print(f"Удалён раздел истории {Color.RED}{partition_name(month)}{Color.END} (старше {retention_months} мес.)")
+    return recorded
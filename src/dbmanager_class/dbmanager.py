@@ -1,10 +1,112 @@
+import time
+from datetime import date, timedelta
+from functools import wraps
+
 import psycopg2
-import os
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from src.color.color import Color
-from typing import List, Tuple
+from src.connection.connection import acquire, release, user_sql, pas_sql, HOST, PORT
+from src.dbmanager_class.result_cache import ResultCache, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_BYTES
+from src.metrics import metrics
+from typing import List, Tuple, Optional, Iterator, Sequence
+
+ITERSIZE: int = 2000  # Количество строк, получаемых серверным курсором за один запрос
+PAGE_SIZE: int = 50  # Количество вакансий на странице при постраничном выводе
+GENERATION_CHANNEL: str = 'load_generation'  # Канал NOTIFY, в который refresh_stats сообщает номер новой загрузки
+GENERATION_CHECK_INTERVAL: float = 30.0  # Как часто номер загрузки перечитывается из базы, если уведомлений не было
+TREND_DAYS: int = 90  # Период динамики зарплат по умолчанию, дней до сегодняшнего дня
+TREND_PERIODS: Tuple[str, ...] = ('day', 'week', 'month')
+# Вакансия, представляющая свой кластер почти одинаковых вакансий (src.create_db.dedup), или вакансия без кластера
+UNIQUE_VACANCY: str = "(v.cluster_id IS NULL OR v.cluster_id = v.vacancy_id)"
+
+# Последнее наблюдение каждой вакансии в каждом периоде: вакансия, наблюдавшаяся в нескольких загрузках периода,
+# учитывается один раз. Условие на observed_on ограничивает чтение разделами истории за [since, until)
+LATEST_OBSERVATIONS: str = """
+    SELECT DISTINCT ON (period, o.vacancy_id) date_trunc(%(period)s, o.observed_on)::DATE AS period,
+           o.company_id, o.salary_from_rub
+    FROM vacancy_observations o
+    WHERE o.observed_on >= %(since)s AND o.observed_on < %(until)s AND {condition}
+    ORDER BY period, o.vacancy_id, o.observed_on DESC
+    """
+
+
+# Запросы, общие для DBManager и HTTP-сервиса (src.service.service, переводит параметры в формат asyncpg).
+# В шаблонах {prefix} и {condition} подставляет dedup_sql
+COMPANIES_COUNT: str = "SELECT name, {prefix}vacancies_count FROM company_stats"
+COMPANY_SALARY_STATS: str = (
+    "SELECT name, {prefix}vacancies_count, {prefix}avg_salary, {prefix}p10_salary, {prefix}p25_salary, "
+    "{prefix}median_salary, {prefix}p75_salary, {prefix}p90_salary "
+    "FROM company_stats ORDER BY {prefix}vacancies_count DESC")
+AVG_SALARY: str = "SELECT {prefix}avg_salary FROM salary_stats"
+HIGHER_SALARY_VACANCIES: str = (
+    "SELECT c.name, v.title, v.salary_from_rub, v.salary_to_rub, v.link "
+    "FROM companies c JOIN vacancies v ON c.company_id = v.company_id "
+    "WHERE NOT v.archived{condition} AND v.salary_from_rub > (SELECT {prefix}avg_salary FROM salary_stats)")
+# Ранжированный поиск по названию (см. DBManager.search_vacancies); первая страница — last_rank и last_id NULL
+SEARCH_VACANCIES: str = (
+    "SELECT name, title, salary_from_rub, salary_to_rub, link, rank, vacancy_id FROM ("
+    "  SELECT c.name, v.title, v.salary_from_rub, v.salary_to_rub, v.link, v.vacancy_id, "
+    "         (ts_rank(v.search_vector, q.tsquery) + word_similarity(q.text, v.title))::REAL AS rank "
+    "  FROM vacancies v JOIN companies c ON c.company_id = v.company_id, "
+    "       (SELECT websearch_to_tsquery('russian', %(query)s) || websearch_to_tsquery('english', %(query)s) "
+    "               AS tsquery, %(query)s::TEXT AS text) q "
+    "  WHERE NOT v.archived "
+    "    AND (v.search_vector @@ q.tsquery OR q.text <%% v.title OR v.title ILIKE %(pattern)s)"
+    ") ranked "
+    "WHERE %(last_rank)s::REAL IS NULL OR (rank, vacancy_id) < (%(last_rank)s::REAL, %(last_id)s::INTEGER) "
+    "ORDER BY rank DESC, vacancy_id DESC LIMIT %(limit)s")
+SEARCH_PARAMS: Tuple[str, ...] = ('query', 'pattern', 'last_rank', 'last_id', 'limit')
+
+
+def dedup_sql(template: str, dedup: bool) -> str:
+    """
+    Подставляет в шаблон запроса столбцы статистики и условие для всех вакансий или, с dedup=True,
+    для одной вакансии из каждого кластера почти одинаковых вакансий (src.create_db.dedup).
+    """
+    return template.format(prefix='unique_' if dedup else '', condition=f" AND {UNIQUE_VACANCY}" if dedup else '')
+
+
+def search_params(query: str, limit: int, cursor: Optional[Tuple[float, int]] = None) -> dict:
+    """
+    Возвращает параметры запроса SEARCH_VACANCIES: поисковую строку, шаблон подстроки и курсор страницы.
+    """
+    last_rank, last_id = cursor if cursor is not None else (None, None)
+    return {'query': query, 'pattern': f'%{like_escape(query)}%', 'last_rank': last_rank, 'last_id': last_id,
+            'limit': limit}
+
+
+def like_escape(text: str) -> str:
+    """
+    Экранирует символы шаблона LIKE ('%', '_' и '\\'), чтобы текст искался как подстрока буквально.
+    """
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def cached(method):
+    """
+    Кэширует результат метода DBManager в ResultCache по ключу «имя метода + аргументы».
+    Перед обращением к кэшу проверяется номер загрузки данных (DBManager._check_generation); если кэш выключен
+    или номер загрузки неизвестен, метод выполняется как обычно.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)  # Аргументы-списки не могут быть ключом кэша
+        if not self._check_generation():
+            return method(self, *args, **kwargs)
+        found, result = self.cache.get(key)
+        if found:
+            return result
+        result = method(self, *args, **kwargs)
+        # Завершённая транзакция чтения позволяет соединению получать уведомления о новых загрузках
+        self.conn.commit()
+        self.cache.put(key, result)
+        return result
 
-pas_sql: str = os.environ.get('SQLPASS')
-user_sql: str = os.environ.get('SQLUSER')
+    return wrapper
 
 
 class DBManager:
@@ -16,10 +118,15 @@ class DBManager:
         password (str): Пароль для соединения с базой данных.
         host (str): Адрес хоста базы данных. По умолчанию "localhost".
         port (str): Номер порта базы данных. По умолчанию "5432".
+        cache_entries (int): Предельное количество результатов запросов в кэше; 0 отключает кэш.
+        cache_bytes (int): Предельный суммарный размер результатов в кэше в байтах.
+    Результаты запросов кэшируются в памяти (см. _check_generation) до следующей загрузки данных. Методы
+    возвращают из кэша один и тот же объект, поэтому изменять полученные списки нельзя.
     """
 
-    def __init__(self, dbname: str, user: str = user_sql, password: str = pas_sql, host: str = "localhost",
-                 port: str = "5432") -> None:
+    def __init__(self, dbname: str, user: str = user_sql, password: str = pas_sql, host: str = HOST,
+                 port: str = PORT, cache_entries: int = DEFAULT_MAX_ENTRIES,
+                 cache_bytes: int = DEFAULT_MAX_BYTES) -> None:
         self.dbname = dbname
         self.user = user
         self.password = password
@@ -27,51 +134,119 @@ class DBManager:
         self.port = port
         self.conn = None
         self.cur = None
+        self._analytics = None
+        self.cache = ResultCache(cache_entries, cache_bytes)
+        self._generation_checked: Optional[float] = None
 
     def connect(self, dbname) -> None:
         """
         Подключается к базе данных PostgreSQL с использованием указанных параметров.
-        Эта функция устанавливает соединение с базой данных PostgreSQL, используя указанное имя базы данных,
-        имя пользователя, пароль, хост и порт. Если соединение успешно, то устанавливает атрибут `conn`
-        в объект соединения и атрибут `cur` в объект курсора. Также выводит сообщение об успешном подключении.
+        Эта функция берёт из общего пула (src.connection.connection) проверенное соединение с базой данных
+        PostgreSQL с указанным именем базы данных, именем пользователя, паролем, хостом и портом. Если соединение
+        успешно, то устанавливает атрибут `conn` в объект соединения и атрибут `cur` в объект курсора. Соединение,
+        полученное предыдущим вызовом, возвращается в пул. Также выводит сообщение об успешном подключении.
         Если при попытке подключения возникает ошибка, выводит сообщение об ошибке с конкретным исключением.
         Параметры:
             self (DBManager): Экземпляр класса DBManager.
         Возвращает:
             None
         """
+        self._release()
         try:
-            self.conn = psycopg2.connect(
-                dbname=self.dbname,
-                user=self.user,
-                password=self.password,
-                host=self.host,
-                port=self.port
-            )
+            self.conn = acquire(**self._params())
             self.cur = self.conn.cursor()
+            self._listen()
             print(f"Успешное подключение к базе данных {Color.GREEN}{dbname}{Color.END}!\n")
         except (Exception, psycopg2.DatabaseError) as error:
             print("Ошибка при подключении к базе данных:", error)
 
+    def _params(self) -> dict:
+        return {'dbname': self.dbname, 'user': self.user, 'password': self.password, 'host': self.host,
+                'port': self.port}
+
+    def _listen(self) -> None:
+        """
+        Подписывает соединение на уведомления о новых загрузках (LISTEN) и читает текущий номер загрузки.
+        Если в базе нет таблицы 'load_generation' (база не обновлена миграциями), кэш не используется.
+        """
+        try:
+            self.cur.execute(f"LISTEN {GENERATION_CHANNEL}")
+            self._read_generation()
+        except psycopg2.Error as error:
+            self.conn.rollback()
+            self._generation_checked = None
+            print(f"{Color.RED}Кэш запросов отключён:{Color.END}", error)
+
+    def _read_generation(self) -> None:
+        self.cur.execute("SELECT generation FROM load_generation")
+        row = self.cur.fetchone()
+        self.conn.commit()
+        self.cache.set_generation(row[0] if row is not None else 0)
+        self._generation_checked = time.monotonic()
+
+    def _check_generation(self) -> bool:
+        """
+        Сбрасывает кэш запросов, если после предыдущей проверки данные были загружены заново.
+        Описание:
+            refresh_stats при фиксации загрузки отправляет в канал GENERATION_CHANNEL новый номер загрузки.
+            Уведомления читаются из уже полученных соединением данных (conn.poll) без запроса к базе, поэтому
+            попадание в кэш не обращается к Postgres. Уведомления доставляются только соединению вне транзакции;
+            если транзакция открыта (после некэшируемого запроса) или уведомлений не было дольше
+            GENERATION_CHECK_INTERVAL, номер загрузки перечитывается из таблицы 'load_generation'.
+        Возвращает:
+            bool: True, если кэш можно использовать.
+        """
+        if self.conn is None or self._generation_checked is None or self.cache.max_entries <= 0:
+            return False
+        self.conn.poll()
+        notifies = [notify for notify in self.conn.notifies if notify.channel == GENERATION_CHANNEL]
+        self.conn.notifies.clear()
+        if notifies:
+            self.cache.set_generation(int(notifies[-1].payload))
+            self._generation_checked = time.monotonic()
+        elif (self.conn.info.transaction_status != TRANSACTION_STATUS_IDLE
+              or time.monotonic() - self._generation_checked >= GENERATION_CHECK_INTERVAL):
+            self._read_generation()
+        return True
+
+    def _release(self) -> bool:
+        """
+        Возвращает соединение в пул, если оно было получено. Возвращает True, если соединение было.
+        """
+        if self.conn is None:
+            return False
+        if not self.conn.closed and self._generation_checked is not None:
+            try:
+                self.conn.rollback()
+                self.cur.execute("UNLISTEN *")
+                self.conn.commit()
+            except psycopg2.Error:
+                pass
+        self._generation_checked = None
+        release(self.conn, **self._params())
+        self.conn = None
+        self.cur = None
+        self._analytics = None
+        return True
+
     def disconnect(self) -> None:
         """
-        Отключается от базы данных, если соединение уже установлено.
+        Отключается от базы данных, если соединение уже установлено, и возвращает соединение в пул.
         Параметры:
             self (объект): Экземпляр класса.
         Возвращает:
             None
         """
-        if self.conn is not None:
-            self.conn.close()
-            self.conn = None
+        if self._release():
             print("\nОтключение от базы данных.")
 
     def close(self) -> None:
         """
         Закрывает соединение с базой данных, если оно открыто.
         Эта функция проверяет, не является ли атрибут `conn` текущего объекта не равным None. Если это так,
-        то закрывает соединение с базой данных, вызывая метод `close()` для объекта `conn`. После закрытия
-        соединения выводит сообщение "Соединение с базой данных закрыто.".
+        то закрывает соединение с базой данных, вызывая метод `close()` для объекта `conn`, и возвращает его
+        в пул, который при необходимости откроет новое. После закрытия соединения выводит сообщение
+        "Соединение с базой данных закрыто.".
         Параметры:
             self (object): Текущий объект.
         Возвращает:
@@ -79,69 +254,143 @@ class DBManager:
         """
         if self.conn is not None:
             self.conn.close()
-            self.conn = None
+            self._release()
             print("Соединение с базой данных закрыто.")
 
-    def get_companies_and_vacancies_count(self) -> List[Tuple[str, int]]:
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_companies_and_vacancies_count(self, dedup: bool = False) -> List[Tuple[str, int]]:
         """
         Получает имена компаний вместе с количеством вакансий, которые у них есть.
+        Количество читается из материализованного представления 'company_stats', пересчитанного при загрузке.
+        Параметры:
+            dedup (bool): Считать каждый кластер почти одинаковых вакансий (src.create_db.dedup) одной вакансией.
         """
-        self.cur.execute(
-            "SELECT c.name, COUNT(v.vacancy_id) AS vacancies_count FROM companies c "
-            "JOIN vacancies v ON c.company_id = v.company_id GROUP BY c.name")
+        self.cur.execute(dedup_sql(COMPANIES_COUNT, dedup))
         companies_and_vacancies = self.cur.fetchall()
         return companies_and_vacancies
 
-    def get_all_vacancies(self) -> List[Tuple[str, str, str, str]]:
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_company_salary_stats(
+            self, dedup: bool = False) -> List[Tuple[str, int, Optional[float], Optional[float], Optional[float],
+                                                     Optional[float], Optional[float], Optional[float]]]:
+        """
+        Получает статистику зарплат по компаниям из материализованного представления 'company_stats'.
+        Параметры:
+            dedup (bool): Считать каждый кластер почти одинаковых вакансий (src.create_db.dedup) одной вакансией.
+        Возвращает:
+            list: Список кортежей (название компании, количество вакансий, средняя зарплата, p10, p25, медиана,
+            p75, p90); зарплаты — нижняя граница в рублях, None, если у компании нет вакансий с зарплатой.
+        """
+        self.cur.execute(dedup_sql(COMPANY_SALARY_STATS, dedup))
+        return [(name, count, *(float(value) if value is not None else None for value in salaries))
+                for name, count, *salaries in self.cur.fetchall()]
+
+    def iter_all_vacancies(self, itersize: int = ITERSIZE,
+                           dedup: bool = False) -> Iterator[Tuple[str, str, Optional[int], Optional[int], str]]:
+        """
+        Отдаёт все вакансии по одной через серверный (именованный) курсор.
+        Строки передаются с сервера порциями по itersize, поэтому первая вакансия доступна сразу,
+        а в памяти клиента одновременно находится не больше одной порции.
+        Параметры:
+            itersize (int): Количество строк, получаемых с сервера за один запрос.
+            dedup (bool): Отдавать из каждого кластера почти одинаковых вакансий одну вакансию.
+        Возвращает:
+            Iterator: Кортежи (название компании, название вакансии, зарплата от, зарплата до, ссылка)
+            в порядке идентификаторов вакансий.
+        """
+        with self.conn.cursor(name='all_vacancies') as cur:
+            cur.itersize = itersize
+            condition = f" AND {UNIQUE_VACANCY}" if dedup else ''
+            cur.execute(
+                "SELECT c.name, v.title, v.salary_from_rub, v.salary_to_rub, v.link FROM companies c "
+                f"JOIN vacancies v ON c.company_id = v.company_id WHERE NOT v.archived{condition} "
+                "ORDER BY v.vacancy_id")
+            yield from cur
+
+    @metrics.timed('dbmanager_query')
+    def get_all_vacancies(self) -> List[Tuple[str, str, Optional[int], Optional[int], str]]:
         """
         Получает все вакансии из базы данных, включая название компании, название вакансии, зарплату и ссылку.
+        Зарплата возвращается в рублёвом эквиваленте ('salary_from_rub', 'salary_to_rub'), NULL — не указана.
+        Для большого числа вакансий лучше использовать iter_all_vacancies или get_vacancies_page.
         Возвращает:
             list: Список кортежей, где каждый кортеж содержит название компании, название вакансии, зарплату и ссылку.
         """
+        return list(self.iter_all_vacancies())
+
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_vacancies_page(self, after_id: Optional[int] = None,
+                           limit: int = PAGE_SIZE) -> Tuple[List[Tuple[str, str, Optional[int], Optional[int], str]],
+                                                            Optional[int]]:
+        """
+        Получает страницу вакансий постраничной выборкой по ключу (WHERE vacancy_id > последний ORDER BY vacancy_id).
+        Каждая страница читается по первичному ключу, поэтому её стоимость не зависит от номера страницы.
+        Параметры:
+            after_id (int): Идентификатор последней вакансии предыдущей страницы или None для первой страницы.
+            limit (int): Количество вакансий на странице.
+        Возвращает:
+            tuple: Список кортежей (название компании, название вакансии, зарплата от, зарплата до, ссылка)
+            и идентификатор последней вакансии страницы для следующего вызова или None, если страница последняя.
+        """
         self.cur.execute(
-            "SELECT c.name, v.title, v.salary_from, v.salary_to, v.link FROM companies c "
-            "JOIN vacancies v ON c.company_id = v.company_id")
-        all_vacancies = self.cur.fetchall()
-        return all_vacancies
+            "SELECT c.name, v.title, v.salary_from_rub, v.salary_to_rub, v.link, v.vacancy_id FROM vacancies v "
+            "JOIN companies c ON c.company_id = v.company_id "
+            "WHERE NOT v.archived AND v.vacancy_id > %s ORDER BY v.vacancy_id LIMIT %s",
+            (after_id if after_id is not None else 0, limit + 1))
+        rows = self.cur.fetchall()
+
+        next_after_id = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after_id = rows[-1][5]
+        return [row[:5] for row in rows], next_after_id
 
-    def get_avg_salary(self) -> float:
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_avg_salary(self, dedup: bool = False) -> Optional[float]:
         """
-        Вычисляет среднюю зарплату из столбца 'salary_from' таблицы 'vacancies'.
+        Возвращает среднюю зарплату по столбцу 'salary_from_rub' (нижняя граница зарплаты в рублях)
+        таблицы 'vacancies'. Значение читается из материализованного представления 'salary_stats'.
+        Параметры:
+            dedup (bool): Учитывать из каждого кластера почти одинаковых вакансий только одну вакансию.
         Возвращает:
             float: Средняя зарплата, округленная до 2 знаков после запятой.
         """
-        query = """
-                SELECT AVG(CASE WHEN salary_from = 'Зарплата не указана' 
-                THEN NULL ELSE CAST(salary_from AS INTEGER) END) 
-                FROM vacancies
-                WHERE salary_from != 'Зарплата не указана'
-                """
-        self.cur.execute(query)
-        avg_salary = self.cur.fetchone()[0]
+        self.cur.execute(dedup_sql(AVG_SALARY, dedup))
+        row = self.cur.fetchone()
+        avg_salary = row[0] if row is not None else None
         if avg_salary is not None:
-            return round(avg_salary, 2)
+            return round(float(avg_salary), 2)
         else:
             return None
 
-    def get_vacancies_with_higher_salary(self) -> List[Tuple[str, str, str, str]]:
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_vacancies_with_higher_salary(
+            self, dedup: bool = False) -> List[Tuple[str, str, Optional[int], Optional[int], str]]:
         """
         Извлекает вакансии с более высокой зарплатой.
+        Вакансии выбираются диапазоном по индексу 'salary_from_rub' — выше средней нижней границы зарплаты
+        из представления 'salary_stats'.
+        Параметры:
+            dedup (bool): Возвращать из каждого кластера почти одинаковых вакансий одну вакансию
+                и сравнивать со средней зарплатой без повторов.
         Возвращает:
             list: Список кортежей, где каждый кортеж содержит название компании, название вакансии, зарплату и ссылку.
         """
-        self.cur.execute(
-            "SELECT c.name, v.title, v.salary_from, v.salary_to, v.link "
-            "FROM companies c JOIN vacancies v ON c.company_id = v.company_id "
-            "WHERE CASE WHEN v.salary_from != 'Зарплата не указана' THEN CAST(v.salary_from AS INTEGER) ELSE 0 END > "
-            "(SELECT AVG(CASE WHEN salary_from != 'Зарплата не указана' "
-            "THEN CAST(salary_from AS INTEGER) ELSE NULL END) FROM vacancies)"
-        )
+        self.cur.execute(dedup_sql(HIGHER_SALARY_VACANCIES, dedup))
         higher_salary_vacancies = self.cur.fetchall()
         return higher_salary_vacancies
 
-    def get_vacancies_with_keyword(self, keyword: str) -> List[Tuple[str, str, str, str]]:
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_vacancies_with_keyword(self, keyword: str) -> List[Tuple[str, str, Optional[int], Optional[int], str]]:
         """
         Получает вакансии с указанным ключевым словом из базы данных.
+        Поиск подстроки (ILIKE) выполняется по триграммному индексу названия вакансии.
         Параметры:
             keyword (str): Ключевое слово для поиска в названиях вакансий.
         Возвращает:
@@ -149,8 +398,142 @@ class DBManager:
             ссылку на каждую вакансию, которая совпадает с ключевым словом.
         """
         self.cur.execute(
-            f"SELECT c.name, v.title, v.salary_from, v.salary_to, v.link FROM companies c "
-            f"JOIN vacancies v ON c.company_id = v.company_id WHERE v.title ILIKE %s",
+            "SELECT c.name, v.title, v.salary_from_rub, v.salary_to_rub, v.link FROM companies c "
+            "JOIN vacancies v ON c.company_id = v.company_id WHERE NOT v.archived AND v.title ILIKE %s",
             (f'%{keyword}%',))
         vacancies_with_keyword = self.cur.fetchall()
         return vacancies_with_keyword
+
+    @metrics.timed('dbmanager_query')
+    @cached
+    def search_vacancies(self, query: str, limit: int = 20,
+                         cursor: Optional[Tuple[float, int]] = None) -> Tuple[List[Tuple], Optional[Tuple[float, int]]]:
+        """
+        Ищет вакансии по названию с ранжированием результатов.
+        Описание:
+            Запрос разбирается как поисковая строка (websearch_to_tsquery): несколько слов ищутся вместе,
+            поддерживаются кавычки и минус-слова. Совпадения ищутся по столбцу 'search_vector' с русской
+            и английской морфологией, по сходству запроса со словами названия (word_similarity, оператор <%),
+            что находит опечатки в слове длинного названия, и по подстроке (ILIKE), поэтому находится всё,
+            что находит get_vacancies_with_keyword. Все условия обслуживаются GIN-индексами. Результаты
+            упорядочены по убыванию релевантности (ts_rank + word_similarity).
+            Для следующей страницы нужно передать курсор, возвращённый предыдущим вызовом.
+        Параметры:
+            query (str): Поисковая строка.
+            limit (int): Количество вакансий на странице.
+            cursor (tuple): Курсор (релевантность, идентификатор вакансии) последней вакансии предыдущей страницы.
+        Возвращает:
+            tuple: Список кортежей (название компании, название вакансии, зарплата от, зарплата до, ссылка)
+            и курсор следующей страницы или None, если страница последняя.
+        """
+        self.cur.execute(SEARCH_VACANCIES, search_params(query, limit + 1, cursor))
+        rows = self.cur.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1][5], rows[-1][6])
+        return [row[:5] for row in rows], next_cursor
+
+    @staticmethod
+    def _trend_params(since: Optional[date], until: Optional[date], period: str) -> dict:
+        if period not in TREND_PERIODS:
+            raise ValueError(f"Неизвестный период: {period}")
+        until = until or date.today() + timedelta(days=1)
+        return {'period': period, 'since': since or until - timedelta(days=TREND_DAYS + 1), 'until': until}
+
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_company_salary_trend(self, since: Optional[date] = None, until: Optional[date] = None,
+                                 period: str = 'month', company_ids: Optional[Sequence[int]] = None
+                                 ) -> List[Tuple[date, str, int, Optional[float], Optional[float]]]:
+        """
+        Возвращает динамику зарплат по компаниям из истории вакансий ('vacancy_observations').
+        Описание:
+            Для каждого периода (день, неделя или месяц) и компании считаются вакансии, наблюдавшиеся
+            в загрузках этого периода, средняя и медианная нижняя граница зарплаты в рублях; каждая вакансия
+            учитывается в периоде один раз, по последнему наблюдению. История разбита на разделы по месяцам,
+            и читаются только разделы за [since, until).
+        Параметры:
+            since (date): Начало периода; по умолчанию TREND_DAYS дней назад.
+            until (date): Конец периода (не включается); по умолчанию завтрашний день.
+            period (str): 'day', 'week' или 'month'.
+            company_ids (list): Только эти компании; по умолчанию все.
+        Возвращает:
+            list: Кортежи (начало периода, название компании, количество вакансий, средняя зарплата, медиана)
+            по возрастанию периода.
+        Вызывает:
+            ValueError: Если период неизвестен.
+        """
+        params = self._trend_params(since, until, period)
+        params['company_ids'] = list(company_ids) if company_ids else None
+        latest = LATEST_OBSERVATIONS.format(
+            condition="(%(company_ids)s::INTEGER[] IS NULL OR o.company_id = ANY(%(company_ids)s))")
+        self.cur.execute(
+            "SELECT latest.period, c.name, COUNT(*), AVG(latest.salary_from_rub), "
+            "       percentile_cont(0.5) WITHIN GROUP (ORDER BY latest.salary_from_rub) "
+            f"FROM ({latest}) latest "
+            "JOIN companies c ON c.company_id = latest.company_id "
+            "GROUP BY latest.period, c.name ORDER BY latest.period, c.name",
+            params)
+        return [(period_start, name, count, *(round(float(value), 2) if value is not None else None
+                                              for value in salaries))
+                for period_start, name, count, *salaries in self.cur.fetchall()]
+
+    @metrics.timed('dbmanager_query')
+    @cached
+    def get_keyword_salary_trend(self, keyword: str, since: Optional[date] = None, until: Optional[date] = None,
+                                 period: str = 'week') -> List[Tuple[date, int, Optional[float], Optional[float]]]:
+        """
+        Возвращает динамику зарплат вакансий с ключевым словом в названии (ILIKE по триграммному индексу
+        разделов истории), см. get_company_salary_trend.
+        Параметры:
+            keyword (str): Ключевое слово для поиска в названиях вакансий.
+            since (date): Начало периода; по умолчанию TREND_DAYS дней назад.
+            until (date): Конец периода (не включается); по умолчанию завтрашний день.
+            period (str): 'day', 'week' или 'month'.
+        Возвращает:
+            list: Кортежи (начало периода, количество вакансий, средняя зарплата, медиана) по возрастанию периода.
+        Вызывает:
+            ValueError: Если период неизвестен.
+        """
+        params = self._trend_params(since, until, period)
+        params['pattern'] = f'%{keyword}%'
+        latest = LATEST_OBSERVATIONS.format(condition="o.title ILIKE %(pattern)s")
+        self.cur.execute(
+            "SELECT latest.period, COUNT(*), AVG(latest.salary_from_rub), "
+            "       percentile_cont(0.5) WITHIN GROUP (ORDER BY latest.salary_from_rub) "
+            f"FROM ({latest}) latest "
+            "GROUP BY latest.period ORDER BY latest.period",
+            params)
+        return [(period_start, count, *(round(float(value), 2) if value is not None else None
+                                        for value in salaries))
+                for period_start, count, *salaries in self.cur.fetchall()]
+
+    @property
+    def analytics(self):
+        """
+        Аналитика зарплат (src.analytics.salary.SalaryAnalytics) на соединении DBManager.
+        Создаётся при первом обращении, поэтому NumPy загружается только когда аналитика нужна.
+        Результаты кэшируются до следующей загрузки данных.
+        """
+        if self._analytics is None:
+            from src.analytics.salary import SalaryAnalytics
+            self._analytics = SalaryAnalytics(self.conn)
+        return self._analytics
+
+    @metrics.timed('dbmanager_query')
+    def get_salary_stats(self, by: str = 'company', basis: str = 'midpoint',
+                         min_count: int = 1) -> List[Tuple[str, int, float, float, float, float, float, float]]:
+        """
+        Возвращает статистику зарплат по компаниям или названиям вакансий: количество, среднее, p10, p25,
+        медиану, p75 и p90. В отличие от get_avg_salary, по умолчанию учитываются обе границы вилки
+        (середина вилки или указанная граница), а медиана и перцентили не искажаются единичными выбросами.
+        Параметры:
+            by (str): 'company' или 'title'.
+            basis (str): 'midpoint' — середина вилки, 'from' — нижняя граница.
+            min_count (int): Группы с меньшим количеством зарплат пропускаются.
+        Возвращает:
+            list: Кортежи (название, количество, среднее, p10, p25, медиана, p75, p90) по убыванию количества.
+        """
+        return self.analytics.stats(by, basis, min_count)
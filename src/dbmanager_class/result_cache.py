@@ -0,0 +1,116 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Tuple
+
+from src.metrics import metrics
+
+DEFAULT_MAX_ENTRIES: int = 256  # Предельное количество сохранённых результатов запросов
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024  # Предельный суммарный размер результатов, сверх него вытесняются старые
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Оценивает размер результата запроса в памяти: размер объекта вместе с вложенными списками, кортежами,
+    словарями и их элементами (sys.getsizeof не учитывает вложенные объекты).
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    return size
+
+
+class ResultCache:
+    """
+    Кэш результатов запросов в памяти процесса с вытеснением давно не читанных записей (LRU).
+    Описание:
+        Записи хранятся по ключу «метод + аргументы» вместе с оценкой их размера (estimate_size). Когда количество
+        записей превышает max_entries или их суммарный размер — max_bytes, вытесняются записи, которые дольше
+        всего не читались. Результат больше max_bytes не сохраняется.
+        Записи относятся к одному номеру загрузки данных (generation): при его смене кэш очищается целиком.
+        Счётчики hits, misses и evictions показывают эффективность кэша и дублируются в метриках
+        <name>_cache_total и <name>_cache_evictions_total.
+    Параметры:
+        max_entries (int): Предельное количество записей; 0 отключает кэш.
+        max_bytes (int): Предельный суммарный размер записей в байтах.
+        name (str): Префикс метрик кэша.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 name: str = 'dbmanager') -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.name = name
+        self.generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Возвращает пару (найдено, результат). Обращение делает запись самой свежей.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                metrics.inc(f'{self.name}_cache_total', result='miss')
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        metrics.inc(f'{self.name}_cache_total', result='hit')
+        return True, entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Сохраняет результат и вытесняет давно не читанные записи, если кэш превысил ограничения.
+        """
+        size = estimate_size(value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+                metrics.inc(f'{self.name}_cache_evictions_total')
+            metrics.set_gauge(f'{self.name}_cache_bytes', self._size)
+
+    def set_generation(self, generation: Optional[int]) -> None:
+        """
+        Запоминает номер загрузки данных; если он изменился, очищает кэш.
+        """
+        with self._lock:
+            if generation != self.generation:
+                self.generation = generation
+                self._clear()
+
+    def clear(self) -> None:
+        """
+        Удаляет все записи.
+        """
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+        metrics.set_gauge(f'{self.name}_cache_bytes', 0)
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """
+        Возвращает счётчики кэша: попадания, промахи, вытеснения, количество записей, их размер и номер загрузки.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'size_bytes': self._size, 'generation': self.generation}
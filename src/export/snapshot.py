@@ -0,0 +1,237 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from typing import List, Dict, Any, Iterator, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow.fs import LocalFileSystem
+
+from src.analytics.salary import SalaryAnalytics, SalaryFrame
+from src.color.color import Color
+from src.connection.connection import connection
+from src.metrics import metrics
+
+ROW_GROUP_SIZE: int = 100_000  # Количество строк, читаемых из базы и записываемых в одну группу строк файла
+FORMATS = ('parquet', 'ipc')  # Parquet — компактнее, Arrow IPC — читается отображением в память без разбора
+META_FILE: str = '_snapshot.json'  # Описание снимка в каталоге load_date=...; файлы с '_' не входят в набор данных
+
+SCHEMA = pa.schema([
+    ('vacancy_id', pa.int32()),
+    ('company_id', pa.int32()),
+    ('company_name', pa.string()),
+    ('title', pa.string()),
+    ('salary_from', pa.int32()),
+    ('salary_to', pa.int32()),
+    ('currency', pa.string()),
+    ('gross', pa.bool_()),
+    ('salary_from_rub', pa.int32()),
+    ('salary_to_rub', pa.int32()),
+    ('link', pa.string()),
+    ('published_at', pa.timestamp('us', tz='UTC')),
+    ('load_date', pa.date32()),
+])
+PARTITIONING = ds.partitioning(pa.schema([('load_date', pa.date32()), ('company_id', pa.int32())]), flavor='hive')
+
+SNAPSHOT_QUERY: str = """
+    SELECT v.vacancy_id, v.company_id, c.name, v.title, v.salary_from, v.salary_to, v.currency, v.gross,
+           v.salary_from_rub, v.salary_to_rub, v.link, v.published_at, %s::DATE
+    FROM vacancies v JOIN companies c ON c.company_id = v.company_id
+    WHERE NOT v.archived
+    """
+
+
+def iter_batches(cur, load_date: date, row_group_size: int = ROW_GROUP_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Читает активные вакансии серверным курсором порциями по row_group_size строк и отдаёт их пакетами Arrow,
+    поэтому в памяти одновременно находится не больше одной порции.
+    """
+    cur.itersize = row_group_size
+    cur.execute(SNAPSHOT_QUERY, (load_date,))
+    while True:
+        rows = cur.fetchmany(row_group_size)
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, SCHEMA)],
+                                         schema=SCHEMA)
+
+
+def write_snapshot(dbname: str, directory: str, fmt: str = 'parquet',
+                   row_group_size: int = ROW_GROUP_SIZE) -> Optional[Dict[str, Any]]:
+    """
+    Записывает снимок активных вакансий с названиями компаний в столбцовые файлы.
+    Описание:
+        Строки читаются серверным курсором и записываются пакетами (pyarrow.dataset.write_dataset) в каталоги
+        directory/load_date=<дата загрузки>/company_id=<компания>/, по группам строк до row_group_size.
+        Дата загрузки берётся из таблицы 'load_generation'; повторный снимок в ту же дату заменяет каталог
+        этой даты целиком, снимки других дат остаются. Рядом с данными записывается описание снимка (META_FILE).
+        Снимок собирается во временном каталоге рядом с датами (имя с точкой, набор данных его не читает) и
+        переносится на место каталога даты только после успешной записи, поэтому ошибка чтения из базы или
+        записи файлов оставляет прежний снимок этой даты нетронутым.
+        Снимок читается read_snapshot и анализируется SnapshotAnalytics без обращения к базе.
+    Параметры:
+        dbname (str): Имя базы данных.
+        directory (str): Корневой каталог снимков.
+        fmt (str): 'parquet' или 'ipc' (Arrow IPC / Feather v2).
+        row_group_size (int): Количество строк в порции чтения и в группе строк файла.
+    Возвращает:
+        dict: Описание снимка (дата и номер загрузки, количество строк и файлов, формат) или None при ошибке.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат снимка: {fmt}")
+    start = time.perf_counter()
+    staging: Optional[str] = None
+    try:
+        with metrics.span('snapshot_write', format=fmt), connection(dbname) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT generation, loaded_at FROM load_generation")
+                generation, loaded_at = cur.fetchone()
+            load_date = loaded_at.astimezone(timezone.utc).date()
+            partition_name = f'load_date={load_date.isoformat()}'
+            os.makedirs(directory, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='.snapshot-', dir=directory)
+
+            files: List[str] = []
+            rows = 0
+
+            def batches() -> Iterator[pa.RecordBatch]:
+                nonlocal rows
+                with conn.cursor(name='vacancies_snapshot') as cur:
+                    for batch in iter_batches(cur, load_date, row_group_size):
+                        rows += batch.num_rows
+                        yield batch
+
+            ds.write_dataset(batches(), staging, schema=SCHEMA, format=fmt, partitioning=PARTITIONING,
+                             basename_template=f'part-{{i}}.{fmt}', existing_data_behavior='overwrite_or_ignore',
+                             max_rows_per_group=row_group_size, min_rows_per_group=min(row_group_size, 10_000),
+                             file_visitor=lambda written: files.append(written.path))
+            conn.commit()
+
+        meta = {'load_date': load_date.isoformat(), 'generation': generation, 'rows': rows, 'files': len(files),
+                'format': fmt, 'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        staged = os.path.join(staging, partition_name)
+        os.makedirs(staged, exist_ok=True)
+        with open(os.path.join(staged, META_FILE), 'w', encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False, indent=2)
+        # Прежний снимок даты уходит во временный каталог и удаляется вместе с ним
+        partition = os.path.join(directory, partition_name)
+        if os.path.exists(partition):
+            os.replace(partition, os.path.join(staging, 'previous'))
+        os.replace(staged, partition)
+        metrics.inc('snapshot_rows_total', rows)
+        print(f"Снимок {Color.GREEN}{rows}{Color.END} вакансий ({len(files)} файлов) записан в {directory} "
+              f"за {time.perf_counter() - start:.2f} с")
+        return meta
+    except Exception as error:
+        print(f"{Color.RED}Ошибка при записи снимка:{Color.END}", error)
+        return None
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def snapshot_dates(directory: str) -> List[date]:
+    """
+    Возвращает даты загрузок, снимки которых есть в каталоге, по возрастанию.
+    """
+    if not os.path.isdir(directory):
+        return []
+    return sorted(date.fromisoformat(name.split('=', 1)[1]) for name in os.listdir(directory)
+                  if name.startswith('load_date=') and os.path.isdir(os.path.join(directory, name)))
+
+
+def snapshot_meta(directory: str, load_date: date) -> Dict[str, Any]:
+    """
+    Возвращает описание снимка за дату загрузки, записанное write_snapshot.
+    """
+    with open(os.path.join(directory, f'load_date={load_date.isoformat()}', META_FILE), encoding='utf-8') as file:
+        return json.load(file)
+
+
+def open_snapshot(directory: str, fmt: str = 'parquet') -> ds.Dataset:
+    """
+    Открывает каталог снимков как набор данных Arrow. Файлы читаются через отображение в память,
+    поэтому данные снимка Arrow IPC не копируются в память процесса при чтении.
+    """
+    return ds.dataset(directory, schema=SCHEMA, format=fmt, partitioning=PARTITIONING,
+                      filesystem=LocalFileSystem(use_mmap=True))
+
+
+def read_snapshot(directory: str, load_date: Optional[date] = None, company_ids: Optional[List[int]] = None,
+                  columns: Optional[List[str]] = None, fmt: Optional[str] = None) -> pa.Table:
+    """
+    Читает снимок в таблицу Arrow.
+    Параметры:
+        directory (str): Корневой каталог снимков.
+        load_date (date): Дата загрузки; по умолчанию последний снимок.
+        company_ids (list): Только вакансии этих компаний; лишние каталоги компаний не читаются.
+        columns (list): Только эти столбцы.
+        fmt (str): Формат снимка; по умолчанию берётся из его описания (META_FILE).
+    Вызывает:
+        FileNotFoundError: Если в каталоге нет снимков.
+    """
+    dates = snapshot_dates(directory)
+    if not dates:
+        raise FileNotFoundError(f"В каталоге {directory} нет снимков")
+    load_date = load_date or dates[-1]
+    fmt = fmt or snapshot_meta(directory, load_date)['format']
+    # Условие на столбцы разбиения отбрасывает каталоги других дат и компаний без чтения их файлов
+    condition = ds.field('load_date') == pa.scalar(load_date, pa.date32())
+    if company_ids:
+        condition &= ds.field('company_id').isin(company_ids)
+    return open_snapshot(directory, fmt).to_table(columns=columns, filter=condition)
+
+
+def frame_from_table(table: pa.Table) -> SalaryFrame:
+    """
+    Переводит таблицу снимка в SalaryFrame: вакансии с зарплатой, коды названий и названия компаний.
+    """
+    table = table.filter(pc.or_(pc.is_valid(table['salary_from_rub']), pc.is_valid(table['salary_to_rub'])))
+    titles = table['title'].combine_chunks().dictionary_encode()
+    companies = table.group_by(['company_id', 'company_name']).aggregate([])
+
+    def salaries(name: str) -> np.ndarray:
+        return table[name].to_numpy(zero_copy_only=False).astype(np.float64)
+
+    return SalaryFrame(table['company_id'].to_numpy().astype(np.int64),
+                       titles.indices.to_numpy(zero_copy_only=False).astype(np.int64),
+                       salaries('salary_from_rub'), salaries('salary_to_rub'),
+                       titles.dictionary.to_pylist(),
+                       dict(zip(companies['company_id'].to_pylist(), companies['company_name'].to_pylist())))
+
+
+class SnapshotAnalytics(SalaryAnalytics):
+    """
+    Аналитика зарплат (см. SalaryAnalytics) по снимку на диске: те же перцентили и гистограммы,
+    но без обращения к базе. Снимок читается один раз при первом расчёте.
+    Параметры:
+        directory (str): Корневой каталог снимков.
+        load_date (date): Дата загрузки; по умолчанию последний снимок.
+        fmt (str): Формат снимка; по умолчанию берётся из его описания.
+    """
+
+    def __init__(self, directory: str, load_date: Optional[date] = None, fmt: Optional[str] = None) -> None:
+        super().__init__(conn=None)
+        self.directory = directory
+        self.load_date = load_date
+        self.fmt = fmt
+
+    def generation(self) -> int:
+        """
+        Снимок не меняется, поэтому прочитанные данные не перечитываются.
+        """
+        return 0
+
+    def load(self) -> SalaryFrame:
+        """
+        Читает из снимка только столбцы, нужные для статистики зарплат.
+        """
+        columns = ['company_id', 'company_name', 'title', 'salary_from_rub', 'salary_to_rub']
+        with metrics.span('snapshot_read'):
+            return frame_from_table(read_snapshot(self.directory, self.load_date, columns=columns, fmt=self.fmt))
@@ -0,0 +1,274 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Tuple, List, Any, Optional, Iterator, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Каталог для профилей cProfile; без него профиль не снимается
+PROFILE_DIR: Optional[str] = os.environ.get('HH_PROFILE')
+_profile_lock = threading.Lock()
+_profiling: bool = False  # Профиль уже снимается: вложенный profiled не включает второй профилировщик
+BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in items) + '}'
+
+
+class Histogram:
+    """
+    Распределение значений по интервалам BUCKETS, сумма и количество наблюдений.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Возвращает верхнюю границу интервала, в который попадает квантиль q (оценка как в Prometheus).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Registry:
+    """
+    Хранилище метрик: счётчики, текущие значения (gauge) и гистограммы с метками.
+    Описание:
+        Все операции потокобезопасны, поэтому метрики можно обновлять из потоков загрузки страниц.
+        Метрики выгружаются в текстовом формате Prometheus (to_prometheus) или в JSON (to_json).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Увеличивает счётчик name на value.
+        """
+        key = _labels(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Устанавливает текущее значение name.
+        """
+        with self._lock:
+            self.gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        Добавляет наблюдение value в гистограмму name.
+        """
+        key = _labels(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[None]:
+        """
+        Измеряет время выполнения блока и добавляет его в гистограмму '<name>_seconds'.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f'{name}_seconds', time.perf_counter() - start, **labels)
+
+    def reset(self) -> None:
+        """
+        Удаляет все метрики.
+        """
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        Возвращает метрики в текстовом формате Prometheus.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, series in sorted(metrics.items()):
+                    lines.append(f'# TYPE {name} {kind}')
+                    lines.extend(f'{name}{_format_labels(labels)} {value:g}' for labels, value in series.items())
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                        lines.append(f'{name}_bucket{_format_labels(labels, ("le", le))} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum:g}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики словарём: значения счётчиков и gauge, для гистограмм — количество, сумма,
+        среднее и оценки p50, p90 и p99.
+        """
+        with self._lock:
+            return {
+                'counters': {name: [{'labels': dict(labels), 'value': value} for labels, value in values.items()]
+                             for name, values in self.counters.items()},
+                'gauges': {name: [{'labels': dict(labels), 'value': value} for labels, value in values.items()]
+                           for name, values in self.gauges.items()},
+                'histograms': {
+                    name: [{'labels': dict(labels), 'count': histogram.count, 'sum': histogram.sum,
+                            'mean': histogram.sum / histogram.count if histogram.count else None,
+                            'p50': histogram.quantile(0.5), 'p90': histogram.quantile(0.9),
+                            'p99': histogram.quantile(0.99)}
+                           for labels, histogram in values.items()]
+                    for name, values in self.histograms.items()},
+            }
+
+
+REGISTRY = Registry()
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    REGISTRY.inc(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    REGISTRY.set(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    REGISTRY.observe(name, value, **labels)
+
+
+def span(name: str, **labels: Any):
+    """
+    Контекстный менеджер, измеряющий время блока, см. Registry.span.
+    """
+    return REGISTRY.span(name, **labels)
+
+
+def timed(name: str) -> Callable:
+    """
+    Декоратор: измеряет время каждого вызова функции в гистограмме '<name>_seconds' с меткой query=<имя функции>.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with REGISTRY.span(name, query=fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def dump_json(path: str, registry: Registry = REGISTRY) -> None:
+    """
+    Записывает метрики в файл JSON.
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(registry.to_json(), file, ensure_ascii=False, indent=2)
+
+
+def serve(port: int, host: str = '127.0.0.1') -> 'ThreadingHTTPServer':
+    """
+    Запускает в фоновом потоке HTTP-сервер с метриками: /metrics (Prometheus) и /metrics.json.
+    http.server импортируется только здесь, чтобы модуль метрик не замедлял запуск программы.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path == '/metrics':
+                body, content_type = REGISTRY.to_prometheus().encode(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(REGISTRY.to_json(), ensure_ascii=False).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@contextmanager
+def profiled(name: str, directory: Optional[str] = None) -> Iterator[None]:
+    """
+    Снимает профиль cProfile с блока, если задан каталог (directory или переменная окружения HH_PROFILE).
+    Профиль записывается в файл '<name>-<время>.prof', который можно открыть через pstats или snakeviz.
+    Профилируется поток, выполняющий блок; время потоков загрузки страниц видно в нём как ожидание.
+    Без каталога блок выполняется без профилирования.
+    Одновременно активен только один профилировщик (в Python 3.12 второй cProfile.Profile().enable() вызывает
+    ValueError), поэтому блок внутри уже профилируемого блока или потока выполняется без своего профиля
+    и попадает в профиль внешнего блока.
+    """
+    global _profiling
+    directory = directory or PROFILE_DIR
+    with _profile_lock:
+        nested = _profiling
+        _profiling = _profiling or bool(directory)
+    if not directory or nested:
+        yield
+        return
+
+    import cProfile
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            os.makedirs(directory, exist_ok=True)
+            profile.dump_stats(os.path.join(directory, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}.prof'))
+    finally:
+        with _profile_lock:
+            _profiling = False
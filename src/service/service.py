@@ -0,0 +1,382 @@
+"""
+HTTP-сервис запросов к базе вакансий для одновременных клиентов (панели, внутренние пользователи).
+
+Сервис выполняет те же запросы, что и DBManager, на пуле асинхронных соединений asyncpg и отдаёт результаты
+в JSON:
+    GET /companies                         — компании и количество вакансий
+    GET /salary-stats                      — статистика зарплат по компаниям (среднее и перцентили)
+    GET /avg-salary                        — средняя зарплата
+    GET /vacancies/above-average           — вакансии с зарплатой выше средней
+    GET /vacancies/search?keyword=...      — поиск вакансий по названию по релевантности (&limit=, до MAX_SEARCH_LIMIT)
+    GET /health, GET /metrics              — проверка работы и метрики (формат Prometheus)
+Запросы статистики и вакансий выше средней принимают параметр dedup=1: каждый кластер почти одинаковых вакансий
+(src.create_db.dedup) считается одной вакансией.
+
+Одинаковые запросы, пришедшие одновременно, выполняются в базе один раз (Coalescer), а готовые ответы хранятся
+в ResultCache до следующей загрузки данных: о ней сервис узнаёт по уведомлению в канал 'load_generation',
+которое отправляет refresh_stats. Запуск: python main.py serve <база> [--port 8081].
+"""
+import asyncio
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Any, Awaitable, Callable, Hashable, NamedTuple, Sequence, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+import asyncpg
+
+from src.color.color import Color
+from src.connection.connection import user_sql, pas_sql, HOST, PORT
+from src.dbmanager_class.dbmanager import (COMPANIES_COUNT, COMPANY_SALARY_STATS, AVG_SALARY, HIGHER_SALARY_VACANCIES,
+                                           SEARCH_VACANCIES, SEARCH_PARAMS, dedup_sql, search_params)
+from src.dbmanager_class.result_cache import ResultCache, DEFAULT_MAX_ENTRIES
+from src.metrics import metrics
+
+DEFAULT_PORT: int = 8081
+POOL_MIN_SIZE: int = 2  # Соединений, открываемых при запуске сервиса
+POOL_MAX_SIZE: int = 20  # Максимум соединений с базой, включая соединение для уведомлений о загрузках
+SEARCH_LIMIT: int = 100  # Количество вакансий в ответе поиска по умолчанию
+MAX_SEARCH_LIMIT: int = 1000
+MAX_HEADER_BYTES: int = 16 * 1024  # Запрос с более длинными заголовками отклоняется закрытием соединения
+MAX_BODY_BYTES: int = 64 * 1024  # Тело запроса длиннее не читается: запрос отклоняется с кодом 400
+GENERATION_CHANNEL: str = 'load_generation'
+
+VACANCY_COLUMNS = ('company', 'title', 'salary_from', 'salary_to', 'link')
+SALARY_STATS_COLUMNS = ('company', 'vacancies', 'avg_salary', 'p10_salary', 'p25_salary', 'median_salary',
+                        'p75_salary', 'p90_salary')
+
+
+class Query(NamedTuple):
+    sql: str
+    columns: Tuple[str, ...]
+    single: bool = False  # Ответ — один объект вместо списка
+
+
+def asyncpg_sql(sql: str, names: Sequence[str] = ()) -> str:
+    """
+    Переводит запрос с параметрами psycopg2 (%(имя)s, %%) в запрос asyncpg ($1, $2, %).
+    Параметры:
+        sql (str): Текст запроса.
+        names (list): Имена параметров в порядке номеров asyncpg.
+    """
+    for number, name in enumerate(names, 1):
+        sql = sql.replace(f'%({name})s', f'${number}')
+    return sql.replace('%%', '%')
+
+
+def stats_queries(dedup: bool) -> Dict[str, Query]:
+    """
+    Возвращает запросы статистики и вакансий выше средней, которые выполняют методы DBManager; с dedup=True —
+    их варианты '<имя>_dedup' с одной вакансией на кластер почти одинаковых вакансий (параметр dedup=1).
+    """
+    suffix = '_dedup' if dedup else ''
+    return {
+        f'companies{suffix}': Query(dedup_sql(COMPANIES_COUNT, dedup), ('company', 'vacancies')),
+        f'salary_stats{suffix}': Query(dedup_sql(COMPANY_SALARY_STATS, dedup), SALARY_STATS_COLUMNS),
+        f'avg_salary{suffix}': Query(f"SELECT round(avg_salary::NUMERIC, 2) FROM ({dedup_sql(AVG_SALARY, dedup)}) "
+                                     "AS s(avg_salary)", ('avg_salary',), single=True),
+        f'above_average{suffix}': Query(dedup_sql(HIGHER_SALARY_VACANCIES, dedup), VACANCY_COLUMNS),
+    }
+
+
+QUERIES: Dict[str, Query] = {
+    **stats_queries(False),
+    **stats_queries(True),
+    # Ранжированный поиск DBManager.search_vacancies; в ответ попадают столбцы вакансии без ранга
+    'search': Query(asyncpg_sql(SEARCH_VACANCIES, SEARCH_PARAMS), VACANCY_COLUMNS),
+}
+ROUTES: Dict[str, str] = {
+    '/companies': 'companies',
+    '/salary-stats': 'salary_stats',
+    '/avg-salary': 'avg_salary',
+    '/vacancies/above-average': 'above_average',
+    '/vacancies/search': 'search',
+}
+REASONS: Dict[int, str] = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                           500: 'Internal Server Error', 503: 'Service Unavailable'}
+JSON_TYPE: str = 'application/json; charset=utf-8'
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def to_json(value: Any) -> Any:
+    """
+    Переводит значения из базы в типы JSON: NUMERIC — в число, даты — в строку ISO 8601.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=to_json).encode()
+
+
+class Coalescer:
+    """
+    Объединяет одинаковые запросы, выполняющиеся одновременно: пока запрос с тем же ключом не завершён,
+    новые вызовы ждут его результат (или исключение), а не выполняют запрос повторно.
+    Ожидание защищено от отмены (asyncio.shield): если клиент, начавший запрос, отключился,
+    запрос всё равно завершается для остальных.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+            metrics.inc('service_coalesced_total')
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # Исключение уже получили ожидающие; без этого asyncio сообщит о нём в журнал
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class QueryService:
+    """
+    Выполняет запросы QUERIES на пуле asyncpg и отвечает на HTTP-запросы (handle).
+    Описание:
+        Ответ на запрос кодируется в JSON один раз и хранится в кэше по ключу «запрос + параметры».
+        Кэш используется только после start: соединение из пула подписывается на уведомления о загрузках
+        (LISTEN load_generation), и каждое уведомление сбрасывает кэш. Если это соединение разорвалось,
+        кэш отключается, и все запросы идут в базу (с объединением одинаковых запросов).
+    Параметры:
+        pool: Пул соединений asyncpg.
+        cache_entries (int): Предельное количество ответов в кэше; 0 отключает кэш.
+    """
+
+    def __init__(self, pool, cache_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.pool = pool
+        self.cache = ResultCache(cache_entries, name='service')
+        self.coalescer = Coalescer()
+        self.caching = False
+        self._listener = None
+
+    async def start(self) -> None:
+        """
+        Подписывается на уведомления о загрузках и читает текущий номер загрузки.
+        """
+        self._listener = await self.pool.acquire()
+        await self._listener.add_listener(GENERATION_CHANNEL, self._on_generation)
+        self._listener.add_termination_listener(self._on_listener_lost)
+        self.cache.set_generation(await self._listener.fetchval("SELECT generation FROM load_generation"))
+        self.caching = self.cache.max_entries > 0
+
+    async def close(self) -> None:
+        """
+        Возвращает соединение для уведомлений в пул и закрывает пул.
+        """
+        if self._listener is not None and not self._listener.is_closed():
+            await self._listener.remove_listener(GENERATION_CHANNEL, self._on_generation)
+            await self.pool.release(self._listener)
+        self._listener = None
+        await self.pool.close()
+
+    def _on_generation(self, connection, pid: int, channel: str, payload: str) -> None:
+        self.cache.set_generation(int(payload))
+
+    def _on_listener_lost(self, connection) -> None:
+        self.caching = False
+        self.cache.clear()
+        print(f"{Color.RED}Соединение для уведомлений о загрузках разорвано, кэш ответов отключён{Color.END}",
+              file=sys.stderr)
+
+    async def query(self, name: str, *params: Any) -> bytes:
+        """
+        Возвращает ответ на запрос QUERIES[name] в JSON: из кэша или из базы, объединяя одинаковые запросы.
+        """
+        key = (name, params)
+        if self.caching:
+            found, body = self.cache.get(key)
+            if found:
+                return body
+        return await self.coalescer.run(key, lambda: self._fetch(key))
+
+    async def _fetch(self, key: Tuple[str, Tuple[Any, ...]]) -> bytes:
+        name, params = key
+        query = QUERIES[name]
+        generation = self.cache.generation
+        with metrics.span('service_query', query=name):
+            async with self.pool.acquire() as conn:
+                if query.single:
+                    body = encode(dict(zip(query.columns, [await conn.fetchval(query.sql, *params)])))
+                else:
+                    body = encode([dict(zip(query.columns, row)) for row in await conn.fetch(query.sql, *params)])
+        # Ответ, прочитанный во время загрузки, не сохраняется: он мог получить данные до её фиксации
+        if self.caching and self.cache.generation == generation:
+            self.cache.put(key, body)
+        return body
+
+    @staticmethod
+    def _dedup(name: str, query: Dict[str, list]) -> str:
+        """
+        Возвращает имя запроса с учётом параметра dedup: '1' или 'true' выбирает вариант запроса '<имя>_dedup'.
+        """
+        value = query.get('dedup', ['0'])[0].lower()
+        if value not in ('0', '1', 'false', 'true'):
+            raise BadRequest("Параметр dedup должен быть 0 или 1")
+        if value in ('0', 'false'):
+            return name
+        if f'{name}_dedup' not in QUERIES:
+            raise BadRequest(f"Параметр dedup не поддерживается запросом {name}")
+        return f'{name}_dedup'
+
+    @staticmethod
+    def _params(name: str, query: Dict[str, list]) -> Tuple[Any, ...]:
+        if name != 'search':
+            return ()
+        keyword = query.get('keyword', [''])[0].strip()
+        if not keyword:
+            raise BadRequest("Не указан параметр keyword")
+        try:
+            limit = int(query.get('limit', [SEARCH_LIMIT])[0])
+        except ValueError:
+            raise BadRequest("Параметр limit должен быть числом")
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            raise BadRequest(f"Параметр limit должен быть от 1 до {MAX_SEARCH_LIMIT}")
+        params = search_params(keyword, limit)
+        return tuple(params[name] for name in SEARCH_PARAMS)
+
+    async def respond(self, method: str, target: str) -> Tuple[int, str, bytes]:
+        """
+        Возвращает код, тип и тело ответа на HTTP-запрос.
+        """
+        url = urlsplit(target)
+        if method != 'GET':
+            return 405, JSON_TYPE, encode({'error': "Поддерживается только GET"})
+        if url.path == '/health':
+            return 200, JSON_TYPE, encode({'status': 'ok', 'cache': self.cache.stats() if self.caching else None})
+        if url.path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', metrics.REGISTRY.to_prometheus().encode()
+        name = ROUTES.get(url.path)
+        if name is None:
+            return 404, JSON_TYPE, encode({'error': f"Неизвестный адрес {url.path}"})
+        try:
+            params = parse_qs(url.query)
+            return 200, JSON_TYPE, await self.query(self._dedup(name, params), *self._params(name, params))
+        except BadRequest as error:
+            return 400, JSON_TYPE, encode({'error': str(error)})
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError) as error:
+            return 503, JSON_TYPE, encode({'error': f"Ошибка базы данных: {error}"})
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Обслуживает соединение клиента по HTTP/1.1: запросы читаются и обрабатываются по очереди,
+        соединение остаётся открытым (keep-alive), пока клиент не закроет его или не попросит Connection: close.
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                headers = {name.strip().lower(): value.strip()
+                           for name, value in (line.split(':', 1) for line in header_lines if ':' in line)}
+                request_error = None
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    request_error = "Некорректный заголовок Content-Length"
+                elif length:
+                    try:
+                        await reader.readexactly(length)
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        return
+                try:
+                    method, target, version = request_line.split(' ')
+                except ValueError:
+                    method, target, version = '', '/', 'HTTP/1.0'
+                    request_error = "Некорректная строка запроса"
+                if request_error is not None:
+                    status, content_type, body = 400, JSON_TYPE, encode({'error': request_error})
+                else:
+                    with metrics.span('service_request'):
+                        try:
+                            status, content_type, body = await self.respond(method, target)
+                        except Exception as error:
+                            status, content_type, body = 500, JSON_TYPE, encode({'error': str(error)})
+                metrics.inc('service_requests_total', path=ROUTES.get(urlsplit(target).path, 'other'), status=status)
+
+                # После тела неизвестной длины нельзя найти начало следующего запроса: соединение закрывается
+                keep_alive = (request_error is None and version == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                             f"Content-Length: {len(body)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def create_service(dbname: str, user: str = user_sql, password: str = pas_sql, host: str = HOST,
+                         port: str = PORT, pool_size: int = POOL_MAX_SIZE,
+                         cache_entries: int = DEFAULT_MAX_ENTRIES) -> QueryService:
+    """
+    Открывает пул соединений asyncpg к базе и запускает QueryService.
+    """
+    pool = await asyncpg.create_pool(database=dbname, user=user, password=password, host=host, port=int(port),
+                                     min_size=min(POOL_MIN_SIZE, pool_size), max_size=pool_size)
+    service = QueryService(pool, cache_entries)
+    try:
+        await service.start()
+    except Exception:
+        await pool.close()
+        raise
+    return service
+
+
+async def serve(dbname: str, host: str = '127.0.0.1', port: int = DEFAULT_PORT, pool_size: int = POOL_MAX_SIZE,
+                cache_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+    """
+    Запускает сервис и обслуживает клиентов до отмены.
+    """
+    service = await create_service(dbname, pool_size=pool_size, cache_entries=cache_entries)
+    try:
+        server = await asyncio.start_server(service.handle, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+        async with server:
+            print(f"Сервис запросов к базе {Color.GREEN}{dbname}{Color.END} слушает http://{host}:{port}",
+                  file=sys.stderr)
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def run(dbname: str, host: str = '127.0.0.1', port: int = DEFAULT_PORT, pool_size: int = POOL_MAX_SIZE,
+        cache_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+    """
+    Запускает сервис в цикле событий asyncio до нажатия Ctrl+C.
+    Вызывает:
+        ConnectionError: Если не удалось подключиться к базе или занять порт (причина выводится в stderr).
+    """
+    try:
+        asyncio.run(serve(dbname, host, port, pool_size, cache_entries))
+    except KeyboardInterrupt:
+        pass
+    except (asyncpg.PostgresError, OSError) as error:
+        print(f"{Color.RED}Ошибка при запуске сервиса:{Color.END}", error, file=sys.stderr)
+        raise ConnectionError(dbname) from error
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+
+def make_vacancy(vacancy_id, employer_id, salary_from=100000, salary_to=None,
+                 published_at='2024-04-01T10:00:00+0300'):
+    """Создаёт вакансию в формате выдачи API HH."""
+    return {
+        'id': str(vacancy_id),
+        'name': f'Python разработчик {vacancy_id}',
+        'employer': {'id': str(employer_id), 'name': f'Компания {employer_id}'},
+        'salary': {'from': salary_from, 'to': salary_to, 'currency': 'RUR', 'gross': False},
+        'alternate_url': f'https://hh.ru/vacancy/{vacancy_id}',
+        'published_at': published_at,
+    }
+
+
+class RecordingCursor:
+    """
+    Курсор psycopg2 для тестов без базы: запоминает запросы с параметрами (пробелы в тексте запроса сжаты)
+    и данные COPY, а fetchone и fetchall отдают заданные результаты по очереди (без результатов — None и []).
+    """
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.queries = []
+        self.copied = None
+
+    def execute(self, query, params=None):
+        self.queries.append((" ".join(query.split()), params))
+
+    def copy_expert(self, query, buffer):
+        self.queries.append((query, None))
+        self.copied = buffer.read()
+
+    def fetchone(self):
+        return self.results.pop(0) if self.results else None
+
+    def fetchall(self):
+        return self.results.pop(0) if self.results else []
+
+    @property
+    def statements(self):
+        """Тексты выполненных запросов без параметров."""
+        return [query for query, _ in self.queries]
+
+
+class StubHH:
+    """
+    Локальная замена API HH: отдаёт вакансии постранично с заданной задержкой,
+    фильтрует по работодателю и датам публикации и, как настоящий API, отвечает 400 дальше MAX_DEPTH вакансий.
+    Ответы помечаются ETag; на условный запрос с совпадающим If-None-Match отвечает 304.
+    По адресу /vacancies/{id} отдаёт подробные данные вакансии с ключевыми навыками, по адресу /dictionaries —
+    справочник с курсами валют.
+    Коды из списка failures отдаются вместо ответа очередным запросам (429 — с заголовком Retry-After).
+    """
+    MAX_DEPTH = 2000
+
+    def __init__(self, vacancies, latency=0.0):
+        self.vacancies = vacancies
+        self.latency = latency
+        self.requests = []
+        self.failures = []
+        self.lock = threading.Lock()
+
+    def select(self, query):
+        employer_ids = set(query.get('employer_id', []))
+        date_from = datetime.fromisoformat(query['date_from'][0]) if 'date_from' in query else None
+        date_to = datetime.fromisoformat(query['date_to'][0]) if 'date_to' in query else None
+        selected = []
+        for vac in self.vacancies:
+            published_at = datetime.fromisoformat(vac['published_at'])
+            if employer_ids and vac['employer']['id'] not in employer_ids:
+                continue
+            if date_from is not None and published_at < date_from:
+                continue
+            if date_to is not None and published_at > date_to:
+                continue
+            selected.append(vac)
+        return selected
+
+    def send_json(self, handler, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and handler.headers.get('If-None-Match') == etag:
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        if status == 200:
+            handler.send_header('ETag', etag)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def detail(self, vacancy_id):
+        for vac in self.vacancies:
+            if vac['id'] == vacancy_id:
+                return {**vac, 'description': f'<p>Описание вакансии {vacancy_id}</p>',
+                        'key_skills': [{'name': 'Python'}, {'name': 'SQL'}, {'name': 'Python'}],
+                        'experience': {'id': 'between1And3', 'name': 'От 1 года до 3 лет'},
+                        'schedule': {'id': 'remote', 'name': 'Удаленная работа'},
+                        'employment': {'id': 'full', 'name': 'Полная занятость'},
+                        'area': {'id': '1', 'name': 'Москва'}}
+        return None
+
+    def respond(self, handler):
+        url = urlparse(handler.path)
+        query = parse_qs(url.query)
+        with self.lock:
+            self.requests.append(query)
+            failure = self.failures.pop(0) if self.failures else None
+        time.sleep(self.latency)
+        if failure is not None:
+            self.send_json(handler, failure, {'errors': [{'type': 'too_many_requests'}]},
+                           {'Retry-After': '0'} if failure == 429 else None)
+            return
+
+        if url.path.rstrip('/').endswith('/dictionaries'):
+            self.send_json(handler, 200, {'currency': [{'code': 'RUR', 'rate': 1.0}, {'code': 'USD', 'rate': 0.011}]})
+            return
+
+        vacancy_id = url.path.rstrip('/').rsplit('/', 1)[-1]
+        if vacancy_id.isdigit():
+            detail = self.detail(vacancy_id)
+            if detail is None:
+                self.send_json(handler, 404, {'errors': [{'type': 'not_found'}]})
+            else:
+                self.send_json(handler, 200, detail)
+            return
+
+        per_page = int(query.get('per_page', ['20'])[0])
+        page = int(query.get('page', ['0'])[0])
+        if (page + 1) * per_page > self.MAX_DEPTH:
+            self.send_json(handler, 400, {'errors': [{'type': 'bad_argument', 'value': 'page'}]})
+            return
+
+        found = self.select(query)
+        self.send_json(handler, 200, {
+            'items': found[page * per_page:(page + 1) * per_page] if per_page else [],
+            'found': len(found),
+            'pages': (len(found) + per_page - 1) // per_page if per_page else 0,
+            'page': page,
+            'per_page': per_page,
+        })
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.stub.respond(self)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hh_stub():
+    """Запускает локальный HTTP-сервер, имитирующий API HH, и возвращает (stub, url)."""
+    stub = StubHH([make_vacancy(i, 1 + i % 3) for i in range(1, 1001)])
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.stub = stub
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield stub, f'http://127.0.0.1:{server.server_port}/vacancies'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def recording_cursor():
+    """Возвращает фабрику RecordingCursor: recording_cursor(results) — курсор с заданными результатами."""
+    return RecordingCursor
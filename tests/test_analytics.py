@@ -0,0 +1,113 @@
+import struct
+
+import numpy as np
+import pytest
+
+from src.analytics import salary
+from src.analytics.salary import (SalaryAnalytics, SalaryFrame, parse_copy_binary, midpoints, group_stats,
+                                  group_histograms, histogram_edges, QUANTILES)
+
+
+def copy_binary(rows):
+    """Собирает вывод двоичного COPY для строк из четырёх INTEGER."""
+    data = salary.COPY_SIGNATURE + struct.pack('>ii', 0, 0)
+    for row in rows:
+        data += struct.pack('>h', len(row)) + b''.join(struct.pack('>ii', 4, value) for value in row)
+    return data + struct.pack('>h', -1)
+
+
+def test_parse_copy_binary_reads_rows_and_nulls():
+    rows = parse_copy_binary(copy_binary([(1, 0, 100000, -1), (2, 3, -1, 250000)]))
+    assert rows['company_id'].tolist() == [1, 2]
+    assert rows['title_code'].tolist() == [0, 3]
+    np.testing.assert_array_equal(salary.to_salary(rows['salary_from']), [100000, np.nan])
+    assert len(parse_copy_binary(copy_binary([]))) == 0
+
+    with pytest.raises(ValueError):
+        parse_copy_binary(b'not a copy')
+
+
+def test_midpoints_use_available_bounds():
+    salary_from = np.array([100.0, np.nan, 100.0, np.nan])
+    salary_to = np.array([200.0, 300.0, np.nan, np.nan])
+    np.testing.assert_array_equal(midpoints(salary_from, salary_to), [150, 300, 100, np.nan])
+
+
+def test_group_stats_match_numpy_percentiles():
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 50, 10_000)
+    values = rng.lognormal(11, 0.5, 10_000)
+    values[rng.random(10_000) < 0.1] = np.nan
+
+    result = group_stats(keys, values)
+
+    for position, key in enumerate(result.keys):
+        group = values[(keys == key) & ~np.isnan(values)]
+        assert result.counts[position] == len(group)
+        assert result.means[position] == pytest.approx(group.mean())
+        np.testing.assert_allclose(result.quantiles[position], np.percentile(group, [q * 100 for q in QUANTILES]))
+
+
+def test_group_stats_of_empty_input():
+    result = group_stats(np.array([], dtype=np.int64), np.array([]))
+    assert len(result.keys) == 0
+    assert result.quantiles.shape == (0, len(QUANTILES))
+
+
+def test_group_histograms_match_numpy_histogram():
+    rng = np.random.default_rng(1)
+    keys = rng.integers(0, 5, 2_000)
+    values = rng.normal(100_000, 20_000, 2_000)
+    edges = histogram_edges(values, 10)
+
+    unique, counts = group_histograms(keys, values, edges)
+
+    assert counts.sum() == len(values)
+    for key, row in zip(unique, counts):
+        clipped = np.clip(values[keys == key], edges[0], edges[-1])
+        np.testing.assert_array_equal(row, np.histogram(clipped, edges)[0])
+
+
+class FakeAnalytics(SalaryAnalytics):
+    def __init__(self, frame):
+        super().__init__(conn=None)
+        self.current_generation = 1
+        self.loads = 0
+        self.loaded_frame = frame
+
+    def generation(self):
+        return self.current_generation
+
+
+def test_results_are_cached_until_next_load(monkeypatch):
+    frame = SalaryFrame(np.array([1, 1, 2]), np.array([0, 1, 0]), np.array([100.0, 200.0, np.nan]),
+                        np.array([np.nan, 400.0, 500.0]), ['Java разработчик', 'Python разработчик'],
+                        {1: 'Компания 1', 2: 'Компания 2'})
+    analytics = FakeAnalytics(frame)
+
+    def load_salaries(cur):
+        analytics.loads += 1
+        return analytics.loaded_frame
+
+    class Connection:
+        def cursor(self):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+    analytics.conn = Connection()
+    monkeypatch.setattr(salary, 'load_salaries', load_salaries)
+
+    stats = analytics.stats('company')
+    assert stats[0] == ('Компания 1', 2, 200.0, 120.0, 150.0, 200.0, 250.0, 280.0)
+    assert analytics.stats('title')[0][0] == 'Java разработчик'
+    assert analytics.summary()['count'] == 3
+    assert analytics.loads == 1
+
+    analytics.current_generation = 2
+    analytics.stats('company')
+    assert analytics.loads == 2
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.mock_server import MockHH
+from benchmarks.run import run, compare
+from benchmarks.startup import parse_importtime, measure_path, PATHS
+from benchmarks.synthetic import generate_vacancies
+
+
+def test_generate_vacancies_is_reproducible():
+    now = datetime(2024, 4, 1, tzinfo=timezone.utc)
+    assert generate_vacancies(50, seed=1, now=now) == generate_vacancies(50, seed=1, now=now)
+    assert generate_vacancies(50, seed=1, now=now) != generate_vacancies(50, seed=2, now=now)
+
+
+def test_mock_filters_by_employer_and_dates():
+    now = datetime(2024, 4, 1, tzinfo=timezone.utc)
+    vacancies = generate_vacancies(500, seed=3, now=now)
+    mock = MockHH(vacancies)
+    date_from = (now - timedelta(days=10)).isoformat()
+
+    selected = mock.select({'employer_id': ['1'], 'date_from': [date_from]})
+
+    expected = {vac['id'] for vac in vacancies if vac['employer']['id'] == '1'
+                and datetime.fromisoformat(vac['published_at']) >= now - timedelta(days=10)}
+    assert {vac['id'] for vac in selected} == expected
+    assert [vac['published_at'] for vac in selected] == sorted((vac['published_at'] for vac in selected),
+                                                              reverse=True)
+
+
+def test_run_reports_fetch_scenario_as_json_ready_dict():
+    report = run([300], latency=0, repeat=1)
+
+    [fetch] = [item for item in report['results'] if item['scenario'] == 'fetch']
+    assert fetch['scenario'] == 'fetch'
+    assert fetch['rows'] == 300
+    assert fetch['median_s'] > 0
+    assert compare(report, report)[0].endswith('(x1.00)')
+
+
+def test_parse_importtime_sums_top_level_modules():
+    output = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       100 |        100 | site\n"
+              "import time:       200 |        200 |   json.decoder\n"
+              "import time:       300 |        500 | json\n"
+              "import time:      1000 |       1500 | main\n")
+    import_ms, modules = parse_importtime(output, skip=frozenset({'site'}))
+    assert import_ms == 2.0
+    assert modules == ['site', 'json.decoder', 'json', 'main']
+
+
+def test_main_import_does_not_load_network_or_database_modules():
+    code, forbidden = PATHS['main']
+    _, modules = measure_path(code, repeat=1)
+    assert 'main' in modules
+    assert not set(forbidden) & set(modules)
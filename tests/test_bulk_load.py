@@ -0,0 +1,31 @@
+from src.create_db.bulk_load import rows_to_copy_buffer, bulk_upsert_vacancies, copy_rows
+
+
+def test_rows_to_copy_buffer_escapes_values():
+    buffer = rows_to_copy_buffer([(1, None, "a\tb", "c\\d\ne")])
+    assert buffer.read() == "1\t\\N\ta\\tb\tc\\\\d\\ne\n"
+
+
+def test_copy_rows_uses_copy_from_stdin(recording_cursor):
+    cur = recording_cursor()
+    copy_rows(cur, "staging_vacancies", ("vacancy_id", "title"), [(1, "Python")])
+    assert cur.statements == ["COPY staging_vacancies (vacancy_id, title) FROM STDIN"]
+    assert cur.copied == "1\tPython\n"
+
+
+def test_bulk_upsert_vacancies_merges_from_staging(recording_cursor, capsys):
+    cur = recording_cursor()
+    row = (1, 2, "Компания", "Python", 100000, None, "RUR", False, 100000, None, "https://hh.ru/vacancy/1", None)
+    rows_per_second = bulk_upsert_vacancies(cur, [row])
+
+    assert rows_per_second > 0
+    assert cur.statements[2].startswith("COPY staging_vacancies")
+    assert cur.statements[3].startswith("INSERT INTO companies")
+    assert cur.statements[4].startswith("INSERT INTO vacancies")
+    assert "строк/с" in capsys.readouterr().out
+
+
+def test_bulk_upsert_vacancies_skips_empty_load(recording_cursor):
+    cur = recording_cursor()
+    assert bulk_upsert_vacancies(cur, []) is None
+    assert cur.queries == []
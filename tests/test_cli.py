@@ -0,0 +1,85 @@
+import io
+import json
+import subprocess
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+from src.cli import cli
+
+
+def test_read_employer_ids_skips_comments_and_duplicates(tmp_path):
+    path = tmp_path / 'employers.txt'
+    path.write_text("# Яндекс\n1740\n\n3529  # Сбер\n1740\n", encoding='utf-8')
+    assert cli.read_employer_ids(str(path)) == ['1740', '3529']
+
+
+def test_read_employer_ids_rejects_non_numeric(tmp_path):
+    path = tmp_path / 'employers.txt'
+    path.write_text("1740\nyandex\n", encoding='utf-8')
+    with pytest.raises(ValueError, match='employers.txt:2'):
+        cli.read_employer_ids(str(path))
+
+
+def test_write_rows_json_and_csv():
+    rows = [('Компания', 'Python разработчик', 100000, None, 'https://hh.ru/vacancy/1')]
+
+    stream = io.StringIO()
+    assert cli.write_rows(iter(rows), cli.VACANCY_COLUMNS, 'json', stream) == 1
+    assert json.loads(stream.getvalue()) == [{'company': 'Компания', 'title': 'Python разработчик',
+                                              'salary_from': 100000, 'salary_to': None,
+                                              'link': 'https://hh.ru/vacancy/1'}]
+
+    stream = io.StringIO()
+    cli.write_rows(rows, cli.VACANCY_COLUMNS, 'csv', stream)
+    assert stream.getvalue().splitlines() == ['company,title,salary_from,salary_to,link',
+                                              'Компания,Python разработчик,100000,,https://hh.ru/vacancy/1']
+
+    stream = io.StringIO()
+    assert cli.write_rows([], cli.VACANCY_COLUMNS, 'json', stream) == 0
+    assert json.loads(stream.getvalue()) == []
+
+
+class FakeDBManager:
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def search_vacancies(self, query, limit=20, cursor=None):
+        self.calls.append((query, limit, cursor))
+        start = cursor or 0
+        page = self.results[start:start + limit]
+        return page, start + limit if start + limit < len(self.results) else None
+
+
+def test_iter_search_follows_cursor_up_to_limit():
+    db_manager = FakeDBManager([(f'Компания {i}', 'Вакансия', None, None, f'link{i}') for i in range(250)])
+    assert len(list(cli.iter_search(db_manager, 'python', 150))) == 150
+    assert [limit for _, limit, _ in db_manager.calls] == [100, 50]
+    assert len(list(cli.iter_search(FakeDBManager([]), 'python', 20))) == 0
+
+
+def test_search_command_writes_results_to_stdout(monkeypatch, capsys):
+    db_manager = FakeDBManager([('Компания', 'Python разработчик', None, None, 'link')])
+
+    @contextmanager
+    def database(dbname):
+        assert dbname == 'hh_test'
+        yield db_manager
+
+    monkeypatch.setattr(cli, 'database', database)
+    assert cli.main(['search', 'hh_test', 'python', '--format', 'csv']) == 0
+    assert capsys.readouterr().out.splitlines()[1] == 'Компания,Python разработчик,,,link'
+
+
+def test_parser_rejects_invalid_dbname(capsys):
+    with pytest.raises(SystemExit):
+        cli.build_parser().parse_args(['stats', 'База'])
+
+
+def test_query_commands_do_not_import_loading_modules():
+    code = ("import sys; from src.cli import cli; cli.build_parser().parse_args(['stats', 'hh']); "
+            "import src.dbmanager_class.dbmanager; print('requests' in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
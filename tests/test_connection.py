@@ -0,0 +1,117 @@
+import psycopg2
+import pytest
+from src.connection import connection as connection_module
+from src.connection.connection import connection, acquire, release
+
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = 0
+        self.autocommit = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, query):
+                if not conn.alive:
+                    raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+        return Cursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakePool:
+    def __init__(self, minconn, maxconn, **params):
+        self.params = params
+        self.idle = []
+        self.discarded = []
+
+    def getconn(self):
+        return self.idle.pop() if self.idle else FakeConnection()
+
+    def putconn(self, conn, close=False):
+        (self.discarded if close else self.idle).append(conn)
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    monkeypatch.setattr(connection_module, "ThreadedConnectionPool", FakePool)
+    monkeypatch.setattr(connection_module, "_pools", {})
+    pool, _ = connection_module.get_pool("test_database")
+    return pool
+
+
+def test_connection_is_reused(fake_pool):
+    with connection("test_database") as first:
+        pass
+    with connection("test_database") as second:
+        pass
+    assert first is second
+    assert first.commits == 2
+
+
+def test_acquire_replaces_dead_connection(fake_pool):
+    dead = FakeConnection(alive=False)
+    fake_pool.idle.append(dead)
+    conn = acquire("test_database")
+    assert conn is not dead
+    assert fake_pool.discarded == [dead]
+    release(conn, "test_database")
+
+
+def test_acquire_skips_every_dead_idle_connection(fake_pool):
+    dead = [FakeConnection(alive=False) for _ in range(connection_module.MAX_CONNECTIONS)]
+    fake_pool.idle.extend(dead)
+    conn = acquire("test_database")
+    assert conn.alive
+    assert fake_pool.discarded == dead[::-1]
+    release(conn, "test_database")
+
+
+def test_acquire_gives_up_when_no_connection_is_alive(fake_pool, monkeypatch):
+    monkeypatch.setattr(fake_pool, "getconn", lambda: FakeConnection(alive=False))
+    with pytest.raises(psycopg2.OperationalError):
+        acquire("test_database")
+    assert len(fake_pool.discarded) == connection_module.MAX_CONNECTIONS + 1
+    # Место в пуле освобождено: все MAX_CONNECTIONS соединений можно взять без ожидания
+    _, semaphore = connection_module.get_pool("test_database")
+    assert all(semaphore.acquire(blocking=False) for _ in range(connection_module.MAX_CONNECTIONS))
+
+
+def test_connection_rolls_back_on_error(fake_pool):
+    with pytest.raises(ValueError):
+        with connection("test_database") as conn:
+            raise ValueError
+    assert conn.rollbacks >= 1
+    assert fake_pool.idle == [conn]
+
+
+def test_broken_connection_is_not_returned(fake_pool):
+    with pytest.raises(psycopg2.OperationalError):
+        with connection("test_database") as conn:
+            raise psycopg2.OperationalError
+    assert fake_pool.discarded == [conn]
+
+
+def test_autocommit_is_reset_on_release(fake_pool):
+    with connection("test_database", autocommit=True) as conn:
+        assert conn.autocommit
+    assert not conn.autocommit
@@ -0,0 +1,81 @@
+import pytest
+
+from src.api.hh_api import plan_shards, iter_shard_pages, shard_pages, MAX_PAGE
+from src.api.rate_limit import RateLimiter
+from src.create_db import crawl_jobs
+
+
+@pytest.fixture
+def recorded_values(monkeypatch):
+    rows = []
+    monkeypatch.setattr(crawl_jobs, "execute_values", lambda cur, query, values, **kwargs: rows.extend(values))
+    return rows
+
+
+def test_start_job_resumes_running_job(recorded_values, recording_cursor):
+    cur = recording_cursor([(7, 2, False)])
+    job_id, resumed = crawl_jobs.start_job(cur, 'full', ['2', '1'], plan=lambda: pytest.fail("план не нужен"))
+
+    assert (job_id, resumed) == (7, True)
+    assert cur.queries[0][1] == (crawl_jobs.MAX_JOB_ATTEMPTS, crawl_jobs.MAX_JOB_AGE, 'full', [1, 2])
+    assert cur.queries[1] == ("UPDATE crawl_jobs SET attempts = attempts + 1 WHERE job_id = %s", (7,))
+    assert recorded_values == []
+
+
+def test_start_job_replans_expired_job(recorded_values, recording_cursor, capsys):
+    cur = recording_cursor([(7, 5, True), (9,)])
+    job_id, resumed = crawl_jobs.start_job(cur, 'full', ['1'], plan=lambda: [('1', {'employer_id': '1'}, 2)])
+
+    assert (job_id, resumed) == (9, False)
+    assert cur.queries[1] == ("UPDATE crawl_jobs SET status = 'abandoned', finished_at = now() "
+                              "WHERE status = 'running' AND kind = %s", ('full',))
+    assert len(recorded_values) == 2
+    assert '№7' in capsys.readouterr().out
+
+
+def test_start_job_plans_pages_of_new_job(recorded_values, recording_cursor):
+    cur = recording_cursor([None, (8,)])
+    shard = {'employer_id': '1'}
+    job_id, resumed = crawl_jobs.start_job(cur, 'full', ['1'], plan=lambda: [('1', shard, 3)])
+
+    assert (job_id, resumed) == (8, False)
+    assert any(query.startswith("UPDATE crawl_jobs SET status = 'abandoned'") for query, _ in cur.queries)
+    assert [(job, employer, page) for job, employer, _, page in recorded_values] == [(8, 1, 0), (8, 1, 1), (8, 1, 2)]
+
+
+def test_failed_count_plans_every_page_of_employer(hh_stub, recorded_values, recording_cursor):
+    stub, url = hh_stub
+    stub.failures = [404]
+    limiter = RateLimiter(5, rate=1000, burst=1000, max_retries=0)
+    plan = [(employer_id, shard, shard_pages(found)) for employer_id, shard, found in plan_shards(["1"], url=url,
+                                                                                                 limiter=limiter)]
+    crawl_jobs.start_job(recording_cursor([None, (3,)]), 'full', ['1'], plan=lambda: plan)
+
+    # Страницы без вакансий загрузятся пустыми, а недоступные останутся в задании незагруженными
+    assert [page for _, _, _, page in recorded_values] == list(range(MAX_PAGE))
+
+
+def test_finish_job_keeps_job_with_pending_pages_running(recording_cursor):
+    cur = recording_cursor([(5, 2, 480)])
+    assert crawl_jobs.finish_job(cur, 3) == {'done': 5, 'pending': 2, 'rows': 480, 'finished': False}
+    assert len(cur.queries) == 1
+
+    cur = recording_cursor([(7, 0, 650)])
+    assert crawl_jobs.finish_job(cur, 3)['finished']
+    assert cur.queries[1] == ("UPDATE crawl_jobs SET status = 'done', finished_at = now(), rows_loaded = %s "
+                              "WHERE job_id = %s", (650, 3))
+
+
+def test_iter_shard_pages_reports_failed_pages(hh_stub):
+    stub, url = hh_stub
+    limiter = RateLimiter(5, rate=1000, burst=1000)
+    planned = plan_shards(["1", "2"], url=url, limiter=limiter)
+    tasks = [(f'{employer_id}:{page}', shard, page)
+             for employer_id, shard, found in planned for page in range(shard_pages(found))]
+    tasks.append(('broken', {'employer_id': '1'}, 25))
+
+    pages = dict(iter_shard_pages(tasks, url=url, limiter=RateLimiter(5, rate=1000, burst=1000, max_retries=0)))
+
+    assert pages.pop('broken') is None
+    assert len(pages) == 8
+    assert sum(len(items) for items in pages.values()) == 667
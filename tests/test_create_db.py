@@ -2,6 +2,9 @@ import psycopg2
 import pytest
 from src.create_db.create_db import create_database, create_tables, fill_tables
 from src.color.color import Color
+from src.create_db import create_db
+from src.metrics import metrics
+from tests.conftest import make_vacancy
 
 
 @pytest.fixture(scope="module")
@@ -40,3 +43,144 @@ def test_fill_tables(dbname, capsys):
     fill_tables(dbname, employer_ids)
     captured = capsys.readouterr()
     assert f"Данные успешно добавлены в таблицы базы данных \033[92m{dbname}\033[0m!" in captured.out
+
+
+def test_fill_tables_incremental(dbname, capsys):
+    employer_ids = ["12345", "67890"]  # Mock employer_ids for testing
+    fill_tables(dbname, employer_ids, incremental=True)
+    captured = capsys.readouterr()
+    assert f"Данные успешно добавлены в таблицы базы данных \033[92m{dbname}\033[0m!" in captured.out
+
+
+def test_load_vacancy_pages_commits_bounded_batches(monkeypatch):
+    batches = []
+    completed = []
+    monkeypatch.setattr(create_db, "BATCH_SIZE", 3)
+    monkeypatch.setattr(create_db, "bulk_upsert_vacancies", lambda cur, rows, report: batches.append(len(rows)))
+    monkeypatch.setattr(create_db, "complete_pages", lambda cur, pages: completed.append(pages))
+
+    class FakeConnection:
+        commits = 0
+
+        def commit(self):
+            self.commits += 1
+
+    conn = FakeConnection()
+    pages = [(page, [make_vacancy(page * 2 + i, 1 + i) for i in range(2)]) for page in range(4)]
+    pages.insert(2, (99, None))
+    loaded = create_db.load_vacancy_pages(conn, None, pages, {"RUR": 1.0})
+
+    assert loaded == 8
+    assert batches == [4, 4]
+    assert conn.commits == 2
+    # Страница, которую не удалось получить, не отмечается загруженной
+    assert completed == [[(0, [0, 1]), (1, [2, 3])], [(2, [4, 5]), (3, [6, 7])]]
+
+
+def test_vacancy_row_normalizes_salary():
+    vacancy = make_vacancy(1, 2, salary_from=1000, salary_to=2000)
+    vacancy['salary']['currency'] = 'USD'
+    row = create_db.vacancy_row(vacancy, {'RUR': 1.0, 'USD': 0.01})
+    assert row[4:10] == (1000, 2000, 'USD', False, 100000, 200000)
+
+    vacancy['salary'] = None
+    row = create_db.vacancy_row(vacancy, {'RUR': 1.0})
+    assert row[4:10] == (None, None, None, None, None, None)
+
+
+def test_migrate_schema_applies_missing_versions(recording_cursor, capsys):
+    cur = recording_cursor()
+    assert create_db.migrate_schema(cur) == create_db.SCHEMA_VERSION
+    executed = cur.statements
+    assert executed[1] == "INSERT INTO schema_version (version) VALUES (%s)"
+    assert all(" ".join(command.split()) in executed for command in create_db.MIGRATIONS[2])
+    assert ("UPDATE schema_version SET version = %s", (2,)) in cur.queries
+
+
+def test_refresh_stats_refreshes_every_view_and_bumps_generation(recording_cursor):
+    cur = recording_cursor()
+    create_db.refresh_stats(cur)
+    queries = cur.statements
+    assert queries[:-2] == [f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}" for view in create_db.STATS_VIEWS]
+    assert queries[-2].startswith("UPDATE load_generation SET generation = generation + 1")
+    assert queries[-1].startswith("SELECT pg_notify('load_generation'")
+
+
+def test_update_sync_state_marks_full_pass_only_for_fully_loaded_employers(recording_cursor):
+    cur = recording_cursor()
+    create_db.update_sync_state(cur, ["1", "2"], ["2"])
+    query, params = cur.queries[0]
+    assert "CASE WHEN e.id = ANY(%s::INTEGER[]) THEN now() END" in query
+    assert "COALESCE(EXCLUDED.last_full_sync_at, sync_state.last_full_sync_at)" in query
+    assert params == ([2], [1, 2])
+
+    cur = recording_cursor()
+    create_db.update_sync_state(cur, ["1", "2"])
+    assert cur.queries[0][1] == ([1, 2], [1, 2])
+
+
+@pytest.mark.parametrize("finished", [False, True])
+def test_fill_tables_runs_post_load_stages_only_after_finished_crawl(monkeypatch, finished):
+    stages = []
+
+    class FakeConnection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def cursor(self):
+            return self
+
+        def commit(self):
+            stages.append("commit")
+
+    monkeypatch.setattr(create_db, "connection", lambda dbname: FakeConnection())
+    monkeypatch.setattr(create_db, "get_currency_rates", lambda url: {"RUR": 1.0})
+    monkeypatch.setattr(create_db, "run_crawl", lambda *args, **kwargs: (5, {}, finished))
+    for stage in ("archive_missing_vacancies", "update_sync_state", "record_observations", "refresh_stats",
+                  "enrich_vacancies"):
+        monkeypatch.setattr(create_db, stage, lambda *args, stage=stage, **kwargs: stages.append(stage))
+    monkeypatch.setattr("src.create_db.dedup.deduplicate", lambda cur: stages.append("deduplicate"))
+
+    assert fill_tables("test_database", ["1"], incremental=False, enrich=True) == 5
+    # Кластеры строятся после обогащения: подписи учитывают описание вакансии
+    expected = ["archive_missing_vacancies", "update_sync_state", "commit", "enrich_vacancies", "deduplicate",
+                "record_observations", "refresh_stats"]
+    assert stages == (expected if finished else ["commit", "enrich_vacancies"])
+
+
+def test_fill_tables_enriches_under_profiling(monkeypatch, tmp_path):
+    enriched = []
+
+    class FakeConnection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def cursor(self):
+            return self
+
+        def commit(self):
+            pass
+
+    def enrich_vacancies(dbname, **kwargs):
+        # Как настоящий enrich_vacancies: свой profiled внутри профилируемой загрузки
+        with metrics.profiled('enrich'):
+            enriched.append(dbname)
+
+    monkeypatch.setattr(metrics, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(create_db, "connection", lambda dbname: FakeConnection())
+    monkeypatch.setattr(create_db, "get_currency_rates", lambda url: {"RUR": 1.0})
+    monkeypatch.setattr(create_db, "run_crawl", lambda *args, **kwargs: (5, {}, True))
+    for stage in ("archive_missing_vacancies", "update_sync_state", "record_observations", "refresh_stats"):
+        monkeypatch.setattr(create_db, stage, lambda *args, **kwargs: None)
+    monkeypatch.setattr(create_db, "enrich_vacancies", enrich_vacancies)
+    monkeypatch.setattr("src.create_db.dedup.deduplicate", lambda cur: None)
+
+    assert fill_tables("test_database", ["1"], enrich=True) == 5
+    assert enriched == ["test_database"]
+    assert [path.name.split('-')[0] for path in tmp_path.iterdir()] == ['fill_tables']
@@ -52,3 +52,56 @@ def test_get_vacancies_with_keyword(db_manager):
     db_manager.connect(dbname="test_database")
     vacancies_with_keyword = db_manager.get_vacancies_with_keyword("Python")
     assert isinstance(vacancies_with_keyword, list)
+
+
+def test_search_vacancies(db_manager):
+    db_manager.connect(dbname="test_database")
+    vacancies, cursor = db_manager.search_vacancies("Python разработчик", limit=5)
+    assert isinstance(vacancies, list)
+    assert len(vacancies) <= 5
+    if cursor is not None:
+        next_vacancies, _ = db_manager.search_vacancies("Python разработчик", limit=5, cursor=cursor)
+        assert not set(vacancies) & set(next_vacancies)
+
+
+def test_search_vacancies_finds_word_inside_long_title(db_manager):
+    db_manager.connect(dbname="test_database")
+    titles = {vacancy[1] for vacancy in db_manager.get_vacancies_with_keyword("разработчик")}
+    vacancies, _ = db_manager.search_vacancies("разработчик", limit=len(titles) + 1)
+    assert titles <= {vacancy[1] for vacancy in vacancies}
+
+
+def test_search_vacancies_matches_words_and_substrings(recording_cursor):
+    db_manager = DBManager('hh', cache_entries=0)
+    db_manager.conn = object()
+    db_manager.cur = recording_cursor(
+        [[('Компания', 'Ведущий Python-разработчик (Django)', 200000, None, 'https://hh.ru/vacancy/1', 0.5, 1)]])
+
+    vacancies, cursor = db_manager.search_vacancies("50%_python", limit=5)
+
+    query, params = db_manager.cur.queries[-1]
+    assert 'q.text <%% v.title' in query and 'v.title ILIKE %(pattern)s' in query
+    assert params['pattern'] == '%50\\%\\_python%'
+    assert vacancies[0][1] == 'Ведущий Python-разработчик (Django)' and cursor is None
+
+
+def test_get_company_salary_stats(db_manager):
+    db_manager.connect(dbname="test_database")
+    company_salary_stats = db_manager.get_company_salary_stats()
+    assert isinstance(company_salary_stats, list)
+    assert all(len(row) == 8 for row in company_salary_stats)
+
+
+def test_iter_all_vacancies(db_manager):
+    db_manager.connect(dbname="test_database")
+    all_vacancies = list(db_manager.iter_all_vacancies(itersize=10))
+    assert all_vacancies == db_manager.get_all_vacancies()
+
+
+def test_get_vacancies_page(db_manager):
+    db_manager.connect(dbname="test_database")
+    first_page, after_id = db_manager.get_vacancies_page(limit=5)
+    assert len(first_page) <= 5
+    if after_id is not None:
+        second_page, _ = db_manager.get_vacancies_page(after_id, limit=5)
+        assert first_page + second_page == db_manager.get_all_vacancies()[:len(first_page) + len(second_page)]
@@ -0,0 +1,79 @@
+import numpy as np
+
+from src.create_db.dedup import (shingle_hashes, minhash_signatures, candidate_pairs, connected_components,
+                                 cluster_signatures, deduplicate, BANDS)
+from src.dbmanager_class.dbmanager import DBManager
+
+TITLES = [
+    "Python-разработчик (Django, PostgreSQL) в команду платежей, удалённо",
+    "Бухгалтер по расчёту заработной платы, 1С ЗУП, офис в центре",
+    "Водитель-экспедитор категории C на собственный склад, график 5/2",
+    "Аналитик данных SQL, Python, Tableau; отчётность для отдела продаж",
+]
+
+
+def test_shingles_ignore_case_and_punctuation():
+    first, _ = shingle_hashes(["Python-разработчик, удалённо"])
+    second, _ = shingle_hashes(["python разработчик   УДАЛЁННО!"])
+    assert np.array_equal(first, second)
+
+    _, doc_ids = shingle_hashes(["", "Курьер", "Продавец-консультант"])
+    assert set(doc_ids.tolist()) == {0, 1, 2}
+
+
+def test_near_duplicates_share_cluster_within_company():
+    texts = TITLES + [TITLES[0] + " Москва", TITLES[1].upper(), TITLES[2]]
+    companies = np.array([1, 1, 2, 3, 1, 1, 5])
+    labels = cluster_signatures(minhash_signatures(texts, chunk_docs=3), companies)
+
+    assert labels.tolist() == [0, 1, 2, 3, 0, 1, 6]
+    assert cluster_signatures(minhash_signatures(texts), None).tolist() == [0, 1, 2, 3, 0, 1, 2]
+
+
+def test_candidate_pairs_stay_linear_for_large_buckets():
+    signatures = minhash_signatures([TITLES[0]] * 2000)
+    pairs = candidate_pairs(signatures)
+    assert len(pairs) <= 2 * 2000 * BANDS
+    assert (connected_components(2000, pairs) == 0).all()
+
+
+def test_connected_components_label_with_smallest_index():
+    labels = connected_components(6, np.array([[4, 5], [3, 4], [1, 3], [0, 2]]))
+    assert labels.tolist() == [0, 1, 0, 1, 1, 1]
+
+
+def test_deduplicate_writes_only_changed_clusters(recording_cursor):
+    rows = [(10, 1, 10, TITLES[0]), (11, 1, None, TITLES[0] + " Москва"), (12, 1, 12, TITLES[1]),
+            (13, 2, None, TITLES[3])]
+    cur = recording_cursor([rows])
+
+    result = deduplicate(cur)
+
+    assert result['vacancies'] == 4 and result['duplicates'] == 1 and result['updated'] == 2
+    assert cur.copied == "11\t10\n13\t13\n"
+    assert cur.statements[-1].startswith("UPDATE vacancies v SET cluster_id = s.cluster_id")
+
+
+def test_deduplicate_skips_update_when_clusters_unchanged(recording_cursor):
+    cur = recording_cursor([[(10, 1, 10, TITLES[0]), (11, 1, 10, TITLES[0])]])
+    assert deduplicate(cur)['updated'] == 0
+    assert len(cur.queries) == 1
+
+
+def test_dbmanager_dedup_counts_one_vacancy_per_cluster(recording_cursor):
+    db_manager = DBManager('hh', cache_entries=0)
+    db_manager.conn = object()
+    db_manager.cur = recording_cursor()
+
+    db_manager.get_companies_and_vacancies_count(dedup=True)
+    db_manager.get_avg_salary(dedup=True)
+    db_manager.get_vacancies_with_higher_salary(dedup=True)
+    db_manager.get_vacancies_with_higher_salary()
+    db_manager.get_company_salary_stats(dedup=True)
+
+    queries = db_manager.cur.statements
+    assert 'unique_vacancies_count' in queries[0]
+    assert 'unique_avg_salary' in queries[1]
+    assert 'v.cluster_id = v.vacancy_id' in queries[2] and 'unique_avg_salary' in queries[2]
+    assert 'cluster_id' not in queries[3]
+    assert 'unique_median_salary' in queries[4] and 'ORDER BY unique_vacancies_count' in queries[4]
@@ -0,0 +1,45 @@
+from src.api.hh_api import iter_vacancy_details
+from src.api.rate_limit import RateLimiter
+from src.create_db import enrich
+from src.create_db.enrich import detail_row, detail_skills, save_details
+
+
+def test_iter_vacancy_details_skips_missing_vacancies(hh_stub):
+    stub, url = hh_stub
+    limiter = RateLimiter(5, rate=1000, burst=1000)
+    details = list(iter_vacancy_details([1, 2, 3, 99999], url=url, limiter=limiter))
+
+    assert sorted(detail['id'] for detail in details) == ['1', '2', '3']
+    assert all(detail['key_skills'] for detail in details)
+
+
+def test_detail_row_and_skills(hh_stub):
+    stub, _ = hh_stub
+    detail = stub.detail('7')
+
+    assert detail_row(detail) == (7, '<p>Описание вакансии 7</p>', 'От 1 года до 3 лет', 'Удаленная работа',
+                                  'Полная занятость', 'Москва')
+    assert detail_skills(detail) == ['Python', 'SQL']
+    assert detail_row({'id': '8'}) == (8, None, None, None, None, None)
+    assert detail_skills({'id': '8', 'key_skills': None}) == []
+
+
+def test_save_details_replaces_vacancy_skills(hh_stub, recording_cursor, monkeypatch):
+    stub, _ = hh_stub
+    cur = recording_cursor()
+    monkeypatch.setattr(enrich, "execute_values", lambda cur, query, rows: cur.execute(query, rows))
+    save_details(cur, [stub.detail('1'), stub.detail('2')], fetched_at='2024-04-01')
+
+    queries = cur.statements
+    assert queries[0].startswith("INSERT INTO vacancy_details")
+    assert [row[0] for row in cur.queries[0][1]] == [1, 2]
+    assert all(row[-1] == '2024-04-01' for row in cur.queries[0][1])
+    assert cur.queries[1] == ("DELETE FROM vacancy_skills WHERE vacancy_id = ANY(%s)", ([1, 2],))
+    assert queries[2].startswith("INSERT INTO skills")
+    assert cur.queries[3][1] == ([1, 1, 2, 2], ['Python', 'SQL', 'Python', 'SQL'])
+
+
+def test_save_details_skips_empty_batch(recording_cursor):
+    cur = recording_cursor()
+    save_details(cur, [], fetched_at='2024-04-01')
+    assert cur.queries == []
@@ -1,21 +1,102 @@
-import requests
-import pytest
-from src.api.hh_api import get_vacancies_by_employer_ids
+import time
+from tests.conftest import make_vacancy
+from datetime import datetime, timedelta, timezone
+from src.api.hh_api import (get_vacancies_by_employer_ids, count_vacancies_by_employer_ids, plan_employer_shards,
+                            iter_vacancy_pages,
+                            create_session, MAX_ITEMS)
 
 
-def test_get_vacancies_by_employer_ids():
+def test_get_vacancies_by_employer_ids(hh_stub):
+    stub, url = hh_stub
     # Проверка успешного получения вакансий
     employer_ids = ["1", "2", "3"]
-    vacancies = get_vacancies_by_employer_ids(employer_ids)
+    vacancies = get_vacancies_by_employer_ids(employer_ids, url=url)
     assert len(vacancies) >= 0
 
-    # Проверка обработки ошибки в ответе API
-    def mock_get(*args, **kwargs):
-        response = requests.Response()
-        response.status_code = 404
-        return response
+    # Если подсчёт вакансий не удался, работодатель не пропускается: его выдача запрашивается на всю глубину.
+    # Один работодатель, чтобы сбой гарантированно пришёлся на подсчёт, а не на параллельную загрузку страниц
+    stub.failures = [404]
+    vacancies = get_vacancies_by_employer_ids(["1"], url=url)
+    assert not stub.failures
+    expected = [vac['id'] for vac in stub.vacancies if vac['employer']['id'] == "1"]
+    assert sorted(vac['id'] for vac in vacancies) == sorted(expected)
 
-    with pytest.raises(Exception) as exc_info:
-        with mock_get():
-            get_vacancies_by_employer_ids(employer_ids)
-        assert exc_info.value is None
+
+def test_get_vacancies_by_employer_ids_returns_all_pages(hh_stub):
+    stub, url = hh_stub
+    vacancies = get_vacancies_by_employer_ids(["1", "2"], url=url)
+    expected = [vac['id'] for vac in stub.vacancies if vac['employer']['id'] in ("1", "2")]
+    assert sorted(vac['id'] for vac in vacancies) == sorted(expected)
+
+
+def test_get_vacancies_by_employer_ids_concurrent_is_faster(hh_stub):
+    stub, url = hh_stub
+    stub.latency = 0.05
+
+    start = time.perf_counter()
+    serial = get_vacancies_by_employer_ids(["1", "2", "3"], max_workers=1, url=url)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    concurrent = get_vacancies_by_employer_ids(["1", "2", "3"], max_workers=5, url=url)
+    concurrent_time = time.perf_counter() - start
+
+    assert sorted(concurrent, key=lambda vac: vac['id']) == sorted(serial, key=lambda vac: vac['id'])
+    assert len(concurrent) == len(stub.vacancies)
+    assert concurrent_time * 2 < serial_time
+
+
+def test_plan_employer_shards_splits_large_employer(hh_stub):
+    stub, url = hh_stub
+    now = datetime.now(timezone.utc)
+    stub.vacancies = [
+        make_vacancy(i, 3529, published_at=(now - timedelta(minutes=7 * i)).isoformat(timespec='seconds'))
+        for i in range(1, 5001)
+    ]
+
+    with create_session() as session:
+        shards = plan_employer_shards(session, url, "3529", now)
+
+    assert len(shards) > 1
+    assert all(found <= MAX_ITEMS for _, found in shards)
+    assert sum(found for _, found in shards) >= 5000
+
+
+def test_get_vacancies_by_employer_ids_gets_past_pagination_cap(hh_stub):
+    stub, url = hh_stub
+    now = datetime.now(timezone.utc)
+    stub.vacancies = [
+        make_vacancy(i, 1 if i <= 4500 else 2, published_at=(now - timedelta(minutes=9 * i)).isoformat())
+        for i in range(1, 5001)
+    ]
+
+    vacancies = get_vacancies_by_employer_ids(["1", "2"], url=url)
+
+    ids = [vac['id'] for vac in vacancies]
+    assert len(ids) == len(set(ids)) == 5000
+
+
+def test_get_vacancies_by_employer_ids_since(hh_stub):
+    stub, url = hh_stub
+    now = datetime.now(timezone.utc)
+    stub.vacancies = [
+        make_vacancy(i, 1, published_at=(now - timedelta(days=i)).isoformat(timespec='seconds'))
+        for i in range(1, 11)
+    ]
+
+    vacancies = get_vacancies_by_employer_ids(["1"], url=url, since={"1": now - timedelta(days=3, hours=1)})
+
+    assert sorted(vac['id'] for vac in vacancies) == ['1', '2', '3']
+
+
+def test_count_vacancies_by_employer_ids(hh_stub):
+    stub, url = hh_stub
+    assert count_vacancies_by_employer_ids(["1", "2", "404"], url=url) == {"1": 333, "2": 334, "404": 0}
+
+
+def test_iter_vacancy_pages_yields_pages_as_they_arrive(hh_stub):
+    stub, url = hh_stub
+    pages = list(iter_vacancy_pages(["1", "2", "3"], url=url))
+    assert len(pages) == 12
+    assert all(len(items) <= 100 for items in pages)
+    assert sum(len(items) for items in pages) == len(stub.vacancies)
@@ -0,0 +1,102 @@
+from datetime import date
+
+import pytest
+
+from src.create_db import history
+from src.create_db.history import add_months, partition_name, ensure_partitions, drop_old_partitions
+from src.dbmanager_class import dbmanager
+from src.dbmanager_class.dbmanager import DBManager
+from tests.conftest import RecordingCursor
+
+
+class FakeCursor:
+    def __init__(self, partitions=()):
+        self.partitions = [partition_name(month) for month in partitions]
+        self.queries = []
+        self.rowcount = 0
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        if query.startswith("SELECT c.relname"):
+            self.rows = [(name,) for name in self.partitions + ['vacancy_observations_default']]
+        elif query.startswith("CREATE TABLE"):
+            self.partitions.append(query.split()[5])
+        elif query.startswith("DROP TABLE"):
+            self.partitions.remove(query.split()[-1])
+        elif 'INSERT INTO vacancy_observations' in query:
+            self.rowcount = 42
+        elif query == "SELECT current_date":
+            self.rows = [(date(2024, 12, 5),)]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2024, 11, 20), 2) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert partition_name(date(2024, 4, 1)) == 'vacancy_observations_y2024m04'
+
+
+def test_ensure_partitions_creates_current_and_next_month():
+    cur = FakeCursor([date(2024, 12, 1)])
+    assert ensure_partitions(cur, date(2024, 12, 31)) == [date(2025, 1, 1)]
+    create = [params for query, params in cur.queries if query.startswith("CREATE TABLE")]
+    assert create == [(date(2025, 1, 1), date(2025, 2, 1))]
+    assert ensure_partitions(cur, date(2024, 12, 31)) == []
+
+
+def test_drop_old_partitions_keeps_retention_window():
+    months = [add_months(date(2023, 1, 1), offset) for offset in range(24)]
+    cur = FakeCursor(months)
+    dropped = drop_old_partitions(cur, date(2024, 12, 5), retention_months=6)
+    assert dropped == months[:17]
+    assert cur.partitions == [partition_name(month) for month in months[17:]]
+
+
+def test_record_observations_writes_snapshot_of_load_date():
+    cur = FakeCursor([add_months(date(2022, 1, 1), offset) for offset in range(36)])
+
+    assert history.record_observations(cur, retention_months=24) == 42
+
+    writes = [(query.split()[0], params) for query, params in cur.queries
+              if query.startswith('DELETE FROM vacancy_observations') or 'INSERT INTO vacancy_observations' in query]
+    assert writes == [('DELETE', (date(2024, 12, 5),)), ('INSERT', (date(2024, 12, 5),))]
+    assert partition_name(date(2025, 1, 1)) in cur.partitions
+    assert partition_name(date(2022, 11, 1)) not in cur.partitions
+    assert partition_name(date(2022, 12, 1)) in cur.partitions
+
+
+def make_manager():
+    db_manager = DBManager('hh', cache_entries=0)
+    db_manager.conn = object()
+    db_manager.cur = RecordingCursor([[(date(2024, 10, 1), 'Компания', 3, 100000.123, None)]])
+    return db_manager
+
+
+def test_company_trend_filters_by_partition_key():
+    db_manager = make_manager()
+    rows = db_manager.get_company_salary_trend(date(2024, 10, 1), date(2025, 1, 1), company_ids=[80])
+
+    query, params = db_manager.cur.queries[-1]
+    assert "o.observed_on >= %(since)s AND o.observed_on < %(until)s" in query
+    assert params == {'period': 'month', 'since': date(2024, 10, 1), 'until': date(2025, 1, 1), 'company_ids': [80]}
+    assert rows == [(date(2024, 10, 1), 'Компания', 3, 100000.12, None)]
+
+
+def test_keyword_trend_defaults_to_recent_quarter(monkeypatch):
+    db_manager = make_manager()
+    monkeypatch.setattr(dbmanager, 'TREND_DAYS', 30)
+    db_manager.get_keyword_salary_trend('python', period='week')
+
+    query, params = db_manager.cur.queries[-1]
+    assert 'o.title ILIKE %(pattern)s' in query
+    assert params['pattern'] == '%python%'
+    assert (params['until'] - params['since']).days == 31
+
+    with pytest.raises(ValueError):
+        db_manager.get_keyword_salary_trend('python', period='year')
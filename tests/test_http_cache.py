@@ -0,0 +1,109 @@
+import pickle
+import sqlite3
+
+from src.api.hh_api import get_vacancies_by_employer_ids
+from src.api.http_cache import HTTPCache
+
+
+def test_key_does_not_depend_on_params_order():
+    first = HTTPCache.key('http://api/vacancies', {'employer_id': '1', 'page': 0, 'per_page': 100})
+    second = HTTPCache.key('http://api/vacancies', {'per_page': 100, 'page': 0, 'employer_id': '1'})
+    assert first == second
+    assert first != HTTPCache.key('http://api/vacancies', {'employer_id': '1', 'page': 1, 'per_page': 100})
+
+
+def test_fresh_responses_are_served_without_requests(hh_stub, tmp_path):
+    stub, url = hh_stub
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), ttl=60)
+
+    first = get_vacancies_by_employer_ids(["1", "2"], url=url, cache=cache)
+    requests_made = len(stub.requests)
+    second = get_vacancies_by_employer_ids(["1", "2"], url=url, cache=cache)
+
+    assert sorted(vac['id'] for vac in second) == sorted(vac['id'] for vac in first)
+    assert len(stub.requests) == requests_made
+    assert cache.stats()['hits'] == requests_made
+    cache.close()
+
+
+def test_stale_responses_are_revalidated_with_etag(hh_stub, tmp_path):
+    stub, url = hh_stub
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), ttl=0)
+
+    first = get_vacancies_by_employer_ids(["1"], url=url, cache=cache)
+    downloaded = cache.stats()['misses']
+    second = get_vacancies_by_employer_ids(["1"], url=url, cache=cache)
+
+    stats = cache.stats()
+    assert sorted(vac['id'] for vac in second) == sorted(vac['id'] for vac in first)
+    assert stats['revalidated'] == downloaded
+    assert stats['misses'] == 2 * downloaded and stats['hits'] == 0
+    cache.close()
+
+
+def test_changed_responses_replace_cached_pages(hh_stub, tmp_path):
+    stub, url = hh_stub
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), ttl=0)
+
+    get_vacancies_by_employer_ids(["1"], url=url, cache=cache)
+    stub.vacancies = [vac for vac in stub.vacancies if vac['id'] != '3']
+    vacancies = get_vacancies_by_employer_ids(["1"], url=url, cache=cache)
+
+    assert '3' not in {vac['id'] for vac in vacancies}
+    cache.close()
+
+
+def test_cache_evicts_least_recently_read_entries(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), max_bytes=3000)
+    payload = {'items': ['x' * 900]}
+    for key in ('a', 'b', 'c'):
+        cache.put(key, payload)
+    cache.get('a')
+    cache.put('d', payload)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.stats()['size_bytes'] <= 3000
+    cache.close()
+
+
+def test_misses_are_counted_on_lookup(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'), ttl=60)
+    assert cache.get('key') is None
+    cache.put('key', {'found': 1})
+    assert cache.get('key').fresh
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+    cache.close()
+
+
+def test_unreadable_entries_are_dropped(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, payload BLOB NOT NULL, "
+                "size INTEGER NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+    old.execute("INSERT INTO responses VALUES ('key', NULL, NULL, ?, 5, 0, 0)", (pickle.dumps({'found': 1}),))
+    old.commit()
+    old.close()
+
+    # Кэш прежнего формата (pickle) удаляется при открытии, а испорченная запись — при чтении
+    cache = HTTPCache(path)
+    assert cache.stats()['entries'] == 0
+    cache.put('key', {'found': 1})
+    cache._db.execute("UPDATE responses SET payload = ? WHERE key = 'key'", (b'\x80\x04not json',))
+    assert cache.get('key') is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['size_bytes'] == 0
+    cache.close()
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = HTTPCache(path)
+    cache.put('key', {'found': 1}, etag='"abc"')
+    cache.close()
+
+    reopened = HTTPCache(path)
+    entry = reopened.get('key')
+    assert entry.data == {'found': 1}
+    assert entry.etag == '"abc"'
+    assert reopened.stats()['entries'] == 1
+    reopened.close()
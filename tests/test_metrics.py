@@ -0,0 +1,89 @@
+import json
+import urllib.request
+
+from src.api.hh_api import get_vacancies_by_employer_ids
+from src.metrics import metrics
+from src.metrics.metrics import Registry
+
+
+def test_counters_are_kept_per_labels():
+    registry = Registry()
+    registry.inc('requests_total', status=200)
+    registry.inc('requests_total', 2, status=200)
+    registry.inc('requests_total', status=429)
+
+    text = registry.to_prometheus()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{status="200"} 3' in text
+    assert 'requests_total{status="429"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    for value in (0.003, 0.003, 0.2, 100):
+        registry.observe('query_seconds', value, query='avg')
+
+    text = registry.to_prometheus()
+    assert 'query_seconds_bucket{query="avg",le="0.001"} 0' in text
+    assert 'query_seconds_bucket{query="avg",le="0.005"} 2' in text
+    assert 'query_seconds_bucket{query="avg",le="0.25"} 3' in text
+    assert 'query_seconds_bucket{query="avg",le="+Inf"} 4' in text
+    assert 'query_seconds_count{query="avg"} 4' in text
+
+    histogram = registry.to_json()['histograms']['query_seconds'][0]
+    assert histogram['labels'] == {'query': 'avg'}
+    assert histogram['p50'] == 0.005
+    assert histogram['p99'] == float('inf')
+
+
+def test_timed_records_each_call():
+    metrics.REGISTRY.reset()
+
+    @metrics.timed('dbmanager_query')
+    def get_avg_salary():
+        return 42
+
+    assert get_avg_salary() == 42
+    assert get_avg_salary.__name__ == 'get_avg_salary'
+    series = metrics.REGISTRY.histograms['dbmanager_query_seconds']
+    assert series[(('query', 'get_avg_salary'),)].count == 1
+
+
+def test_fetching_updates_metrics_endpoint(hh_stub):
+    stub, url = hh_stub
+    metrics.REGISTRY.reset()
+    get_vacancies_by_employer_ids(["1"], url=url)
+
+    server = metrics.serve(0)
+    try:
+        base = f'http://127.0.0.1:{server.server_port}'
+        text = urllib.request.urlopen(f'{base}/metrics').read().decode()
+        report = json.loads(urllib.request.urlopen(f'{base}/metrics.json').read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert f'hh_requests_total{{status="200"}} {len(stub.requests)}' in text
+    assert 'hh_request_seconds_bucket' in text
+    assert report['counters']['hh_pages_total'][0]['value'] > 0
+
+
+def test_profiled_writes_profile_only_when_enabled(tmp_path):
+    with metrics.profiled('load', directory=None):
+        sum(range(1000))
+    assert not list(tmp_path.iterdir())
+
+    with metrics.profiled('load', directory=str(tmp_path)):
+        sum(range(1000))
+    assert [path.suffix for path in tmp_path.iterdir()] == ['.prof']
+
+
+def test_nested_profiled_blocks_write_one_profile(tmp_path):
+    with metrics.profiled('outer', directory=str(tmp_path)):
+        with metrics.profiled('inner', directory=str(tmp_path)):
+            sum(range(1000))
+    assert [path.name.split('-')[0] for path in tmp_path.iterdir()] == ['outer']
+
+    with metrics.profiled('again', directory=str(tmp_path)):
+        pass
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,107 @@
+import time
+
+from src.api import hh_api
+from src.api.hh_api import get_vacancies_by_employer_ids, get_currency_rates, create_session, fetch_page
+from src.api.rate_limit import (TokenBucket, AdaptiveConcurrency, RateLimiter, backoff_delay,
+                                parse_retry_after)
+
+
+def fast_limiter(max_concurrency=5, max_retries=5):
+    return RateLimiter(max_concurrency, rate=1000, burst=1000, max_retries=max_retries, backoff_base=0.01)
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, capacity=10)
+    start = time.perf_counter()
+    for _ in range(30):
+        bucket.acquire()
+    # Первые 10 токенов есть в корзине, остальные 20 появляются со скоростью 100 в секунду
+    assert time.perf_counter() - start >= 0.18
+
+
+def test_adaptive_concurrency_rises_and_halves():
+    concurrency = AdaptiveConcurrency(maximum=8, initial=2)
+    for _ in range(100):
+        concurrency.succeeded()
+    assert concurrency.limit == 8
+
+    concurrency.throttled()
+    assert concurrency.limit == 4
+    concurrency.throttled()
+    concurrency.throttled()
+    concurrency.throttled()
+    assert concurrency.limit == 1
+
+
+def test_backoff_delay_honours_retry_after():
+    assert all(0 <= backoff_delay(attempt, base=0.5, cap=4) <= 4 for attempt in range(10))
+    assert backoff_delay(0, retry_after=3, base=0.01) >= 3
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2') == 2.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+
+
+def test_throttled_pages_are_retried_not_lost(hh_stub):
+    stub, url = hh_stub
+    stub.failures = [429, 503, 429, 502]
+    limiter = fast_limiter()
+
+    vacancies = get_vacancies_by_employer_ids(["1", "2", "3"], url=url, limiter=limiter)
+
+    assert sorted(vac['id'] for vac in vacancies) == sorted(vac['id'] for vac in stub.vacancies)
+    stats = limiter.stats()
+    assert stats['retries'] == 4
+    assert stats['throttles'] == 3
+    assert stats['failed'] == 0
+
+
+def test_retry_budget_is_limited_per_page(hh_stub):
+    stub, url = hh_stub
+    stub.failures = [503] * 10
+    limiter = fast_limiter(max_retries=2)
+
+    with create_session(limiter=limiter) as session:
+        assert fetch_page(session, url, {'employer_id': '1'}, 0) is None
+
+    assert len(stub.requests) == 3
+    assert limiter.stats()['failed'] == 1
+
+
+def test_throttling_lowers_concurrency(hh_stub):
+    stub, url = hh_stub
+    stub.failures = [429] * 3
+    limiter = fast_limiter(max_concurrency=8)
+    start_limit = limiter.concurrency.limit
+
+    with create_session(8, limiter=limiter) as session:
+        assert fetch_page(session, url, {'employer_id': '1'}, 0) is not None
+
+    assert limiter.concurrency.limit < start_limit
+
+
+def test_hung_requests_time_out_and_are_retried(hh_stub, monkeypatch):
+    stub, url = hh_stub
+    stub.latency = 0.3
+    monkeypatch.setattr(hh_api, 'REQUEST_TIMEOUT', (1.0, 0.05))
+    limiter = fast_limiter(max_retries=1)
+
+    with create_session(limiter=limiter) as session:
+        assert fetch_page(session, url, {'employer_id': '1'}, 0) is None
+
+    assert limiter.stats()['retries'] == 1
+    assert limiter.stats()['failed'] == 1
+
+
+def test_currency_rates_go_through_rate_limiter(hh_stub):
+    stub, url = hh_stub
+    stub.failures = [503]
+    limiter = fast_limiter()
+
+    rates = get_currency_rates(url.replace('/vacancies', '/dictionaries'), limiter=limiter)
+
+    assert rates == {'RUR': 1.0, 'USD': 0.011}
+    assert limiter.stats()['retries'] == 1
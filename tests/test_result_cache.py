@@ -0,0 +1,160 @@
+from collections import namedtuple
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from src.dbmanager_class import dbmanager
+from src.dbmanager_class.dbmanager import DBManager
+from src.dbmanager_class.result_cache import ResultCache, estimate_size
+
+Notify = namedtuple('Notify', 'pid channel payload')
+
+
+def test_estimate_size_counts_nested_rows():
+    rows = [('Компания', 'Вакансия', 100000, None, 'https://hh.ru/vacancy/1')] * 3
+    assert estimate_size(rows) > estimate_size([]) + 3 * estimate_size(rows[0]) - 1
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3)
+
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_respects_memory_limit():
+    row = ('x' * 1000,)
+    cache = ResultCache(max_bytes=estimate_size([row] * 3))
+    cache.put('big', [row] * 10)
+    cache.put('first', [row])
+    cache.put('second', [row])
+    cache.put('third', [row])
+
+    assert cache.get('big')[0] is False
+    assert cache.get('first')[0] is False
+    assert cache.stats()['size_bytes'] <= cache.max_bytes
+
+
+def test_cache_is_cleared_when_generation_changes():
+    cache = ResultCache()
+    cache.set_generation(1)
+    cache.put('a', 1)
+    cache.set_generation(1)
+    assert cache.get('a') == (True, 1)
+    cache.set_generation(2)
+    assert cache.get('a') == (False, None)
+
+
+class FakeInfo:
+    transaction_status = TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self):
+        self.queries = []
+        self.notifies = []
+        self.generation = 1
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def poll(self):
+        pass
+
+    def commit(self):
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.commit()
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn.queries.append(query)
+        self.conn.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        self.result = [(self.conn.generation,)] if 'load_generation' in query else [('Компания', len(query))]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def connect(monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(dbmanager, 'acquire', lambda **params: conn)
+    monkeypatch.setattr(dbmanager, 'release', lambda conn, **params: None)
+    db_manager = DBManager('hh')
+    db_manager.connect('hh')
+    return db_manager, conn
+
+
+def company_queries(conn):
+    return [query for query in conn.queries if 'company_stats' in query]
+
+
+def test_repeated_queries_are_served_from_cache(monkeypatch):
+    db_manager, conn = connect(monkeypatch)
+    assert conn.queries == ["LISTEN load_generation", "SELECT generation FROM load_generation"]
+
+    first = db_manager.get_companies_and_vacancies_count()
+    assert db_manager.get_companies_and_vacancies_count() is first
+    db_manager.get_vacancies_with_keyword('python')
+    db_manager.get_vacancies_with_keyword('python')
+    db_manager.get_vacancies_with_keyword('java')
+
+    assert len(company_queries(conn)) == 1
+    assert len([query for query in conn.queries if 'ILIKE' in query]) == 2
+    assert db_manager.cache.stats()['hits'] == 2
+
+
+def test_load_notification_invalidates_cache(monkeypatch):
+    db_manager, conn = connect(monkeypatch)
+    db_manager.get_companies_and_vacancies_count()
+
+    conn.notifies.append(Notify(1, 'load_generation', '2'))
+    db_manager.get_companies_and_vacancies_count()
+
+    assert len(company_queries(conn)) == 2
+    assert db_manager.cache.generation == 2
+    assert conn.notifies == []
+
+
+def test_generation_is_reread_inside_transaction_or_after_interval(monkeypatch):
+    db_manager, conn = connect(monkeypatch)
+    db_manager.get_companies_and_vacancies_count()
+
+    conn.generation = 2
+    conn.info.transaction_status = TRANSACTION_STATUS_INTRANS
+    db_manager.get_companies_and_vacancies_count()
+    assert len(company_queries(conn)) == 2
+
+    conn.generation = 3
+    monkeypatch.setattr(dbmanager, 'GENERATION_CHECK_INTERVAL', 0)
+    db_manager.get_companies_and_vacancies_count()
+    assert len(company_queries(conn)) == 3
+
+
+def test_disabled_cache_always_queries_database(monkeypatch):
+    db_manager, conn = connect(monkeypatch)
+    db_manager.cache.max_entries = 0
+    db_manager.get_vacancies_with_higher_salary()
+    db_manager.get_vacancies_with_higher_salary()
+    assert len([query for query in conn.queries if 'salary_stats' in query]) == 2
+
+
+def test_release_unsubscribes_connection(monkeypatch):
+    db_manager, conn = connect(monkeypatch)
+    db_manager.disconnect()
+    assert conn.queries[-1] == "UNLISTEN *"
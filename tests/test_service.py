@@ -0,0 +1,203 @@
+import asyncio
+import json
+from decimal import Decimal
+
+from benchmarks.load_service import request, load_test
+from src.dbmanager_class.dbmanager import SEARCH_VACANCIES, SEARCH_PARAMS, COMPANIES_COUNT, dedup_sql
+from src.service.service import QueryService, Coalescer, QUERIES, asyncpg_sql
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.listeners = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def fetch(self, sql, *params):
+        self.pool.queries.append((sql, params))
+        await asyncio.sleep(0.01)
+        if 'websearch_to_tsquery' in sql:
+            keyword, _, _, _, limit = params
+            return [('Компания', f'Вакансия {keyword}', 100000, None, 'https://hh.ru/vacancy/1', 0.5, 1)][:limit]
+        return [('Компания', 10)]
+
+    async def fetchval(self, sql, *params):
+        self.pool.queries.append((sql, params))
+        return self.pool.generation if 'load_generation' in sql else Decimal('123456.78')
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def remove_listener(self, channel, callback):
+        del self.listeners[channel]
+
+    def add_termination_listener(self, callback):
+        self.on_termination = callback
+
+    def is_closed(self):
+        return False
+
+
+class FakePool:
+    def __init__(self):
+        self.queries = []
+        self.generation = 1
+        self.listener = FakeConnection(self)
+
+    def acquire(self):
+        return self
+
+    def __await__(self):
+        yield from ()
+        return self.listener
+
+    async def __aenter__(self):
+        return FakeConnection(self)
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def release(self, conn):
+        pass
+
+    async def close(self):
+        pass
+
+
+def data_queries(pool):
+    return [query for query in pool.queries if 'load_generation' not in query[0]]
+
+
+def test_identical_concurrent_queries_are_coalesced():
+    async def scenario():
+        pool = FakePool()
+        service = QueryService(pool, cache_entries=0)
+        bodies = await asyncio.gather(*(service.query('companies') for _ in range(50)),
+                                      service.query('search', 'python', '%python%', None, None, 10))
+        assert len(data_queries(pool)) == 2
+        assert service.coalescer.coalesced == 49
+        assert len(service.coalescer) == 0
+        assert json.loads(bodies[0]) == [{'company': 'Компания', 'vacancies': 10}]
+
+        await service.query('companies')
+        assert len(data_queries(pool)) == 3
+
+    asyncio.run(scenario())
+
+
+def test_errors_are_shared_by_coalesced_queries():
+    async def scenario():
+        coalescer = Coalescer()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise OSError("connection refused")
+
+        results = await asyncio.gather(*(coalescer.run('key', failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, OSError) for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_cached_answers_are_dropped_after_load_notification():
+    async def scenario():
+        pool = FakePool()
+        service = QueryService(pool)
+        await service.start()
+        await service.query('companies')
+        await service.query('companies')
+        assert len(data_queries(pool)) == 1
+
+        pool.listener.listeners['load_generation'](pool.listener, 1, 'load_generation', '2')
+        await service.query('companies')
+        assert len(data_queries(pool)) == 2
+
+        pool.listener.on_termination(pool.listener)
+        await service.query('companies')
+        assert len(data_queries(pool)) == 3
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_http_endpoints():
+    async def scenario():
+        pool = FakePool()
+        service = QueryService(pool)
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            status, body = await request(reader, writer, '127.0.0.1', '/vacancies/search?keyword=аналитик&limit=5')
+            assert status == 200
+            assert json.loads(body)[0]['title'] == 'Вакансия аналитик'
+            status, body = await request(reader, writer, '127.0.0.1', '/avg-salary')
+            assert (status, json.loads(body)) == (200, {'avg_salary': 123456.78})
+            assert (await request(reader, writer, '127.0.0.1', '/vacancies/search'))[0] == 400
+            assert (await request(reader, writer, '127.0.0.1', '/vacancies/search?keyword=x&limit=0'))[0] == 400
+            assert (await request(reader, writer, '127.0.0.1', '/unknown'))[0] == 404
+            status, body = await request(reader, writer, '127.0.0.1', '/avg-salary?dedup=1')
+            assert (status, json.loads(body)) == (200, {'avg_salary': 123456.78})
+            assert 'unique_avg_salary' in pool.queries[-1][0]
+            assert (await request(reader, writer, '127.0.0.1', '/avg-salary?dedup=yes'))[0] == 400
+            assert (await request(reader, writer, '127.0.0.1', '/vacancies/search?keyword=x&dedup=1'))[0] == 400
+            status, body = await request(reader, writer, '127.0.0.1', '/metrics')
+            assert status == 200 and b'service_requests_total' in body
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_invalid_content_length_is_rejected():
+    async def scenario(content_length):
+        service = QueryService(FakePool())
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            writer.write(f"GET /companies HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n".encode())
+            await writer.drain()
+            head, body = (await reader.read()).split(b'\r\n\r\n', 1)
+            return head.decode(), json.loads(body)
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+    for content_length in ('abc', '-5', '10' * 10):
+        head, body = asyncio.run(scenario(content_length))
+        assert head.startswith('HTTP/1.1 400') and 'Connection: close' in head
+        assert body == {'error': "Некорректный заголовок Content-Length"}
+
+
+def test_search_uses_ranked_dbmanager_query():
+    sql = QUERIES['search'].sql
+    assert 'ts_rank' in sql and 'q.text <% v.title' in sql and '%(' not in sql
+    assert asyncpg_sql(SEARCH_VACANCIES, SEARCH_PARAMS).count('$5') == 1
+    assert QUERIES['companies_dedup'].sql == dedup_sql(COMPANIES_COUNT, True)
+
+
+def test_load_test_reports_latency_percentiles():
+    async def scenario():
+        service = QueryService(FakePool())
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await load_test(f'http://127.0.0.1:{port}', concurrency=20, requests=200,
+                                   paths=['/companies', '/vacancies/search?keyword=python'])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    report = asyncio.run(scenario())
+    assert report['errors'] == 0
+    assert report['statuses'] == {'200': 200}
+    assert 0 < report['p50_ms'] <= report['p99_ms'] <= report['max_ms']
@@ -0,0 +1,138 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from src.analytics.salary import group_stats, midpoints
+from src.cli import cli
+from src.export import snapshot
+from src.export.snapshot import write_snapshot, read_snapshot, snapshot_dates, SnapshotAnalytics
+
+LOADED_AT = datetime(2024, 4, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_rows(count):
+    rng = np.random.default_rng(0)
+    rows = []
+    for vacancy_id in range(1, count + 1):
+        company_id = int(rng.integers(1, 4))
+        salary_from = None if rng.random() < 0.3 else int(rng.integers(50, 300)) * 1000
+        salary_to = None if rng.random() < 0.5 else (salary_from or 100_000) + 50_000
+        rows.append((vacancy_id, company_id, f'Компания {company_id}', f'Вакансия {vacancy_id % 7}',
+                     salary_from, salary_to, 'RUR', False, salary_from, salary_to,
+                     f'https://hh.ru/vacancy/{vacancy_id}', LOADED_AT))
+    return rows
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.position = 0
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, query, params=None):
+        self.load_date = params[0] if params else None
+
+    def fetchone(self):
+        return 3, LOADED_AT
+
+    def fetchmany(self, size):
+        batch = self.rows[self.position:self.position + size]
+        self.position += size
+        return [row + (self.load_date,) for row in batch]
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, name=None):
+        return FakeCursor(self.rows)
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    rows = make_rows(1000)
+
+    @contextmanager
+    def connection(dbname):
+        yield FakeConnection(rows)
+
+    monkeypatch.setattr(snapshot, 'connection', connection)
+    return rows
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'ipc'])
+def test_snapshot_round_trip_partitioned_by_date_and_company(database, tmp_path, fmt):
+    meta = write_snapshot('hh', str(tmp_path), fmt, row_group_size=128)
+
+    assert meta['rows'] == len(database)
+    assert meta['generation'] == 3
+    assert snapshot_dates(str(tmp_path)) == [date(2024, 4, 1)]
+    partition = tmp_path / 'load_date=2024-04-01'
+    assert sorted(os.listdir(partition)) == ['_snapshot.json', 'company_id=1', 'company_id=2', 'company_id=3']
+    assert json.loads((partition / '_snapshot.json').read_text())['format'] == fmt
+
+    table = read_snapshot(str(tmp_path))
+    assert sorted(table['vacancy_id'].to_pylist()) == [row[0] for row in database]
+    assert set(read_snapshot(str(tmp_path), company_ids=[2])['company_id'].to_pylist()) == {2}
+
+
+def test_repeated_snapshot_replaces_the_same_date(database, tmp_path):
+    write_snapshot('hh', str(tmp_path))
+    del database[500:]
+    write_snapshot('hh', str(tmp_path))
+    assert read_snapshot(str(tmp_path)).num_rows == 500
+
+
+def test_failed_snapshot_keeps_the_previous_one(database, tmp_path, monkeypatch):
+    write_snapshot('hh', str(tmp_path))
+
+    def fetchmany(self, size):
+        raise RuntimeError('соединение потеряно')
+
+    monkeypatch.setattr(FakeCursor, 'fetchmany', fetchmany)
+    assert write_snapshot('hh', str(tmp_path)) is None
+    assert read_snapshot(str(tmp_path)).num_rows == len(database)
+    # Временный каталог недописанного снимка удалён
+    assert os.listdir(tmp_path) == ['load_date=2024-04-01']
+
+
+def test_snapshot_analytics_match_database_rows(database, tmp_path):
+    write_snapshot('hh', str(tmp_path), 'ipc')
+
+    stats = SnapshotAnalytics(str(tmp_path)).stats('company')
+
+    keys = np.array([row[1] for row in database])
+    values = midpoints(np.array([np.nan if row[8] is None else row[8] for row in database], dtype=float),
+                       np.array([np.nan if row[9] is None else row[9] for row in database], dtype=float))
+    expected = group_stats(keys, values)
+    by_name = {name: (count, median) for name, count, _, _, _, median, _, _ in stats}
+    for key, count, quantiles in zip(expected.keys, expected.counts, expected.quantiles):
+        assert by_name[f'Компания {key}'] == (count, round(quantiles[2], 2))
+
+
+def test_read_snapshot_without_snapshots(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_snapshot(str(tmp_path))
+
+
+def test_cli_reports_salaries_from_snapshot(database, tmp_path, capsys):
+    write_snapshot('hh', str(tmp_path))
+    capsys.readouterr()
+    assert cli.main(['salaries', '--snapshot', str(tmp_path), '--by', 'title', '--format', 'csv']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith('name,salaries,avg_salary')
+    assert len(lines) == 1 + 7